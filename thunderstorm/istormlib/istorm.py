@@ -4,29 +4,27 @@
 
 @author: dtremoui
 """
-import os
-
 from matplotlib.pyplot import figure
-import h5py
 
 from .storm import Storm
 from .istorm_view import View
-from ..thunder.importers.tools import plug_dict
+from ..thunder.importers.tools import plug_dict, ImportPlugin
 
 from ..lightning.simple_plots import TLPOverlayWithLeakEvol
 
 
 class InteractiveStorm(object):
 
-    def __init__(self, storm=None):
+    def __init__(self, storm=None, mode='append'):
+        """storm is a Storm or a storm file name opened in mode
+        (see storm.OPEN_MODES)
+        """
         if storm is None:
             #TODO create a tmp file if None
             #self.storm = Storm()
             raise NotImplementedError
         elif type(storm) is str:
-            if not os.path.exists(storm):
-                h5py.File(storm, 'w')
-            self.storm = Storm(storm)
+            self.storm = Storm(storm, mode=mode)
         else:
             self.storm = storm
 
@@ -38,11 +36,37 @@ def __init__(self, storm=None):
         self.overlay_tlp_fig = None
 
     def _gen_import_data(self, importer):
-        def import_func(filename, comments=""):
+        def import_func(filename, comments="", workers=None):
             self.storm.append(View(importer.load(filename, comments,
-                                                 h5file=self.storm._h5file)))
+                                                 h5file=self.storm._h5file,
+                                                 workers=workers)))
         return import_func
 
+    def import_auto(self, filename, comments="", workers=None):
+        """Import filename with the plugin detected from its content"""
+        self.storm.append(View(ImportPlugin.auto_load(
+            filename, comments, h5file=self.storm._h5file,
+            workers=workers)))
+
+    def import_batch(self, path, plugin_label=None, workers=None,
+                     cache=None, lazy=False, profile=None):
+        """Import all the files of a directory (or matching a glob pattern)
+        with the plugin_label plugin (detected for each file if None).
+        See Storm.import_batch
+        """
+        return self.storm.import_batch(path, plugin_label, workers, cache,
+                                       lazy, profile)
+
+    @property
+    def catalog(self):
+        return self.storm.catalog
+
+    def query(self, mask=None, **criteria):
+        """Return the views of the experiments matching the criteria
+        See Storm.query
+        """
+        return self.storm.query(mask, **criteria)
+
     @property
     def filename(self):
         return self.storm._h5file.filename
@@ -51,8 +75,8 @@ def __repr__(self):
         if len(self.storm) == 0:
             return "Empty"
         showtxt = "Storm name: %s\n" % self.filename
-        for idx, elem in enumerate(self.storm):
-            showtxt += "%s : %s" % (idx, elem)
+        for idx, name in enumerate(self.storm.names):
+            showtxt += "%s : View of Experiement: %s\n" % (idx, name)
         return showtxt
 
     def overlay_raw_tlp(self, index_list, experiment_list=()):
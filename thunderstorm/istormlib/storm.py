@@ -20,24 +20,217 @@
 """
 Data storm
 """
+import os
+import glob
 import logging
 
 import h5py
+import numpy as np
 
 from .istorm_view import View
-from ..thunder.tlp import Droplet
+from ..thunder.tlp import Droplet, PulsesCache, DROPLET_CACHE_SIZE
+from ..thunder.catalog import (Catalog, PENDING_PREFIX, read_catalog,
+                               rebuild_catalog, scan_catalog,
+                               is_experiment)
+from ..thunder.importers.tools import (ImportPlugin, plug_dict,
+                                      batch_import, detect_plugin)
 
 
-class Storm(list):
+# Default memory budget of the decoded pulses of a storm in bytes
+STORM_CACHE_SIZE = 2 ** 29
+
+# Storm open modes
+#   read: read only
+#   append: read and import new experiments (the file is created if
+#       missing)
+# HDF5 locks the storm file: it cannot be opened in append mode while
+# another process has it opened, nor be read while another process has
+# it opened in append mode. The processes analysing a storm which is
+# being filled close it (Storm.close) during the imports and call
+# Storm.reopen afterwards to get the new experiments.
+OPEN_MODES = ('read', 'append')
+
+
+def open_storm_file(h5filename, mode='append'):
+    """Open the storm file h5filename in one of the OPEN_MODES
+    and return the h5py file
+    """
+    if mode == 'read':
+        return h5py.File(h5filename, 'r')
+    if mode == 'append':
+        return h5py.File(h5filename, 'a')
+    raise ValueError("Unknown storm open mode %r, use one of %s"
+                     % (mode, ", ".join(OPEN_MODES)))
+
+
+class Storm(object):
     """ A storm to manipulate the content of ESD data file
        (*.oef file)
+    A storm is a sequence of droplet views that can be indexed by
+    position or by experiment name. Only the experiment names are read
+    when the file is opened, droplets are built on first access.
+    The decoded pulses of all the droplets share a cache of cache_size
+    bytes, each droplet using at most droplet_cache_size bytes.
+    Experiments can be searched with the storm catalog (see query).
+    mode is one of OPEN_MODES, see OPEN_MODES to share a storm file
+    between processes.
     """
-    def __init__(self, h5filename):
-        h5file = h5py.File(h5filename, 'r+')
-        list.__init__(self)
-        self._h5file = h5file
-        for h5group in h5file.values():
-            self.append(View(Droplet(h5group)))
+    def __init__(self, h5filename, cache_size=STORM_CACHE_SIZE,
+                 droplet_cache_size=DROPLET_CACHE_SIZE, mode='append'):
+        self._h5file = open_storm_file(h5filename, mode)
+        self._file_name = h5filename
+        self.mode = mode
+        self.pulses_cache = PulsesCache(cache_size, droplet_cache_size)
+        self._names = []
+        self._views = {}
+        self._attrs = {}
+        self._catalog = None
+        self._pending = []
+        self.refresh()
+
+    def __repr__(self):
+        return "Storm(%r, %i experiments)" % (self._file_name, len(self))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        for name in list(self._names):
+            yield self._view(name)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(name) for name in self._names[index]]
+        if isinstance(index, (int, np.integer)):
+            return self._view(self._names[index])
+        if index not in self._names:
+            raise KeyError("No experiment named %r" % index)
+        return self._view(index)
+
+    @property
+    def writable(self):
+        """True if experiments can be imported in the storm"""
+        return self.mode == 'append'
+
+    def refresh(self):
+        """Add the experiments of the storm file missing from the storm
+        (imported through another Storm of the file since the storm was
+        opened)
+        The experiments imported by another process are only found
+        once the storm is reopened (see reopen).
+        """
+        self._catalog = None
+        self._pending = []
+        for name in self._h5file.keys():
+            if is_experiment(name):
+                if name not in self._names:
+                    self._names.append(str(name))
+            elif name.startswith(PENDING_PREFIX):
+                self._pending.append(str(name[len(PENDING_PREFIX):]))
+
+    @property
+    def pending(self):
+        """The experiments of the storm file whose import is not
+        complete (in progress or interrupted), they are not part of the
+        storm
+        """
+        return list(self._pending)
+
+    def close(self):
+        """Close the storm file, see reopen"""
+        if not self._h5file:
+            return
+        for view in self._views.values():
+            view.experiment.pulses_cache = None
+        log = logging.getLogger('thunderstorm.istormlib')
+        log.info("Closing %s file" % self._file_name)
+        if self.writable:
+            self._h5file.flush()
+        self._h5file.close()
+
+    def reopen(self):
+        """Open the storm file again (after close) to get the
+        experiments imported by other processes
+        The droplets of the views already obtained are rebuilt on the
+        new file: the views remain valid but their droplets change.
+        """
+        self.close()
+        self._h5file = open_storm_file(self._file_name, self.mode)
+        for (name, view) in list(self._views.items()):
+            if name in self._h5file:
+                view.experiment = Droplet(self._h5file[name],
+                                          self.pulses_cache)
+            else:
+                del self._views[name]
+                self._names.remove(name)
+        self._attrs = {}
+        self.refresh()
+
+    @property
+    def names(self):
+        """The experiment names in storm order"""
+        return list(self._names)
+
+    def index(self, name):
+        """Return the position of the experiment name"""
+        return self._names.index(name)
+
+    def attrs(self, name):
+        """Return the attributes (tester_name, device_name,
+        original_file_path...) of the experiment name
+        without building its droplet
+        """
+        if name not in self._attrs:
+            self._attrs[name] = dict(self._h5file[name].attrs)
+        return self._attrs[name]
+
+    @property
+    def catalog(self):
+        """The Catalog of the experiments
+        It is rebuilt if it is missing or outdated (files written before
+        the catalog existed or modified by an older version)
+        """
+        if self._catalog is None:
+            table = read_catalog(self._h5file)
+            if sorted(table.name) != sorted(self._names):
+                if self.mode == 'append':
+                    rebuild_catalog(self._h5file)
+                    self._h5file.flush()
+                    table = read_catalog(self._h5file)
+                else:
+                    table = scan_catalog(self._h5file)
+            self._catalog = Catalog(table)
+        return self._catalog
+
+    def query(self, mask=None, **criteria):
+        """Return the views of the experiments matching the criteria,
+        in storm order. See Catalog for the criteria, e.g.
+        storm.query(tester_name='Oryx', failure_current=(None, 1.5))
+        """
+        selected = set(self.catalog.select(mask, **criteria))
+        return [self._view(name) for name in self._names
+                if name in selected]
+
+    def _view(self, name):
+        if name not in self._views:
+            droplet = Droplet(self._h5file[name], self.pulses_cache)
+            self._views[name] = View(droplet)
+        return self._views[name]
+
+    def append(self, view):
+        """Add the view of a droplet, the droplet then uses
+        the storm pulses cache
+        """
+        view.experiment.pulses_cache = self.pulses_cache
+        name = view.experiment.exp_name
+        if name not in self._names:
+            self._names.append(name)
+        self._views[name] = view
+        self._attrs.pop(name, None)
+        self._catalog = None
 
     def overlay_raw_tlp(self, tlp_fig, index_list=None,
                         experiment_list=()):
@@ -52,8 +245,103 @@ def overlay_raw_tlp(self, tlp_fig, index_list=None,
             for idx in index_list:
                 tlp_fig.add_curve(self[idx].experiment.raw_data)
 
-    def __del__(self):
+    def import_batch(self, path, plugin_label=None, workers=None,
+                     cache=None, lazy=False, profile=None):
+        """Import a whole set of measurements in the storm
+
+        Parameters
+        ----------
+        path: string
+            A directory (all the files matching the plugin file
+            extension are imported) or a glob pattern
+        plugin_label: string
+            The label of the import plugin to use (see plug_dict).
+            If None, the plugin is detected for each file and the files
+            no plugin recognizes (waveform archives...) are ignored.
+        workers: int
+            Number of processes used to import the files concurrently
+            Droplets are always written in the storm file by
+            the calling process.
+        cache: ImportCache
+            Optional import cache
+        lazy: bool
+            If True only the TLP curves and leakage data are imported,
+            the waveforms are decoded from the original files when
+            first used: the storm then depends on these files.
+        profile: StorageProfile or string
+            Compression of the waveforms (see tlp.STORAGE_PROFILES)
+
+        Files already in the storm (same original file path) are skipped.
+        Experiments are named after their file without extension,
+        numbered (name_2, name_3...) if this name is already used.
+
+        Returns
+        -------
+        A list of (file_name, status, duration, error) tuples, in file
+        name order, with status
+        'imported', 'skipped' or 'failed', duration the import
+        time in second and error the failure message or None
+        """
         log = logging.getLogger('thunderstorm.istormlib')
-        log.info("Closing %s file" % self._h5file.filename)
-        self._h5file.flush()
-        self._h5file.close()
+        if not self.writable:
+            raise IOError("%s is opened in %s mode"
+                          % (self._file_name, self.mode))
+        if os.path.isdir(path):
+            if plugin_label is None:
+                path = os.path.join(path, '*')
+            else:
+                path = os.path.join(path, plug_dict[plugin_label].file_ext)
+        known_files = set(self.attrs(name).get('original_file_path')
+                          for name in self._names)
+        report = []
+        to_import = []
+        labels = []
+        positions = []  # in report of the imported files
+        for file_name in sorted(glob.glob(path)):
+            label = plugin_label
+            if label is None:
+                label = detect_plugin(file_name)
+                if label is None:
+                    continue
+            if os.path.realpath(file_name) in known_files:
+                report.append((file_name, 'skipped', 0.0, None))
+            else:
+                to_import.append(file_name)
+                labels.append(label)
+                positions.append(len(report))
+                report.append(None)
+        for ((file_name, raw_data, duration, error), position) in \
+                zip(batch_import(to_import, labels, workers, cache, lazy),
+                    positions):
+            if error is None:
+                try:
+                    droplet = ImportPlugin.load_in_droplet(
+                        raw_data, self._h5file,
+                        self._experiment_name(file_name), profile)
+                except Exception as load_error:
+                    error = "%s: %s" % (load_error.__class__.__name__,
+                                        load_error)
+                else:
+                    self.append(View(droplet))
+            if error is None:
+                log.info("%s imported in %.2fs" % (file_name, duration))
+                report[position] = (file_name, 'imported', duration, None)
+            else:
+                log.warn("%s import failed\n%s" % (file_name, error))
+                report[position] = (file_name, 'failed', duration, error)
+        return report
+
+    def _experiment_name(self, file_name):
+        """Return the name of the experiment of file_name: the file name
+        without extension, numbered if another experiment has this name
+        """
+        base_name = os.path.splitext(os.path.basename(file_name))[0]
+        (name, number) = (base_name, 1)
+        while name in self._h5file:
+            number += 1
+            name = "%s_%i" % (base_name, number)
+        return name
+
+    def __del__(self):
+        if getattr(self, '_h5file', None) is not None:
+            self.close()
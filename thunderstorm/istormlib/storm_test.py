@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing storm.py
+"""
+
+import os
+
+import pytest
+
+from ..thunder.catalog import PENDING_PREFIX
+from ..thunder.importers import tools
+from . import storm as storm_module
+from .storm import Storm
+
+TSR = (b'"[Header]"\r\nfoo\r\n"[=====Test Result Table=====]"\r\n'
+       b'2,0,0,1,0.02,1e-09\r\n5,0,0,2.75,0.055,1e-09\r\n'
+       b'10,0,0,5,0.1,1e-09\r\n"[EOF]"\r\n')
+WFM = b'hdr\r\n' * 13 + b'0,1\r\n1,2\r\n2,3\r\n[EOF]\r\n'
+
+
+def _status(report):
+    return dict((name.split('/')[-1], status)
+                for (name, status, _, _) in report)
+
+
+def _write_tsr(data_dir, name):
+    data_dir.join(name + '.tsr').write_binary(TSR)
+    wfm_dir = data_dir.mkdir(name)
+    for volt in ('2', '5', '10'):
+        for quantity in ('TlpVolt', 'TlpCurr'):
+            wfm_dir.join("01-01-10_01'00'00_PM_%s_%sV.wfm"
+                         % (quantity, volt)).write_binary(WFM)
+
+
+def _superblock_version(file_name):
+    with open(file_name, 'rb') as h5file:
+        return bytearray(h5file.read(9))[8]
+
+
+def test_import_batch(tmpdir, monkeypatch):
+    data_dir = tmpdir.mkdir('data')
+    _write_tsr(data_dir, 'good')
+    data_dir.join('bad.tsr').write_binary(TSR.replace(b'0.055', b'x'))
+    data_dir.join('notes.txt').write_binary(b'not a tester file')
+    detected = []
+    detect_plugin = tools.detect_plugin
+
+    def counting_detect(path):
+        detected.append(path)
+        return detect_plugin(path)
+    monkeypatch.setattr(storm_module, 'detect_plugin', counting_detect)
+    monkeypatch.setattr(tools, 'detect_plugin', counting_detect)
+    storm = Storm(str(tmpdir.join('storm.h5')))
+    report = storm.import_batch(str(data_dir))
+    assert _status(report) == {'good.tsr': 'imported', 'bad.tsr': 'failed'}
+    assert len(set(detected)) == len(detected)  # once per file
+    error = [error for (_, status, _, error) in report
+             if status == 'failed'][0]
+    assert 'ValueError' in error
+    assert len(storm) == 1
+    report = storm.import_batch(str(data_dir))
+    assert _status(report) == {'good.tsr': 'skipped', 'bad.tsr': 'failed'}
+    assert len(storm) == 1
+    # Waveforms are stored in the storm, not read from the files
+    raw_data = storm[0].experiment.raw_data
+    assert 'IVTime' in raw_data.droplet
+    assert raw_data.pulses.pulses_nb == 3
+
+
+def test_open_modes(tmpdir):
+    data_dir = tmpdir.mkdir('data')
+    _write_tsr(data_dir, 'good')
+    file_name = str(tmpdir.join('storm.h5'))
+    storm = Storm(file_name)
+    assert storm.writable
+    storm.import_batch(str(data_dir), 'Oryx')
+    name = storm.names[0]
+    storm.close()
+    # Readable by HDF5 1.8
+    assert _superblock_version(file_name) == 0
+    storm = Storm(file_name, mode='read')
+    assert not storm.writable
+    assert storm.names == [name]
+    with pytest.raises(IOError):
+        storm.import_batch(str(data_dir), 'Oryx')
+    storm.close()
+    for mode in ('write', 'swmr-write'):
+        with pytest.raises(ValueError):
+            Storm(file_name, mode=mode)
+
+
+def test_reopen(tmpdir):
+    data_dirs = [tmpdir.mkdir('data1'), tmpdir.mkdir('data2')]
+    _write_tsr(data_dirs[0], 'first')
+    _write_tsr(data_dirs[1], 'second')
+    file_name = str(tmpdir.join('storm.h5'))
+    writer = Storm(file_name)
+    writer.import_batch(str(data_dirs[0]), 'Oryx')
+    writer.close()
+    reader = Storm(file_name, mode='read')
+    view = reader[0]
+    assert view.experiment.raw_data.pulses.pulses_nb == 3
+    reader.close()
+    # Appended by another writer while the reader is closed
+    writer = Storm(file_name)
+    writer.import_batch(str(data_dirs[1]), 'Oryx')
+    writer._h5file.create_group(PENDING_PREFIX + 'third')
+    writer.close()
+    reader.reopen()
+    assert reader.names == ['first', 'second']
+    assert reader.pending == ['third']
+    assert len(reader.catalog) == 2
+    assert reader[0] is view
+    assert view.experiment.raw_data.pulses.pulses_nb == 3
+    assert reader['second'].experiment.raw_data.pulses.pulses_nb == 3
+    reader.close()
+
+
+def test_import_batch_names(tmpdir):
+    data_dir = tmpdir.mkdir('data')
+    for sub_dir in ('a', 'b'):
+        _write_tsr(data_dir.mkdir(sub_dir), 'meas')
+    storm = Storm(str(tmpdir.join('storm.h5')))
+    report = storm.import_batch(str(data_dir.join('b', '*.tsr')), 'Oryx')
+    assert [status for (_, status, _, _) in report] == ['imported']
+    report = storm.import_batch(str(data_dir.join('*', '*.tsr')), 'Oryx')
+    # In file order, same base names imported as different experiments
+    assert [(name.split(os.sep)[-2], status)
+            for (name, status, _, _) in report] == \
+        [('a', 'imported'), ('b', 'skipped')]
+    assert storm.names == ['meas', 'meas_2']
+    assert storm.attrs('meas_2')['original_file_path'] == \
+        os.path.realpath(str(data_dir.join('a', 'meas.tsr')))
+    storm.close()
+
+
+def test_lazy_storm(tmpdir, monkeypatch):
+    data_dir = tmpdir.mkdir('data')
+    for name in ('first', 'second', 'third'):
+        _write_tsr(data_dir, name)
+    file_name = str(tmpdir.join('storm.h5'))
+    storm = Storm(file_name)
+    storm.import_batch(str(data_dir.join('[fs]*.tsr')), 'Oryx')
+    storm.close()
+    built = []
+    droplet_class = storm_module.Droplet
+
+    def counting_droplet(h5group, pulses_cache=None):
+        built.append(h5group.name)
+        return droplet_class(h5group, pulses_cache)
+    monkeypatch.setattr(storm_module, 'Droplet', counting_droplet)
+    storm = Storm(file_name)
+    # No droplet is built to open, list or search the storm
+    assert len(storm) == 2 and 'first' in storm and 'third' not in storm
+    assert repr(storm) == "Storm(%r, 2 experiments)" % file_name
+    assert storm.index('second') == 1
+    assert storm.attrs('first')['tester_name'] == 'Oryx'
+    assert storm.catalog.select(tester_name='Oryx') == ['first', 'second']
+    assert built == []
+    # Built once on first access
+    view = storm['second']
+    assert storm[1] is view and storm[-1] is view
+    assert built == ['/second']
+    assert storm.query(max_current=(None, 1)) == [storm[0], view]
+    assert built == ['/second', '/first']
+    with pytest.raises(KeyError):
+        storm['third']
+    # Droplets written in the file behind the storm back, and an
+    # unfinished one
+    raw_data = tools.plug_dict['Oryx']().import_data(
+        str(data_dir.join('third.tsr')))
+    tools.ImportPlugin.load_in_droplet(raw_data, storm._h5file)
+    storm._h5file.create_group(PENDING_PREFIX + 'fourth')
+    assert len(storm) == 2
+    storm.refresh()
+    assert storm.names == ['first', 'second', 'third']
+    assert storm.pending == ['fourth']
+    assert storm.catalog.select() == ['first', 'second', 'third']
+    assert storm[1] is view
+    assert storm['third'].experiment.raw_data.pulses.pulses_nb == 3
+    storm.close()
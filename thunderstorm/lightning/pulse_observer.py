@@ -70,13 +70,9 @@ def update(self):
             v_pulse_plot.axes.set_color_cycle(colors)
             i_pulse_plot.axes.set_color_cycle(colors)
             time = self.offseted_time.T[selected_flag].T
-            pulses = self.pulses
-            self.v_pulse_lines = \
-                v_pulse_plot.plot(time,
-                                  pulses.voltage[selected_flag].T)
-            self.i_pulse_lines = \
-                i_pulse_plot.plot(time,
-                                  pulses.current[selected_flag].T)
+            (voltage, current) = self.pulses.read_iv(selected_flag)
+            self.v_pulse_lines = v_pulse_plot.plot(time, voltage.T)
+            self.i_pulse_lines = i_pulse_plot.plot(time, current.T)
         else:
             self.v_pulse_lines = None
             self.i_pulse_lines = None
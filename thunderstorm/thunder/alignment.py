@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Time alignment of the transient pulses.
+The trigger of the scopes jitters from pulse to pulse, the pulses of
+a measurement are therefore not aligned when overlaid. The delay of
+each pulse relative to a reference pulse is the position of the peak
+of their cross-correlation, refined below the sampling period by
+fitting a parabola on the peak. The cross-correlations of all the
+pulses are computed with one batched FFT.
+"""
+from __future__ import division
+
+import numpy as np
+
+from .pulses import IVTime, as_ivtime
+from .transforms import next_fast_len, rfft_block, irfft_block
+
+
+def _spectra(pulses, workers):
+    """Return (spectra, fft_length) of the waveforms block zero padded
+    so that the circular cross-correlation does not wrap around
+    """
+    block = pulses._float_block()
+    fft_length = next_fast_len(2 * pulses.pulses_length - 1)
+    padded = np.zeros(block.shape[:2] + (fft_length,), block.dtype)
+    padded[..., :pulses.pulses_length] = block
+    return rfft_block(padded, fast_length=False, workers=workers)
+
+
+def _reference_index(pulses, reference, position):
+    if reference is None:
+        # The pulse of largest amplitude has the best signal to noise
+        waveforms = pulses._float_block()[position]
+        return int(np.argmax(np.ptp(waveforms, axis=-1)))
+    return reference
+
+
+def _correlate(pulses, reference, quantity, max_delay, workers):
+    """Return (spectra, fft_length, reference, delays), delays being
+    in samples
+    """
+    position = ('voltage', 'current').index(quantity)
+    reference = _reference_index(pulses, reference, position)
+    (spectra, fft_length) = _spectra(pulses, workers)
+    max_lag = None if max_delay is None else max_delay / pulses.delta_t
+    delays = _delays(spectra[position], fft_length, reference, max_lag,
+                     workers)
+    return (spectra, fft_length, reference, delays)
+
+
+def _delays(spectra, fft_length, reference, max_lag, workers):
+    """Return the delays in samples of each spectrum of spectra
+    relative to the reference spectrum
+    """
+    correlation = irfft_block(spectra * np.conj(spectra[reference]),
+                              fft_length, workers=workers)
+    lags = np.arange(fft_length)
+    lags = np.where(lags < fft_length // 2, lags, lags - fft_length)
+    if max_lag is not None:
+        correlation[:, np.abs(lags) > max_lag] = -np.inf
+    peak = np.argmax(correlation, axis=-1)[:, np.newaxis]
+    values = [np.take_along_axis(correlation, (peak + step) % fft_length,
+                                 axis=-1)[:, 0]
+              for step in (-1, 0, 1)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curvature = values[0] - 2 * values[1] + values[2]
+        fraction = (values[0] - values[2]) / (2 * curvature)
+    fraction = np.where(np.isfinite(fraction) & (np.abs(fraction) <= 1),
+                        fraction, 0)
+    return lags[peak[:, 0]] + fraction
+
+
+def estimate_delays(pulses, reference=None, quantity='voltage',
+                    max_delay=None, workers=None):
+    """Return the delay (s) of each pulse relative to a reference pulse
+
+    Parameters
+    ----------
+    pulses: IVTime or H5IVTime
+    reference: int
+        Index of the reference pulse, the pulse of largest amplitude
+        if None
+    quantity: string
+        'voltage' or 'current', the waveforms that are correlated
+    max_delay: float
+        Largest delay (s) looked for, useful when the pulses are
+        periodic or ringing
+    workers: int
+        Number of FFT threads (see transforms.DEFAULT_WORKERS)
+
+    A positive delay means the pulse comes later than the reference
+    in its samples.
+    """
+    pulses = as_ivtime(pulses)
+    delays = _correlate(pulses, reference, quantity, max_delay, workers)[3]
+    return delays * pulses.delta_t
+
+
+def align(pulses, reference=None, quantity='voltage', max_delay=None,
+          resample=False, workers=None):
+    """Return the pulses aligned on a reference pulse
+
+    The parameters are the ones of estimate_delays.
+    If resample is False the waveforms are kept (and shared) and only
+    the offsets_t are corrected, so that the time of the samples of
+    all the pulses match the time of the reference pulse.
+    If resample is True the waveforms are shifted by their delay, with
+    a sub-sample resolution, and all the pulses get the offset of the
+    reference pulse. The samples shifted in from outside the pulse are
+    zero.
+    """
+    pulses = as_ivtime(pulses)
+    (spectra, fft_length, reference, delays) = _correlate(
+        pulses, reference, quantity, max_delay, workers)
+    offsets_t = np.zeros(pulses.pulses_nb) + pulses.offsets_t
+    reference_offset = offsets_t[reference]
+    if not resample:
+        return IVTime.from_arrays(
+            pulses.voltage, pulses.current, pulses.delta_t,
+            reference_offset - delays * pulses.delta_t, pulses.valim)
+    # x[n + delay] is a phase ramp in the frequency domain
+    ramp = np.exp(2j * np.pi / fft_length
+                  * np.outer(delays, np.arange(spectra.shape[-1])))
+    spectra *= ramp
+    block = irfft_block(spectra, fft_length, pulses.pulses_length, workers)
+    return IVTime.from_arrays(block[0], block[1], pulses.delta_t,
+                              np.full(pulses.pulses_nb, reference_offset),
+                              pulses.valim)
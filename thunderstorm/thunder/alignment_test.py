@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing alignment.py
+"""
+
+import numpy as np
+
+from .pulses import IVTime
+from .alignment import estimate_delays, align
+
+DELAYS = np.array([0, 3.3, -7.75, 12.5, 0.4])
+
+
+def _pulses(delays=DELAYS):
+    """Smooth pulses of increasing amplitude shifted by delays samples
+    """
+    samples = np.arange(400)[np.newaxis, :] - delays[:, np.newaxis]
+    shape = (np.tanh((samples - 100) / 6.) - np.tanh((samples - 250) / 6.))
+    amplitude = np.arange(1, len(delays) + 1)[:, np.newaxis]
+    return IVTime.from_arrays(shape * amplitude, shape * amplitude / 50,
+                              delta_t=1e-10, offsets_t=np.zeros(len(delays)))
+
+
+def test_estimate_delays():
+    pulses = _pulses()
+    delays = estimate_delays(pulses, reference=0) / 1e-10
+    assert np.allclose(delays, DELAYS, atol=0.05)
+    # Largest pulse as reference
+    delays = estimate_delays(pulses, quantity='current') / 1e-10
+    assert np.allclose(delays, DELAYS - DELAYS[-1], atol=0.05)
+
+
+def test_align():
+    pulses = _pulses()
+    aligned = align(pulses, reference=0)
+    assert np.shares_memory(aligned.voltage, pulses.voltage)
+    assert np.allclose(aligned.offsets_t, -DELAYS * 1e-10, atol=1e-12)
+    aligned = align(pulses, reference=0, resample=True)
+    expected = _pulses(np.zeros(len(DELAYS)))
+    assert np.allclose(aligned.offsets_t, 0)
+    assert np.allclose(aligned.voltage, expected.voltage, atol=0.02)
+    assert np.allclose(aligned.current, expected.current, atol=0.02 / 50)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Experiment catalog of a storm file.
+The catalog is a compound dataset at the root of the storm file with
+one row per droplet: its attributes (device, tester, original file,
+import time) and a few scalar results (number of pulses, failure
+current...). Searching experiments then only needs to read this
+table instead of opening every droplet group.
+"""
+
+import h5py
+import numpy as np
+
+CATALOG_NAME = '_catalog'
+
+# Droplets being written are named PENDING_PREFIX + experiment name
+# until they are complete (see importers.tools.load_in_droplet)
+PENDING_PREFIX = '_pending_'
+
+# Relative leakage drift (%) considered as a device failure
+# (same default as analysis.leakage_analysis.LeakageAnalysis.fail)
+FAILURE_THRESHOLD = 15
+
+# Strings are stored as fixed length utf-8 (in bytes), variable
+# length strings cannot be read by SWMR readers while being appended
+_STRING_FIELDS = (('name', 255),
+                  ('device_name', 255),
+                  ('tester_name', 64),
+                  ('original_file_path', 1024))
+_NUMERIC_FIELDS = (('import_time', np.float64),
+                   ('pulses_nb', np.int64),
+                   ('has_transient_pulses', np.bool_),
+                   ('has_leakage_evolution', np.bool_),
+                   ('failed', np.bool_),
+                   ('failure_index', np.int64),
+                   ('failure_voltage', np.float64),
+                   ('failure_current', np.float64),
+                   ('max_current', np.float64))
+
+
+def catalog_dtype():
+    """Compound dtype of the catalog dataset"""
+    return np.dtype([(name, h5py.string_dtype('utf-8', length))
+                     for (name, length) in _STRING_FIELDS]
+                    + list(_NUMERIC_FIELDS))
+
+
+def _rows_array(rows):
+    """Convert catalog rows to an array of catalog_dtype"""
+    strings_nb = len(_STRING_FIELDS)
+    return np.array([tuple(value.encode('utf-8') for value in row[:strings_nb])
+                     + tuple(row[strings_nb:]) for row in rows],
+                    catalog_dtype())
+
+
+def failure_point(leak_evol, threshold=FAILURE_THRESHOLD):
+    """Return the index of the first pulse after which the leakage
+    drifted more than threshold percent from its initial value,
+    -1 if the device did not fail
+    """
+    if leak_evol is None:
+        return -1
+    leak_evol = np.asarray(leak_evol, dtype=float).ravel()
+    if leak_evol.size == 0 or leak_evol[0] == 0:
+        return -1
+    drift = np.abs(100.0 * (leak_evol - leak_evol[0]) / leak_evol[0])
+    failed = np.flatnonzero(drift >= threshold)
+    if failed.size == 0:
+        return -1
+    return int(failed[0])
+
+
+def catalog_row(name, attrs, tlp_curve, leak_evol, pulses_nb,
+                has_transient_pulses):
+    """Return the catalog row (a tuple) of an experiment
+
+    Parameters
+    ----------
+    name: string
+        The experiment (droplet group) name
+    attrs: dict
+        The droplet attributes (device_name, tester_name,
+        original_file_path and optionally import_time)
+    tlp_curve: array
+        (voltage, current) TLP curve
+    leak_evol: array
+        Leakage evolution, None if not measured
+    pulses_nb: int
+        Number of transient pulses
+    has_transient_pulses: bool
+    """
+    tlp_curve = np.asarray(tlp_curve, dtype=float)
+    if tlp_curve.ndim != 2 or tlp_curve.shape[1] == 0:
+        tlp_curve = np.empty((2, 0))
+    fail_idx = failure_point(leak_evol)
+    if fail_idx >= tlp_curve.shape[1]:
+        fail_idx = -1
+    if fail_idx == -1:
+        (fail_v, fail_i) = (np.nan, np.nan)
+    else:
+        (fail_v, fail_i) = tlp_curve[:, fail_idx]
+    max_current = (np.nanmax(tlp_curve[1]) if tlp_curve.shape[1]
+                   else np.nan)
+    return (str(name),
+            str(attrs.get('device_name', '')),
+            str(attrs.get('tester_name', '')),
+            str(attrs.get('original_file_path', '')),
+            float(attrs.get('import_time', np.nan)),
+            int(pulses_nb),
+            bool(has_transient_pulses),
+            leak_evol is not None,
+            fail_idx != -1,
+            fail_idx,
+            fail_v,
+            fail_i,
+            max_current)
+
+
+def group_catalog_row(h5group):
+    """Return the catalog row of the droplet h5group,
+    waveforms are not read
+    """
+    attrs = dict(h5group.attrs)
+    keys = set(h5group.keys())
+    leak_evol = h5group['leak_evol'][()] if 'leak_evol' in keys else None
+    if 'IVTime' in keys:
+        pulses_nb = h5group['IVTime'].shape[0]
+    elif attrs.get('deferred_pulses', False):
+        # Waveforms are not decoded yet, files written before the
+        # pulses_nb attribute have one pulse per TLP point
+        pulses_nb = attrs.get('pulses_nb', h5group['tlp_curve'].shape[-1])
+    else:
+        pulses_nb = 0
+    return catalog_row(h5group.name.split('/')[-1], attrs,
+                       h5group['tlp_curve'][()], leak_evol, pulses_nb,
+                       pulses_nb != 0)
+
+
+def is_experiment(name):
+    """True if name, a name of the root of a storm file, is the name of
+    a complete droplet
+    """
+    return name != CATALOG_NAME and not name.startswith(PENDING_PREFIX)
+
+
+def _scan_rows(h5file):
+    return _rows_array([group_catalog_row(h5file[name])
+                        for name in h5file if is_experiment(name)])
+
+
+def _write_rows(h5file, rows):
+    if CATALOG_NAME in h5file:
+        del h5file[CATALOG_NAME]
+    h5file.create_dataset(CATALOG_NAME, data=rows, maxshape=(None,),
+                          chunks=(256,), compression='gzip')
+
+
+def _append_row(h5file, row):
+    if CATALOG_NAME not in h5file:
+        _write_rows(h5file, _rows_array([row]))
+        return
+    dataset = h5file[CATALOG_NAME]
+    position = dataset.shape[0]
+    dataset.resize((position + 1,))
+    dataset[position] = _rows_array([row])[0]
+
+
+def update_catalog(h5file, row):
+    """Add row to the catalog of h5file, replacing the row of
+    the same experiment if any
+    The names of the whole catalog are read, record_experiment adds
+    a new experiment without reading them.
+    """
+    if CATALOG_NAME in h5file:
+        dataset = h5file[CATALOG_NAME]
+        names = [_as_text(name) for name in dataset.fields('name')[()]]
+        if row[0] in names:
+            dataset[names.index(row[0])] = _rows_array([row])[0]
+            return
+    _append_row(h5file, row)
+
+
+def record_experiment(h5group):
+    """Add the new droplet h5group to the catalog
+    The row is the one rebuild_catalog would make. The experiment must
+    not be in the catalog already: the catalog is not searched, a
+    duplicated name would only be removed by a rebuild.
+    """
+    _append_row(h5group.file, group_catalog_row(h5group))
+
+
+def rebuild_catalog(h5file):
+    """(Re)build the catalog of h5file from its droplet groups,
+    needed for files written before the catalog existed
+    """
+    _write_rows(h5file, _scan_rows(h5file))
+
+
+def scan_catalog(h5file):
+    """Return the catalog table of h5file built from its droplet groups
+    without writing it (for files opened read only)
+    """
+    return _as_table(_scan_rows(h5file))
+
+
+def read_catalog(h5file):
+    """Return the catalog of h5file as a numpy record array with
+    unicode string fields, an empty one if h5file has no catalog
+    """
+    if CATALOG_NAME not in h5file:
+        return _as_table(np.zeros(0, catalog_dtype()))
+    dataset = h5file[CATALOG_NAME]
+    if h5file.swmr_mode and h5file.mode == 'r':
+        # Get the rows appended by the writer since the last read
+        dataset.refresh()
+    return _as_table(dataset[()])
+
+
+def _as_table(table):
+    columns = []
+    for (name, _) in _STRING_FIELDS:
+        columns.append(np.array([_as_text(value) for value in table[name]],
+                                dtype=np.unicode_))
+    for (name, _) in _NUMERIC_FIELDS:
+        columns.append(table[name])
+    return np.rec.fromarrays(columns,
+                             names=[name for (name, _) in _STRING_FIELDS]
+                             + [name for (name, _) in _NUMERIC_FIELDS])
+
+
+def _as_text(value):
+    if isinstance(value, bytes):
+        # A truncated string may end in the middle of a character
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+class Catalog(object):
+    """Query the experiments of a catalog table (see read_catalog)
+
+    Criteria are given as keyword arguments named after the catalog
+    fields, a value can be:
+        - a scalar: the field must be equal to it
+        - a (min, max) tuple: the field must be in [min, max],
+          None for an open bound
+        - a list or set: the field must be one of its items
+    Any boolean mask of the table can also be given, e.g.
+    catalog.select(catalog.table.failure_current < 1.5)
+    """
+    def __init__(self, table):
+        self.table = table
+        self._index = dict((name, idx)
+                           for (idx, name) in enumerate(table.name))
+
+    def __repr__(self):
+        return "Catalog(%i experiments)" % len(self)
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    @property
+    def fields(self):
+        return self.table.dtype.names
+
+    def row(self, name):
+        """Return the catalog row of experiment name"""
+        return self.table[self._index[name]]
+
+    def mask(self, mask=None, **criteria):
+        """Return the boolean mask of the rows matching
+        mask and all criteria
+        """
+        table = self.table
+        if mask is None:
+            result = np.ones(len(table), dtype=bool)
+        else:
+            result = np.array(mask, dtype=bool)
+        for (field, value) in criteria.items():
+            if field not in table.dtype.names:
+                raise KeyError("No catalog field %r" % field)
+            column = table[field]
+            if isinstance(value, tuple):
+                (low, high) = value
+                if low is not None:
+                    result &= column >= low
+                if high is not None:
+                    result &= column <= high
+            elif isinstance(value, (list, set, frozenset)):
+                result &= np.in1d(column, list(value))
+            else:
+                result &= column == value
+        return result
+
+    def select(self, mask=None, **criteria):
+        """Return the names of the experiments matching
+        mask and all criteria
+        """
+        return [str(name)
+                for name in self.table.name[self.mask(mask, **criteria)]]
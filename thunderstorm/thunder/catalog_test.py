@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing catalog.py
+"""
+
+import h5py
+import numpy as np
+
+from .catalog import (Catalog, catalog_row, failure_point, read_catalog,
+                      rebuild_catalog, update_catalog, record_experiment,
+                      CATALOG_NAME, PENDING_PREFIX)
+
+
+def test_failure_point():
+    assert failure_point(None) == -1
+    assert failure_point([1e-9, 1.05e-9, 1e-9]) == -1
+    assert failure_point([1e-9, 1.05e-9, 2e-9, 1e-6]) == 2
+
+
+def test_catalog(tmpdir):
+    tlp_curve = np.array([[1, 2, 3], [0.1, 0.2, 0.3]])
+    rows = [catalog_row('dev%i' % idx,
+                        {'tester_name': tester, 'device_name': 'dev'},
+                        tlp_curve, leak_evol, 3, True)
+            for (idx, (tester, leak_evol)) in enumerate(
+                (('Oryx', [1, 1, 1]), ('HPPI', [1, 2, 3]),
+                 ('Oryx', None)))]
+    with h5py.File(str(tmpdir.join('storm.h5')), 'w') as h5file:
+        for row in rows:
+            update_catalog(h5file, row)
+        update_catalog(h5file, rows[0])
+        catalog = Catalog(read_catalog(h5file))
+        assert len(catalog) == 3
+        assert catalog.select(tester_name='Oryx') == ['dev0', 'dev2']
+        assert catalog.select(failed=True) == ['dev1']
+        assert catalog.row('dev1').failure_current == 0.2
+        assert catalog.select(catalog.table.has_leakage_evolution,
+                              tester_name=['Oryx', 'LAAS']) == ['dev0']
+        assert catalog.select(max_current=(0.3, None), pulses_nb=3) == \
+            ['dev0', 'dev1', 'dev2']
+        group = h5file.create_group('dev3')
+        group['tlp_curve'] = tlp_curve
+        group.attrs['tester_name'] = 'LAAS'
+        h5file.create_group(PENDING_PREFIX + 'dev4')
+        rebuild_catalog(h5file)
+        assert sorted(h5file) == [CATALOG_NAME, PENDING_PREFIX + 'dev4',
+                                  'dev3']
+        assert list(read_catalog(h5file).name) == ['dev3']
+
+
+def test_record_experiment(tmpdir):
+    tlp_curve = np.array([[1, 2, 3], [0.1, 0.2, 0.3]])
+    with h5py.File(str(tmpdir.join('storm.h5')), 'w') as h5file:
+        for (name, pulses_nb) in (('eager', 3), ('deferred', 5),
+                                  ('old_deferred', None), ('no_pulses', 0)):
+            group = h5file.create_group(name)
+            group['tlp_curve'] = tlp_curve
+            group['leak_evol'] = [1, 1, 2]
+            group.attrs['tester_name'] = 'Oryx'
+            group.attrs['import_time'] = 1.5
+            if name == 'eager':
+                group['IVTime'] = np.zeros((3, 2, 4))
+            elif name != 'no_pulses':
+                group.attrs['deferred_pulses'] = True
+                if pulses_nb is not None:
+                    group.attrs['pulses_nb'] = pulses_nb
+            record_experiment(group)
+        recorded = read_catalog(h5file)
+        rebuild_catalog(h5file)
+        rebuilt = read_catalog(h5file)
+    # Insert and rebuild give the same rows (nan included)
+    assert repr(sorted(recorded.tolist())) == repr(sorted(rebuilt.tolist()))
+    assert list(recorded.name) == ['eager', 'deferred', 'old_deferred',
+                                   'no_pulses']
+    assert list(recorded.pulses_nb) == [3, 5, 3, 0]
+    assert list(recorded.has_transient_pulses) == [True, True, True, False]
+    assert list(recorded.failure_index) == [2, 2, 2, 2]
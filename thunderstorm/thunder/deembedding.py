@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Frequency domain de-embedding of the transient pulses.
+The voltage and current waveforms are measured at the tester side of
+the cables and probes, a linear 2-port network described by its
+S-parameters. The waveforms at the device side are obtained from the
+spectra of the measured waveforms through the inverse of the transfer
+(ABCD) matrix of the network:
+
+    [V_device, I_device] = ABCD^-1 [V_measured, I_measured]
+
+the current flowing from the tester to the device on both sides.
+"""
+from __future__ import division
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .pulses import as_ivtime
+
+# Frequency units and data formats of Touchstone files
+TOUCHSTONE_UNITS = {'HZ': 1, 'KHZ': 1e3, 'MHZ': 1e6, 'GHZ': 1e9}
+TOUCHSTONE_FORMATS = ('MA', 'DB', 'RI')
+
+
+class TwoPort(object):
+    """Linear 2-port network model
+
+    Parameters
+    ----------
+    frequencies: array
+        The nf increasing frequencies (Hz) of the model
+    s_params: array
+        (nf, 2, 2) complex S-parameters, port 1 being the tester side
+        and port 2 the device side
+    z0: float
+        Reference impedance of the S-parameters (Ohm)
+    min_transmission: float
+        Lower limit of the magnitude of S21 and S12 used to invert the
+        network, which bounds the amplification of the frequencies the
+        network blocks (noise, band above a low pass cut-off...)
+
+    Between two model frequencies the S-parameters are interpolated in
+    magnitude and phase, out of the model frequency range the closest
+    model values are used. The interpolated transfer coefficients are
+    kept for the last few (delta_f, length, min_transmission) used.
+    """
+    cache_size = 8
+
+    def __init__(self, frequencies, s_params, z0=50.0,
+                 min_transmission=1e-3):
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        s_params = np.asarray(s_params, dtype=np.complex128)
+        if s_params.shape != frequencies.shape + (2, 2):
+            raise ValueError("S-parameters of shape %s for %i frequencies, "
+                             "(%i, 2, 2) expected"
+                             % (s_params.shape, frequencies.size,
+                                frequencies.size))
+        if frequencies.ndim != 1 or (np.diff(frequencies) <= 0).any():
+            raise ValueError("Frequencies must be a 1D increasing array")
+        self.frequencies = frequencies
+        self.s_params = s_params
+        self.z0 = z0
+        self.min_transmission = min_transmission
+        self._coefficients = OrderedDict()
+
+    def __repr__(self):
+        return ("TwoPort(%i frequencies from %g Hz to %g Hz, z0=%g)"
+                % (self.frequencies.size, self.frequencies[0],
+                   self.frequencies[-1], self.z0))
+
+    @classmethod
+    def from_touchstone(cls, file_name, min_transmission=1e-3):
+        """Return the TwoPort of a Touchstone (.s2p) file"""
+        with open(file_name) as s2p_file:
+            (frequencies, s_params, z0) = parse_touchstone(s2p_file.read())
+        return cls(frequencies, s_params, z0, min_transmission)
+
+    def interpolate(self, frequencies):
+        """Return the (len(frequencies), 2, 2) S-parameters
+        at frequencies
+        """
+        s_params = self.s_params.reshape(-1, 4)
+        magnitude = np.abs(s_params)
+        phase = np.unwrap(np.angle(s_params), axis=0)
+        values = np.empty((len(frequencies), 4), np.complex128)
+        for idx in range(4):
+            values[:, idx] = (
+                np.interp(frequencies, self.frequencies, magnitude[:, idx])
+                * np.exp(1j * np.interp(frequencies, self.frequencies,
+                                        phase[:, idx])))
+        return values.reshape(-1, 2, 2)
+
+    def deembedding_coefficients(self, delta_f, length):
+        """Return the (2, 2, length) inverse transfer matrix at the
+        frequencies k * delta_f, k in range(length)
+        """
+        key = (delta_f, length, self.min_transmission)
+        coefficients = self._coefficients.pop(key, None)
+        if coefficients is None:
+            coefficients = _inverse_abcd(
+                self.interpolate(np.arange(length) * delta_f), self.z0,
+                self.min_transmission)
+            while len(self._coefficients) >= self.cache_size:
+                self._coefficients.popitem(last=False)
+        self._coefficients[key] = coefficients  # most recently used
+        return coefficients
+
+
+def _inverse_abcd(s_params, z0, min_transmission=0.0):
+    """Return the (2, 2, nf) inverse of the ABCD matrix of the
+    (nf, 2, 2) S-parameters, the magnitude of S21 and S12 being
+    raised to min_transmission
+    A ValueError is raised if the matrix cannot be inverted.
+    """
+    s11 = s_params[:, 0, 0]
+    s12 = _limit_magnitude(s_params[:, 0, 1], min_transmission)
+    s21 = _limit_magnitude(s_params[:, 1, 0], min_transmission)
+    s22 = s_params[:, 1, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = ((1 + s11) * (1 - s22) + s12 * s21) / (2 * s21)
+        b = z0 * ((1 + s11) * (1 + s22) - s12 * s21) / (2 * s21)
+        c = ((1 - s11) * (1 - s22) - s12 * s21) / (2 * s21 * z0)
+        d = ((1 - s11) * (1 + s22) + s12 * s21) / (2 * s21)
+        det = a * d - b * c
+        inverse = np.array(((d, -b), (-c, a))) / det
+    if not np.isfinite(inverse).all():
+        raise ValueError("The 2-port network cannot be inverted, it does "
+                         "not transmit some frequencies (use a "
+                         "min_transmission > 0)")
+    return inverse
+
+
+def _limit_magnitude(values, minimum):
+    """Return the complex values with a magnitude of at least minimum,
+    keeping their phase
+    """
+    small = np.abs(values) < minimum
+    if small.any():
+        values = values.copy()
+        values[small] = minimum * np.exp(1j * np.angle(values[small]))
+    return values
+
+
+def parse_touchstone(text):
+    """Return (frequencies, s_params, z0) of a 2-port Touchstone file
+    content, see TwoPort for their description
+    """
+    (unit, data_format, z0) = ('GHZ', 'MA', 50.0)
+    values = []
+    for line in text.splitlines():
+        line = line.split('!', 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith('#'):
+            options = line[1:].upper().split()
+            for (idx, option) in enumerate(options):
+                if option in TOUCHSTONE_UNITS:
+                    unit = option
+                elif option in TOUCHSTONE_FORMATS:
+                    data_format = option
+                elif option == 'R':
+                    z0 = float(options[idx + 1])
+                elif option in ('Y', 'Z', 'H', 'G'):
+                    raise ValueError("Only S-parameters are supported, "
+                                     "not %s-parameters" % option)
+            continue
+        values.extend(float(value) for value in line.split())
+    if len(values) % 9:
+        raise ValueError("A 2-port Touchstone file must have 9 values per "
+                         "frequency, %i values found" % len(values))
+    values = np.array(values).reshape(-1, 9)
+    frequencies = values[:, 0] * TOUCHSTONE_UNITS[unit]
+    (first, second) = (values[:, 1::2], values[:, 2::2])
+    if data_format == 'RI':
+        s_params = first + 1j * second
+    else:
+        if data_format == 'DB':
+            first = 10 ** (first / 20)
+        s_params = first * np.exp(1j * np.radians(second))
+    # Touchstone 2-port order is S11, S21, S12, S22
+    s_params = s_params[:, [0, 2, 1, 3]].reshape(-1, 2, 2)
+    return (frequencies, s_params, z0)
+
+
+def deembed(pulses, model, workers=None):
+    """Return the IVTime of the pulses at the device side of model
+
+    Parameters
+    ----------
+    pulses: IVTime or H5IVTime
+        The waveforms measured at the tester side (port 1) of model
+    model: TwoPort
+        The cables and probes between the tester and the device
+    workers: int
+        Number of FFT threads (see transforms.DEFAULT_WORKERS)
+
+    The waveforms of all the pulses are transformed at once, then
+    corrected in the frequency domain.
+    """
+    pulses = as_ivtime(pulses)
+    spectra = pulses.to_freq_with(workers)
+    coefficients = model.deembedding_coefficients(spectra.delta_f,
+                                                  spectra.pulses_length)
+    coefficients = coefficients[:, :, np.newaxis, :]  # same for all pulses
+    (voltage, current) = (spectra._block[0], spectra._block[1])
+    spectra._block = np.array(
+        (coefficients[0, 0] * voltage + coefficients[0, 1] * current,
+         coefficients[1, 0] * voltage + coefficients[1, 1] * current))
+    device = spectra.to_time_with(workers)
+    device.offsets_t = pulses.offsets_t
+    return device
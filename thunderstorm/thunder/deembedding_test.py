@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing deembedding.py
+"""
+
+import numpy as np
+import pytest
+
+from .pulses import IVTime
+from .deembedding import TwoPort, deembed
+
+S2P = """! 50 Ohm line, 1 ns delay, 6 dB attenuation
+# MHz S DB R 50
+0    -200 0  -6.0206 0     -6.0206 0     -200 0
+500  -200 0  -6.0206 -180  -6.0206 -180  -200 0
+1000 -200 0  -6.0206 0     -6.0206 0     -200 0
+"""
+
+
+def _line(delay, gain=1.0, max_freq=1e9, points=201):
+    """Matched line of the given delay"""
+    frequencies = np.linspace(0, max_freq, points)
+    s_params = np.zeros((points, 2, 2), np.complex128)
+    s_params[:, 0, 1] = s_params[:, 1, 0] = \
+        gain * np.exp(-2j * np.pi * frequencies * delay)
+    return TwoPort(frequencies, s_params)
+
+
+def test_deembed():
+    time = np.arange(500) * 1e-9 / 2
+    voltage = np.array([np.exp(-((time - 60e-9) / (width * 1e-9)) ** 2)
+                        for width in (5, 10)])
+    pulses = IVTime.from_arrays(voltage, voltage / 50, 0.5e-9)
+    # Incident wave only, the device sees it 10 samples later
+    device = deembed(pulses, _line(5e-9))
+    assert np.allclose(device.voltage, np.roll(voltage, 10, -1), atol=1e-6)
+    assert np.allclose(device.current, device.voltage / 50, atol=1e-6)
+    assert device.delta_t == pulses.delta_t
+    # Attenuated by the cables
+    device = deembed(pulses, _line(0, 0.5))
+    assert np.allclose(device.voltage, voltage / 2, atol=1e-6)
+
+
+def test_blocked_band():
+    # Low pass line blocking the band above 400 MHz
+    frequencies = np.linspace(0, 1e9, 11)
+    s_params = np.zeros((11, 2, 2), np.complex128)
+    s_params[:, 0, 1] = s_params[:, 1, 0] = frequencies < 4.5e8
+    model = TwoPort(frequencies, s_params, min_transmission=1e-2)
+    coefficients = model.deembedding_coefficients(1e8, 11)
+    assert np.isfinite(coefficients).all()
+    # Voltage and current gains bounded in the blocked band
+    assert np.abs(coefficients[0, 0]).max() < 1 / model.min_transmission
+    assert np.abs(coefficients[1, 1]).max() < 1 / model.min_transmission
+    assert np.allclose(coefficients[:, :, :5],
+                       np.eye(2)[:, :, np.newaxis])
+    time = np.arange(200) * 1e-9 / 2
+    voltage = np.exp(-((time - 50e-9) / 5e-9) ** 2)[np.newaxis]
+    pulses = IVTime.from_arrays(voltage, voltage / 50, 0.5e-9)
+    device = deembed(pulses, model)
+    assert np.isfinite(device.voltage).all()
+    assert np.isfinite(device.current).all()
+    # Coefficients of a different min_transmission are not reused
+    model.min_transmission = 1e-3
+    bounded = model.deembedding_coefficients(1e8, 11)
+    assert np.abs(bounded[0, 0]).max() > 1 / 1e-2
+    assert np.abs(bounded[0, 0]).max() < 1 / 1e-3
+    model.min_transmission = 0
+    with pytest.raises(ValueError):
+        model.deembedding_coefficients(1e8, 11)
+    model.min_transmission = 1e-2
+    assert model.deembedding_coefficients(1e8, 11) is coefficients
+
+
+def test_touchstone(tmpdir):
+    s2p_name = str(tmpdir.join('line.s2p'))
+    with open(s2p_name, 'w') as s2p_file:
+        s2p_file.write(S2P)
+    model = TwoPort.from_touchstone(s2p_name)
+    assert model.z0 == 50
+    assert np.allclose(model.frequencies, (0, 5e8, 1e9))
+    assert np.allclose(model.s_params[1], [[0, -0.5], [-0.5, 0]])
+    coefficients = model.deembedding_coefficients(5e8, 3)
+    assert model.deembedding_coefficients(5e8, 3) is coefficients
+    assert np.allclose(coefficients[:, :, 1], [[-1.25, 37.5],
+                                               [0.015, -1.25]])
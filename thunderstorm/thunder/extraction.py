@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Quasi-static TLP curve extraction from the transient pulses.
+Each point of a TLP curve is the voltage and the current averaged over
+a time window of the corresponding pulse, usually towards the end of
+the pulse once the device is settled. The statistics of all the pulses
+are computed at once, one array reduction per quantity, so that the
+TLP curve of a measurement can be extracted again with another window
+without looping over the pulses.
+"""
+from __future__ import division
+
+import numpy as np
+
+from .tlp import TLPcurve
+
+STATISTICS = ('mean', 'median', 'std')
+
+# Tolerance (in samples) so that a window bound falling on a sample,
+# up to the rounding of the time values, includes this sample
+_BOUND_TOLERANCE = 1e-6
+
+
+def window_bounds(pulses_length, delta_t, offsets_t, window):
+    """Return the (first, stop) sample indexes of the window of each
+    pulse
+
+    Parameters
+    ----------
+    pulses_length: int
+    delta_t: float
+        Time between two samples
+    offsets_t: array
+        Time of the first sample of each pulse
+    window: (float, float)
+        (start, stop) times of the window, both included, in the time
+        reference of the pulses (time of sample j of pulse i is
+        offsets_t[i] + j * delta_t)
+
+    Returns
+    -------
+    (first, stop) int arrays, the window of pulse i being samples
+    first[i] to stop[i] - 1 (first[i] == stop[i] if it is empty)
+    """
+    (start, stop) = window
+    if stop < start:
+        raise ValueError("Window stop %r is before its start %r"
+                         % (stop, start))
+    offsets_t = np.asarray(offsets_t, dtype=np.float64)
+    first = np.ceil((start - offsets_t) / delta_t - _BOUND_TOLERANCE)
+    last = np.floor((stop - offsets_t) / delta_t + _BOUND_TOLERANCE)
+    first = np.clip(first, 0, pulses_length).astype(np.intp)
+    stop = np.clip(last + 1, first, pulses_length).astype(np.intp)
+    return (first, stop)
+
+
+def _masked_statistics(data, mask, count, statistics):
+    """Return the statistics of the rows of data over the samples
+    selected by mask, count being the number of selected samples
+    of each row
+    """
+    results = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(mask, data, 0).sum(axis=-1) / count
+        if 'mean' in statistics:
+            results['mean'] = mean
+        if 'std' in statistics:
+            deviation = np.where(mask, data - mean[:, np.newaxis], 0)
+            results['std'] = np.sqrt((deviation ** 2).sum(axis=-1) / count)
+    if 'median' in statistics:
+        # Samples out of the window are sorted at the end of each row
+        ordered = np.sort(np.where(mask, data, np.inf), axis=-1)
+        low = np.maximum((count - 1) // 2, 0)[:, np.newaxis]
+        high = np.maximum(count // 2, 0)[:, np.newaxis]
+        median = (np.take_along_axis(ordered, low, axis=-1)
+                  + np.take_along_axis(ordered, high, axis=-1))[:, 0] / 2
+        results['median'] = np.where(count > 0, median, np.nan)
+    return results
+
+
+def _statistics(data, statistics):
+    """Return the statistics of the rows of data"""
+    functions = {'mean': np.mean, 'median': np.median, 'std': np.std}
+    with np.errstate(invalid='ignore'):
+        return dict((name, functions[name](data, axis=-1))
+                    for name in statistics)
+
+
+def window_statistics(pulses, window, statistics=STATISTICS):
+    """Compute the voltage and current statistics of each pulse over
+    a time window
+
+    Parameters
+    ----------
+    pulses: IVTime or H5IVTime
+        The transient pulses, only the samples that fall in the window
+        of at least one pulse are read
+    window: (float, float)
+        (start, stop) times of the window, see window_bounds
+    statistics: sequence of string
+        Statistics to compute, among STATISTICS
+        (std is the population standard deviation)
+
+    Returns
+    -------
+    A dictionary giving for each statistic a (2, pulses_nb) array,
+    voltage first then current like the TLP curve of a RawTLPdata.
+    Pulses without any sample in the window get NaN.
+    """
+    unknown = set(statistics) - set(STATISTICS)
+    if unknown:
+        raise ValueError("Unknown statistics %s, must be among %s"
+                         % (", ".join(sorted(unknown)),
+                            ", ".join(STATISTICS)))
+    pulses_nb = pulses.pulses_nb
+    (first, stop) = window_bounds(pulses.pulses_length, pulses.delta_t,
+                                  pulses.offsets_t, window)
+    count = stop - first
+    if pulses_nb == 0 or not count.any():
+        return dict((name, np.full((2, pulses_nb), np.nan))
+                    for name in statistics)
+    (low, high) = (first.min(), stop.max())
+    (voltage, current) = pulses.read_iv(samples=slice(low, high))
+    # Window of each pulse gathered at the start of its row
+    width = count.max()
+    position = np.arange(width)
+    gather = np.minimum((first - low)[:, np.newaxis] + position,
+                        high - low - 1)
+    windows = [np.take_along_axis(np.asarray(data, dtype=np.float64),
+                                  gather, axis=-1)
+               for data in (voltage, current)]
+    if (count == width).all():
+        results = [_statistics(data, statistics) for data in windows]
+    else:
+        mask = position < count[:, np.newaxis]
+        results = [_masked_statistics(data, mask, count, statistics)
+                   for data in windows]
+    return dict((name, np.vstack((results[0][name], results[1][name])))
+                for name in statistics)
+
+
+def extract_tlp_curve(pulses, window, statistic='mean'):
+    """Return the TLPcurve made of the statistic (see STATISTICS) of
+    the voltage and the current of each pulse over window
+    (see window_statistics)
+    """
+    if statistic not in STATISTICS:
+        raise ValueError("Unknown statistic %r, must be among %s"
+                         % (statistic, ", ".join(STATISTICS)))
+    (voltage, current) = window_statistics(pulses, window,
+                                           (statistic,))[statistic]
+    return TLPcurve(current, voltage)
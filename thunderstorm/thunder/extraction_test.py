@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing extraction.py
+"""
+
+import numpy as np
+import h5py
+
+from .pulses import IVTime
+from .tlp import H5IVTime
+from .extraction import window_bounds, window_statistics, extract_tlp_curve
+
+
+def _pulses():
+    rand = np.random.RandomState(0)
+    voltage = rand.normal(size=(6, 50))
+    current = rand.normal(size=(6, 50))
+    offsets_t = np.array([0, 0, 2, -3, 10, 100]) * 1e-9
+    return IVTime.from_arrays(voltage, current, 1e-9, offsets_t)
+
+
+def test_window_bounds():
+    (first, stop) = window_bounds(50, 1e-9, _pulses().offsets_t,
+                                  (20e-9, 30e-9))
+    assert np.array_equal(first, [20, 20, 18, 23, 10, 0])
+    assert np.array_equal(stop, [31, 31, 29, 34, 21, 0])
+
+
+def test_window_statistics(tmpdir):
+    pulses = _pulses()
+    (first, stop) = window_bounds(50, 1e-9, pulses.offsets_t,
+                                  (20e-9, 30e-9))
+    expected = {}
+    for (name, function) in (('mean', np.mean), ('median', np.median),
+                             ('std', np.std)):
+        expected[name] = np.full((2, 6), np.nan)
+        for idx in range(5):
+            for (pos, data) in enumerate((pulses.voltage, pulses.current)):
+                expected[name][pos, idx] = function(
+                    data[idx, first[idx]:stop[idx]])
+    h5file = h5py.File(str(tmpdir.join('pulses.h5')), 'w')
+    stored = H5IVTime(h5file.create_group('exp'))
+    stored.import_ivtime(pulses)
+    for source in (pulses, stored, pulses.astype('int16')):
+        results = window_statistics(source, (20e-9, 30e-9))
+        for name in expected:
+            assert np.allclose(results[name], expected[name],
+                               atol=1e-3, equal_nan=True)
+    h5file.close()
+    curve = extract_tlp_curve(pulses, (20e-9, 30e-9), 'median')
+    assert np.allclose(curve.voltage[0][:5], expected['median'][0][:5])
+    # Without offsets all the pulses share the same window
+    pulses.offsets_t = np.zeros(6)
+    curve = extract_tlp_curve(pulses, (20e-9, 30e-9))
+    assert np.allclose(curve.current[0], pulses.current[:, 20:31].mean(1))
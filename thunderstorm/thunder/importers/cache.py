@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Import cache.
+Parsing tester text files is slow, the parsed data (RawTLPdata) are
+therefore kept in a cache directory as .npz files. A cache entry is
+identified by the fingerprint (size, modification time and content
+hash) of all the files of a measurement so that a modified file is
+always imported again.
+The least recently used entries are removed when the cache grows
+bigger than its maximum size.
+Several processes can share a cache directory: entries are written
+to a temporary file then moved in place, and entries removed by
+another process are ignored.
+"""
+
+import os
+import errno
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+
+from ..tlp import RawTLPdata
+from ..pulses import IVTime, LazyIVTime
+
+CACHE_FORMAT_VERSION = 3
+
+
+def _remove(path):
+    """Remove path, it may already have been removed by another process
+    """
+    try:
+        os.remove(path)
+    except OSError as error:
+        if error.errno != errno.ENOENT:
+            raise
+
+
+def _pack_curves(curves):
+    """Return (values, lengths) of a sequence of (columns, length) curves
+    of different lengths, curves being concatenated along their length
+    """
+    lengths = np.array([curve.shape[-1] for curve in curves], dtype=np.intp)
+    return (np.concatenate(curves, axis=-1), lengths)
+
+
+def _unpack_curves(values, lengths):
+    """Return the object array of curves packed by _pack_curves"""
+    curves = np.empty(len(lengths), dtype=object)
+    for (idx, curve) in enumerate(np.split(values, np.cumsum(lengths)[:-1],
+                                           axis=-1)):
+        curves[idx] = curve
+    return curves
+
+
+class ImportCache(object):
+    """Cache of imported RawTLPdata in directory
+    max_size is the maximum size of the cache in bytes
+    """
+    def __init__(self, directory=None, max_size=2 ** 30):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'),
+                                     '.thunderstorm', 'import_cache')
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.max_size = max_size
+
+    def __repr__(self):
+        return "ImportCache(%r, max_size=%i)" % (self.directory,
+                                                 self.max_size)
+
+    @staticmethod
+    def fingerprint(plugin_label, file_names):
+        """Return the cache key of the measurement made of file_names
+        imported with the plugin_label plugin
+        """
+        key = hashlib.sha1()
+        key.update(("%s %s" % (CACHE_FORMAT_VERSION,
+                               plugin_label)).encode('utf-8'))
+        for file_name in sorted(file_names):
+            stat = os.stat(file_name)
+            key.update(("%s %i %r" % (os.path.basename(file_name),
+                                      stat.st_size,
+                                      stat.st_mtime)).encode('utf-8'))
+            with open(file_name, 'rb') as data_file:
+                for block in iter(lambda: data_file.read(2 ** 20), b''):
+                    key.update(block)
+        return key.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def get(self, key, file_path):
+        """Return the cached RawTLPdata for key or None if not in cache
+        file_path is the original file path given to the RawTLPdata
+        """
+        entry_path = self._entry_path(key)
+        try:
+            entry_file = open(entry_path, 'rb')
+        except IOError:
+            return None  # not cached, or just evicted by another process
+        try:
+            with entry_file, np.load(entry_file) as entry:
+                block = entry['pulses']
+                iv_leak = entry['iv_leak']
+                if 'iv_leak_lengths' in entry:
+                    iv_leak = _unpack_curves(iv_leak,
+                                             entry['iv_leak_lengths'])
+                pulses = IVTime.from_arrays(block[0], block[1],
+                                            delta_t=float(entry['delta_t']),
+                                            offsets_t=entry['offsets_t'],
+                                            valim=entry['valim'])
+                raw_data = RawTLPdata(str(entry['device_name']), pulses,
+                                      iv_leak,
+                                      entry['tlp_curve'],
+                                      entry['leak_evol'],
+                                      os.path.realpath(file_path),
+                                      tester_name=str(entry['tester_name']))
+        except Exception:
+            log = logging.getLogger('thunderstorm.thunder.importers')
+            log.warn("Corrupted import cache entry %s removed" % entry_path)
+            _remove(entry_path)
+            return None
+        # Modification time is used as last access time for LRU eviction
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass  # evicted by another process meanwhile
+        return raw_data
+
+    def put(self, key, raw_data):
+        """Store raw_data in the cache under key"""
+        pulses = raw_data.pulses
+        if isinstance(pulses, LazyIVTime) and not pulses.loaded:
+            # Curve only imports are fast, waveforms are not decoded
+            # just to be cached
+            return
+        leak_evol = raw_data.leak_evol
+        iv_leak = raw_data.iv_leak
+        extra = {}
+        if iv_leak is None:
+            iv_leak = np.array([])
+        elif (isinstance(iv_leak, np.ndarray) and iv_leak.dtype != object):
+            iv_leak = np.asarray(iv_leak)
+        else:
+            # Leakage curves of different lengths (e.g. Oryx .ctr files)
+            (iv_leak, extra['iv_leak_lengths']) = _pack_curves(
+                [np.asarray(curve) for curve in iv_leak])
+        (handle, tmp_path) = tempfile.mkstemp(suffix='.tmp',
+                                              dir=self.directory)
+        try:
+            with os.fdopen(handle, 'wb') as entry_file:
+                np.savez(entry_file,
+                         pulses=pulses._float_block(),
+                         valim=pulses.valim,
+                         delta_t=pulses.delta_t,
+                         offsets_t=pulses.offsets_t,
+                         tlp_curve=raw_data.tlp_curve,
+                         leak_evol=[] if leak_evol is None else leak_evol,
+                         iv_leak=iv_leak,
+                         device_name=raw_data.device_name,
+                         tester_name=str(raw_data.tester_name),
+                         **extra)
+            os.replace(tmp_path, self._entry_path(key))
+        except Exception:
+            _remove(tmp_path)
+            raise
+        self.evict()
+
+    @property
+    def size(self):
+        """Total size of the cache entries in bytes"""
+        return sum(size for (_, size, _) in self._entries())
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # removed by another process
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries until the cache size is
+        below max_size
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total_size = sum(size for (_, size, _) in entries)
+        for (path, size, _) in entries:
+            if total_size <= self.max_size:
+                break
+            _remove(path)
+            total_size -= size
+
+    def clear(self):
+        """Remove all the cache entries"""
+        for (path, _, _) in self._entries():
+            _remove(path)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing cache.py
+"""
+
+import os
+
+import numpy as np
+
+from ..pulses import IVTime
+from ..tlp import RawTLPdata
+from .cache import ImportCache
+
+
+def _raw_data(file_name, iv_leak):
+    block = np.random.rand(2, 3, 20)
+    pulses = IVTime.from_arrays(block[0], block[1], delta_t=1e-9,
+                                offsets_t=np.arange(3.), valim=[1, 2, 3])
+    return RawTLPdata('dev', pulses, iv_leak, np.random.rand(2, 3),
+                      np.random.rand(3), file_name, tester_name='Oryx')
+
+
+def test_fingerprint(tmpdir):
+    data_file = tmpdir.join('dev.tsr')
+    data_file.write_binary(b'data')
+    key = ImportCache.fingerprint('Oryx', [str(data_file)])
+    assert key == ImportCache.fingerprint('Oryx', [str(data_file)])
+    assert key != ImportCache.fingerprint('SERMA', [str(data_file)])
+    data_file.write_binary(b'other')
+    assert key != ImportCache.fingerprint('Oryx', [str(data_file)])
+
+
+def test_round_trip(tmpdir):
+    cache = ImportCache(str(tmpdir.mkdir('cache')))
+    assert cache.get('missing', 'dev.tsr') is None
+    curves = np.empty(2, dtype=object)
+    curves[0] = np.random.rand(2, 5)
+    curves[1] = np.random.rand(2, 7)
+    for (key, iv_leak) in (('equal', np.random.rand(3, 2, 5)),
+                           ('unequal', curves)):
+        raw_data = _raw_data(str(tmpdir.join('dev.tsr')), iv_leak)
+        cache.put(key, raw_data)
+        cached = cache.get(key, str(tmpdir.join('dev.tsr')))
+        for name in ('voltage', 'current', 'valim', 'offsets_t'):
+            assert np.array_equal(getattr(cached.pulses, name),
+                                  getattr(raw_data.pulses, name))
+        assert np.array_equal(cached.tlp_curve, raw_data.tlp_curve)
+        assert len(cached.iv_leak) == len(iv_leak)
+        for (cached_curve, curve) in zip(cached.iv_leak, iv_leak):
+            assert np.array_equal(cached_curve, curve)
+    assert sorted(os.listdir(cache.directory)) == ['equal.npz',
+                                                   'unequal.npz']
+
+
+def test_eviction(tmpdir):
+    cache = ImportCache(str(tmpdir.mkdir('cache')))
+    raw_data = _raw_data(str(tmpdir.join('dev.tsr')), [])
+    for (idx, key) in enumerate(('first', 'second', 'third')):
+        cache.put(key, raw_data)
+        path = os.path.join(cache.directory, key + '.npz')
+        os.utime(path, (idx, idx))
+    entry_size = cache.size // 3
+    cache.get('first', 'dev.tsr')  # most recently used
+    cache.max_size = 2 * entry_size
+    cache.evict()
+    assert sorted(os.listdir(cache.directory)) == ['first.npz',
+                                                   'third.npz']
+
+
+def test_shared_directory(tmpdir):
+    cache = ImportCache(str(tmpdir.mkdir('cache')), max_size=0)
+    raw_data = _raw_data(str(tmpdir.join('dev.tsr')), [])
+    entries = cache._entries
+    # Entries removed by another process while evicting
+    cache._entries = lambda: [(os.path.join(cache.directory, 'gone.npz'),
+                               10, 0)] + entries()
+    cache.put('key', raw_data)
+    assert os.listdir(cache.directory) == []
+    assert cache.get('gone', 'dev.tsr') is None
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Fast parsing of the numeric blocks found in tester files.
+Tester files are mostly made of a few header lines followed by
+a block of numbers with a fixed number of columns. Such a block is
+converted in one vectorized call instead of going line by line.
+"""
+
+import warnings
+import multiprocessing
+
+import numpy as np
+
+
+def _block_bounds(raw, newline, skip_header, skip_footer):
+    """Return the start and end positions of the numeric block
+    Trailing blank lines are never part of the block.
+    """
+    start = 0
+    for _ in range(skip_header):
+        start = raw.find(newline, start) + 1
+        if start == 0:
+            return (0, 0)
+    end = len(raw.rstrip())
+    for _ in range(skip_footer):
+        end = raw.rfind(newline, start, end)
+        if end == -1:
+            return (0, 0)
+    return (start, end)
+
+
+def _block_shape(block, delimiter, first_line=1):
+    """Return (rows_nb, cols_nb) of the numeric bytes block
+    Raise ValueError if a line does not have as many columns as the
+    first one, first_line being the line number of the block in the file
+    """
+    chars = np.frombuffer(block, np.uint8)
+    if delimiter is None:
+        # A column starts at each character following a blank one
+        # (space, tab, end of line...)
+        blank = chars <= ord(b' ')
+        starts = ~blank
+        starts[1:] &= blank[:-1]
+        marks = np.flatnonzero(starts)
+        extra = 0
+    else:
+        marks = np.flatnonzero(chars == ord(delimiter))
+        extra = 1
+    line_ends = np.r_[np.flatnonzero(chars == ord(b'\n')), chars.size]
+    rows_nb = line_ends.size
+    marks_nb = int(np.searchsorted(marks, line_ends[0]))  # first line
+    if marks.size != rows_nb * marks_nb:
+        valid = False
+    elif marks_nb == 0:
+        valid = True
+    else:
+        # The marks of each line must all be in this line
+        marks = marks.reshape(rows_nb, marks_nb)
+        line_starts = np.r_[-1, line_ends[:-1]]
+        valid = ((marks[:, 0] > line_starts)
+                 & (marks[:, -1] < line_ends)).all()
+    cols_nb = marks_nb + extra
+    if not valid:
+        columns = np.diff(np.searchsorted(marks.ravel(),
+                                          np.r_[0, line_ends])) + extra
+        wrong = np.flatnonzero(columns != cols_nb)[0]
+        raise ValueError("Wrong numeric block: %i columns at line %i, "
+                         "%i expected" % (columns[wrong], first_line + wrong,
+                                          cols_nb))
+    return (rows_nb, cols_nb)
+
+
+def parse_numeric_block(raw, delimiter=',', skip_header=0, skip_footer=0,
+                        usecols=None):
+    """Convert a block of numbers to a 2D array
+
+    Parameters
+    ----------
+    raw: bytes or string
+        The file content, as read from a file, zip or tar member
+    delimiter: string
+        Column delimiter (a single character), None for any whitespace
+    skip_header: int
+        Number of lines to skip at the beginning of raw
+    skip_footer: int
+        Number of lines to skip at the end of raw
+        (trailing blank lines are not counted)
+    usecols: sequence of int
+        Columns to return, all columns if None
+
+    Returns
+    -------
+    A (rows, columns) float array like numpy.loadtxt would do.
+    Raise ValueError if the block is not made of numbers with a
+    constant number of columns.
+    """
+    if not isinstance(raw, bytes):
+        raw = raw.encode('utf-8')
+    if delimiter is not None:
+        delimiter = delimiter.encode('ascii')
+    (start, end) = _block_bounds(raw, b'\n', skip_header, skip_footer)
+    block = raw[start:end]
+    first_line = block.split(b'\n', 1)[0]
+    if not first_line.strip():
+        return np.empty((0, 0 if delimiter is None
+                         else first_line.count(delimiter) + 1))
+    (rows_nb, cols_nb) = _block_shape(block, delimiter,
+                                      raw.count(b'\n', 0, start) + 1)
+    if delimiter is not None:
+        block = block.replace(delimiter, b' ')
+    with warnings.catch_warnings():
+        # numpy stops at the first value that is not a number
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            data = np.fromstring(block, sep=' ')
+        except (DeprecationWarning, ValueError):
+            data = None
+    if data is None or data.size != rows_nb * cols_nb:
+        raise ValueError("Wrong numeric block: values that are not "
+                         "numbers in %i rows of %i columns"
+                         % (rows_nb, cols_nb))
+    data = data.reshape(rows_nb, cols_nb)
+    if usecols is not None:
+        data = data[:, list(usecols)]
+    return data
+
+
+def parallel_decode(decoder, raw_items, workers=None):
+    """Yield decoder(raw) for each raw item, in the order of raw_items
+
+    Parameters
+    ----------
+    decoder: function
+        Module level function (it must be picklable) converting
+        one raw item to an array
+    raw_items: iterable
+        The raw items, typically the bytes of the waveform files.
+        They are produced sequentially in the calling process.
+    workers: int
+        Number of decoding processes. If None or 1 decoding is done
+        in the calling process.
+    """
+    if workers is None or workers <= 1:
+        for raw in raw_items:
+            yield decoder(raw)
+        return
+    pool = multiprocessing.Pool(workers)
+    try:
+        for data in pool.imap(decoder, raw_items, chunksize=4):
+            yield data
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def stack_pulses(waveforms, pulses_nb):
+    """Stack decoded waveforms in a preallocated pulses array
+
+    Parameters
+    ----------
+    waveforms: iterable
+        (time, voltage, current) arrays, one per pulse, in pulse order
+    pulses_nb: int
+        Number of waveforms
+
+    Returns
+    -------
+    (pulses, delta_t, offsets_t) with pulses of shape
+    (2, pulses_nb, pulses_length), voltage first then current.
+    Times are in the unit of the tester files.
+    """
+    pulses = np.empty((2, pulses_nb, 0))
+    offsets_t = np.zeros(pulses_nb)
+    delta_t = 0
+    for idx, waveform in enumerate(waveforms):
+        if idx == 0:
+            pulses = np.empty((2, pulses_nb, waveform.shape[1]))
+            delta_t = waveform[0][1] - waveform[0][0]
+        pulses[:, idx] = waveform[1:3]
+        offsets_t[idx] = waveform[0][0]
+    return (pulses, delta_t, offsets_t)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Testing parsing.py
+"""
+
+import numpy as np
+
+from .parsing import parse_numeric_block, parallel_decode, stack_pulses
+
+
+def test_csv_with_header_and_footer():
+    raw = b'head 1\r\nhead 2\r\n0,1.5,-2\r\n1,2.5e-3,3\r\n[EOF]\r\n\r\n'
+    data = parse_numeric_block(raw, skip_header=2, skip_footer=1)
+    assert np.allclose(data, [[0, 1.5, -2], [1, 2.5e-3, 3]])
+    data = parse_numeric_block(raw, skip_header=2, skip_footer=1,
+                               usecols=(0, 2))
+    assert np.allclose(data, [[0, -2], [1, 3]])
+
+
+def test_whitespace_text():
+    raw = u'1\t2  3\n4 5 6\n'
+    data = parse_numeric_block(raw, delimiter=None)
+    assert data.shape == (2, 3)
+    assert np.allclose(data[1], [4, 5, 6])
+
+
+def test_empty_block():
+    assert parse_numeric_block(b'header\r\n', skip_header=1).size == 0
+
+
+def test_wrong_block():
+    for (raw, delimiter) in ((b'1,2\n3\n', ','), (b'1,2\n3,x\n', ','),
+                             # bad token after a number
+                             (b'1,2\n3,4e\n', ','),
+                             (u'1,2\r\n3,4e\r\n', ','),
+                             # short and long rows with the right size
+                             (b'1,2\n3\n4,5,6\n', ','),
+                             (b'1 2\n3\n4 5  6\n', None),
+                             (b'1 2\n3 4\n\n5 6\n', None)):
+        try:
+            parse_numeric_block(raw, delimiter)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("ValueError expected for %r" % raw)
+    try:
+        parse_numeric_block(b'head\n1,2\n3,4\n5\n6,7,8\n', skip_header=1)
+    except ValueError as error:
+        assert 'line 4' in str(error)
+    else:
+        raise AssertionError("ValueError expected")
+
+
+def test_parallel_decode():
+    raw_items = [(u'%i,%i,%i\n' % (idx, idx, -idx)) * 3
+                 for idx in range(10)]
+    sequential = list(parallel_decode(parse_numeric_block, raw_items))
+    parallel = list(parallel_decode(parse_numeric_block, raw_items, 2))
+    assert len(parallel) == 10
+    for seq_data, par_data in zip(sequential, parallel):
+        assert np.array_equal(seq_data, par_data)
+
+
+def test_stack_pulses():
+    time = np.arange(5) * 0.5
+    waveforms = [np.vstack((time + idx, time * idx, -time * idx))
+                 for idx in range(3)]
+    (pulses, delta_t, offsets_t) = stack_pulses(iter(waveforms), 3)
+    assert pulses.shape == (2, 3, 5)
+    assert np.allclose(pulses[0, 2], time * 2)
+    assert np.allclose(pulses[1, 2], -time * 2)
+    assert delta_t == 0.5
+    assert np.allclose(offsets_t, (0, 1, 2))
@@ -24,41 +24,46 @@
 import os
 import logging
 
-from .tools import ImportPlugin
+from .tools import ImportPlugin, existing_files
 from .util_barth import ReadBarth
 from ..tlp import RawTLPdata
 from ..pulses import IVTime
 
 
 class ImportBarth(ImportPlugin):
-    """Import data from Oryx TLP setup
+    """Import data from Barth TLP setup
     """
     label = "Barth"
     file_ext = "*.tlp"
+    signature = b"Version"
 
     def __init__(self):
         ImportPlugin.__init__(self)
 
-    def import_data(self, file_name):
+    def related_files(self, file_name):
+        base_name = file_name[:-4]
+        return existing_files((base_name + '.tlp', base_name + '.twf'))
+
+    def import_data(self, file_name, workers=None, lazy=False):
         """Import data
-        return a RawTLPdata instance"""
+        return a RawTLPdata instance
+        workers and lazy are not used, all the pulses are in a single
+        file that has to be parsed anyway"""
         log = logging.getLogger('thunderstorm.info')
         log.info("Importing Barth data...")
         file_path = os.path.realpath(file_name)
 
-        data = ReadBarth(file_name).data
-        if data['waveform available']:
-            pulses = IVTime(data['tlp_v_waveforms'].shape[0],
-                            data['tlp_v_waveforms'].shape[1],
-                            delta_t=data['delta_t'])
-            pulses.voltage = data['tlp_v_waveforms'].T
-            pulses.current = data['tlp_i_waveforms'].T
+        data = ReadBarth(file_name).data_to_num_array
+        if data['waveform_available']:
+            pulses = IVTime.from_arrays(data['tlp_pulses'][0],
+                                        data['tlp_pulses'][1],
+                                        delta_t=data['delta_t'])
         else:
             pulses = IVTime(0, data['tlp'].shape[1], delta_t=1)
-        if data['valim_tlp'] != []:
+        if len(data['valim_tlp']) == pulses.pulses_nb:
             pulses.valim = data['valim_tlp']
         tlp_curve = data['tlp']
-        iv_leak = []
+        iv_leak = data['leak_data']
         leak_evol = data['leak_evol']
         raw_data = RawTLPdata('not implemented', pulses, iv_leak,
                               tlp_curve, leak_evol, file_path,
@@ -24,10 +24,12 @@
 import os
 import logging
 
-from .tools import ImportPlugin
+import numpy as np
+
+from .tools import ImportPlugin, existing_files
 from .util_hanwa import ReadHanwa
 from ..tlp import RawTLPdata
-from ..pulses import IVTime
+from ..pulses import IVTime, LazyIVTime
 
 
 class ImportHanwa(ImportPlugin):
@@ -35,24 +37,36 @@ class ImportHanwa(ImportPlugin):
     """
     label = "HANWA"
     file_ext = "*.tcf"
+    signature = b"UserName="
 
     def __init__(self):
         ImportPlugin.__init__(self)
 
-    def import_data(self, file_name):
+    def related_files(self, file_name):
+        base_dir = os.path.dirname(file_name)
+        return existing_files([file_name] +
+                              [os.path.join(base_dir, name)
+                               for name in ('Result', 'Leak',
+                                            'OsilloV', 'OsilloI')])
+
+    def import_data(self, file_name, workers=None, lazy=False):
         """Import data
-        return a RawTLPdata instance"""
+        return a RawTLPdata instance
+        If lazy the waveforms are decoded on first access"""
         log = logging.getLogger('thunderstorm.info')
         log.info("Importing Hanwa data...")
         file_path = os.path.realpath(file_name)
-        alldata = ReadHanwa(file_name)
+        alldata = ReadHanwa(file_name, workers=workers, waveforms=not lazy)
         data = alldata.data_to_num_array
-        pulses = IVTime(data['tlp_pulses'].shape[2],
-                        data['tlp_pulses'].shape[1],
-                        delta_t=data['delta_t'])
-        pulses.voltage = data['tlp_pulses'][0]
-        pulses.current = data['tlp_pulses'][1]
-        pulses.valim = data['valim_tlp']
+        loader = data['pulses_loader']
+        valim = np.asarray(data['valim_tlp'], dtype=np.float64)
+        if lazy and loader is not None:
+            pulses = LazyIVTime(loader, loader.pulses_nb, valim)
+        else:
+            pulses = IVTime.from_arrays(data['tlp_pulses'][0],
+                                        data['tlp_pulses'][1],
+                                        delta_t=data['delta_t'],
+                                        valim=valim)
         tlp_curve = data['tlp']
         iv_leak = data['leak_data']
         leak_evol = data['leak_evol']
@@ -24,10 +24,12 @@
 import os
 import logging
 
-from .tools import ImportPlugin
+import numpy as np
+
+from .tools import ImportPlugin, existing_files
 from .util_hppi import ReadHPPI
 from ..tlp import RawTLPdata
-from ..pulses import IVTime
+from ..pulses import IVTime, LazyIVTime
 
 
 class ImportHPPI(ImportPlugin):
@@ -35,25 +37,51 @@ class ImportHPPI(ImportPlugin):
     """
     label = "HPPI"
     file_ext = "*.csv"
+    signature = b"Index,"
 
     def __init__(self):
         ImportPlugin.__init__(self)
 
-    def import_data(self, file_name):
+    @classmethod
+    def sniff(cls, file_name, head):
+        """SERMA main files look the same, HPPI measurements are
+        recognized by their wfm folder or transients archive
+        """
+        if not super(ImportHPPI, cls).sniff(file_name, head):
+            return False
+        names = os.listdir(os.path.dirname(file_name) or os.curdir)
+        if any(name in ('WFM', 'IV-FILE', 'Leak-Curve') for name in names):
+            return False
+        return any(name in ('wfm', 'HV-Pulse', 'transients.zip',
+                            'transients.tar.gz') for name in names)
+
+    def related_files(self, file_name):
+        base_dir = os.path.dirname(file_name)
+        return existing_files([file_name] +
+                              [os.path.join(base_dir, name)
+                               for name in ('wfm', 'HV-Pulse',
+                                            'transients.zip',
+                                            'transients.tar.gz')])
+
+    def import_data(self, file_name, workers=None, lazy=False):
         """Import data
-        return a RawTLPdata instance"""
+        return a RawTLPdata instance
+        If lazy the waveforms are decoded on first access"""
         log = logging.getLogger('thunderstorm.info')
         log.info("Importing HPPI data...")
         file_path = os.path.realpath(file_name)
-        alldata = ReadHPPI(file_name)
+        alldata = ReadHPPI(file_name, workers=workers, waveforms=not lazy)
         data = alldata.data_to_num_array
-        pulses = IVTime(data['tlp_pulses'].shape[2],
-                        data['tlp_pulses'].shape[1],
-                        delta_t=data['delta_t'],
-                        offsets_t=data['offsets_t'])
-        pulses.voltage = data['tlp_pulses'][0]
-        pulses.current = data['tlp_pulses'][1]
-        pulses.valim = data['valim_tlp']
+        loader = data['pulses_loader']
+        valim = np.asarray(data['valim_tlp'], dtype=np.float64)
+        if lazy and loader is not None:
+            pulses = LazyIVTime(loader, loader.pulses_nb, valim)
+        else:
+            pulses = IVTime.from_arrays(data['tlp_pulses'][0],
+                                        data['tlp_pulses'][1],
+                                        delta_t=data['delta_t'],
+                                        offsets_t=data['offsets_t'],
+                                        valim=valim)
         tlp_curve = data['tlp']
         iv_leak = data['leak_data']
         leak_evol = data['leak_evol']
@@ -35,12 +35,15 @@ class ImportLAAS(ImportPlugin):
     """
     label = "LAAS"
     file_ext = "*.mes"
+    signature = b"Identification :"
 
     def __init__(self):
         ImportPlugin.__init__(self)
 
-    def import_data(self, file_name):
-        """Import LAAS data"""
+    def import_data(self, file_name, workers=None, lazy=False):
+        """Import LAAS data
+        workers and lazy are not used, all the pulses are in a single
+        file that has to be parsed anyway"""
         log = logging.getLogger('thunderstorm.info')
         file_path = os.path.realpath(file_name)
         datafile = open(file_name, 'U')
@@ -48,14 +51,12 @@ def import_data(self, file_name):
         datafile.close()
         log.info("Importing LAAS data...")
         data = alldata.data_to_num_array
-        pulses = IVTime(data['tlp_pulses'].shape[2],
-                        data['tlp_pulses'].shape[0],
-                        delta_t=1)
-        pulses.voltage = data['tlp_pulses'][:, 1, :]
-        pulses.current = data['tlp_pulses'][:, 2, :]
-        pulses.valim = data['valim_tlp']
         delta_t = (data['tlp_pulses'][0, 0, 1] - data['tlp_pulses'][0, 0, 0])
-        pulses.delta_t = delta_t
+        # Time, voltage and current are interleaved, copied once
+        pulses = IVTime.from_arrays(data['tlp_pulses'][:, 1, :],
+                                    data['tlp_pulses'][:, 2, :],
+                                    delta_t=delta_t,
+                                    valim=data['valim_tlp'])
         # peupler l'objet avec les bonnes données
         # TODO implemter : recupération du delta_t dans l'util_laas
         tlp_curve = data['tlp']
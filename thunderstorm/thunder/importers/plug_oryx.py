@@ -24,10 +24,12 @@
 import os
 import logging
 
-from .tools import ImportPlugin
+import numpy as np
+
+from .tools import ImportPlugin, existing_files
 from .util_oryx import ReadOryx
 from ..tlp import RawTLPdata
-from ..pulses import IVTime
+from ..pulses import IVTime, LazyIVTime
 
 
 class ImportOryx(ImportPlugin):
@@ -35,25 +37,37 @@ class ImportOryx(ImportPlugin):
     """
     label = "Oryx"
     file_ext = "*.tsr"
+    signature = b"[=====Test Result Table"
 
     def __init__(self):
         ImportPlugin.__init__(self)
 
-    def import_data(self, file_name):
+    def related_files(self, file_name):
+        base_name = file_name[:-4]
+        return existing_files((base_name + '.tsr', base_name + '.ctr',
+                               base_name + '.zip', base_name,
+                               base_name + '.tar.gz', base_name + '.tar'))
+
+    def import_data(self, file_name, workers=None, lazy=False):
         """Import data
-        return a RawTLPdata instance"""
+        return a RawTLPdata instance
+        If lazy the waveforms are decoded on first access"""
         log = logging.getLogger('thunderstorm.info')
         log.info("Importing Oryx data...")
         file_path = os.path.realpath(file_name)
-        alldata = ReadOryx(file_name)
+        alldata = ReadOryx(file_name, workers=workers, waveforms=not lazy)
         data = alldata.data_to_num_array
-        if data['waveform_available']:
-            pulses = IVTime(data['tlp_pulses'].shape[2],
-                            data['tlp_pulses'].shape[1],
-                            delta_t=data['delta_t'],
-                            offsets_t=data['offsets_t'])
-            pulses.voltage = data['tlp_pulses'][0]
-            pulses.current = data['tlp_pulses'][1]
+        # Supply voltages, from the waveform file names
+        valim = data['valim_tlp'].astype(np.float64)
+        if data['waveform_available'] and lazy:
+            loader = data['pulses_loader']
+            pulses = LazyIVTime(loader, loader.pulses_nb, valim)
+        elif data['waveform_available']:
+            pulses = IVTime.from_arrays(data['tlp_pulses'][0],
+                                        data['tlp_pulses'][1],
+                                        delta_t=data['delta_t'],
+                                        offsets_t=data['offsets_t'],
+                                        valim=valim)
         else:
             pulses = IVTime(0, data['tlp'].shape[1], delta_t=1)
         tlp_curve = data['tlp']
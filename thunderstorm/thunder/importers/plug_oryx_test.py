@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing plug_oryx.py
+"""
+
+import numpy as np
+
+from .tools import plug_dict
+
+TSR = (b'"[Header]"\r\nfoo\r\n"[=====Test Result Table=====]"\r\n'
+       b'2,0,0,1,0.02,1e-09\r\n5.5,0,0,2.75,0.055,1e-09\r\n'
+       b'10,0,0,5,0.1,1e-09\r\n"[EOF]"\r\n')
+
+
+def _wfm(scale):
+    return (b'hdr\r\n' * 13
+            + b''.join(b'%d,%g\r\n' % (idx, idx * scale) for idx in range(5))
+            + b'[EOF]\r\n')
+
+
+def test_lazy_import(tmpdir):
+    tmpdir.join('dev.tsr').write_binary(TSR)
+    wfm_dir = tmpdir.mkdir('dev')
+    for volt in ('2', '5.5', '10'):
+        for (quantity, scale) in (('TlpVolt', float(volt)),
+                                  ('TlpCurr', float(volt) / 50)):
+            wfm_dir.join("01-01-10_01'00'00_PM_%s_%sV.wfm"
+                         % (quantity, volt)).write_binary(_wfm(scale))
+    file_name = str(tmpdir.join('dev.tsr'))
+    eager = plug_dict['Oryx']().import_data(file_name).pulses
+    lazy = plug_dict['Oryx']().import_data(file_name, lazy=True).pulses
+    assert np.array_equal(lazy.valim, [2, 5.5, 10])
+    assert lazy.valim.dtype == eager.valim.dtype == np.float64
+    for name in ('valim', 'voltage', 'current', 'offsets_t', 'delta_t'):
+        assert np.array_equal(getattr(lazy, name), getattr(eager, name))
+    assert np.allclose(eager.voltage[1], np.arange(5) * 5.5)
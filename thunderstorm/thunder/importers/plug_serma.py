@@ -24,10 +24,10 @@
 import os
 import logging
 
-from .tools import ImportPlugin
+from .tools import ImportPlugin, existing_files
 from .util_serma import ReadSERMA
 from ..tlp import RawTLPdata
-from ..pulses import IVTime
+from ..pulses import IVTime, LazyIVTime
 
 
 class ImportSERMA(ImportPlugin):
@@ -35,25 +35,54 @@ class ImportSERMA(ImportPlugin):
     """
     label = "SERMA"
     file_ext = "*.csv"
+    signature = b"Index,"
 
     def __init__(self):
         ImportPlugin.__init__(self)
 
-    def import_data(self, file_name):
+    @classmethod
+    def sniff(cls, file_name, head):
+        """HPPI main files look the same, SERMA measurements are
+        recognized by their WFM folder, leakage files or
+        transients archive
+        """
+        if not super(ImportSERMA, cls).sniff(file_name, head):
+            return False
+        names = os.listdir(os.path.dirname(file_name) or os.curdir)
+        return any(name in ('WFM', 'IV-FILE', 'Leak-Curve',
+                            'leakages.zip', 'leakages.tar.gz')
+                   or ('transients' in name and
+                       name not in ('transients.zip', 'transients.tar.gz'))
+                   for name in names)
+
+    def related_files(self, file_name):
+        base_dir = os.path.dirname(file_name)
+        locations = [file_name]
+        for name in os.listdir(base_dir or os.curdir):
+            if (name in ('WFM', 'HV-Pulse', 'IV-FILE', 'Leak-Curve',
+                         'leakages.zip', 'leakages.tar.gz')
+                    or 'transients' in name):
+                locations.append(os.path.join(base_dir, name))
+        return existing_files(locations)
+
+    def import_data(self, file_name, workers=None, lazy=False):
         """Import data
-        return a RawTLPdata instance"""
+        return a RawTLPdata instance
+        If lazy the waveforms are decoded on first access"""
         log = logging.getLogger('thunderstorm.info')
         log.info("Importing SERMA data...")
         file_path = os.path.realpath(file_name)
-        alldata = ReadSERMA(file_name)
+        alldata = ReadSERMA(file_name, workers=workers, waveforms=not lazy)
         data = alldata.data_to_num_array
-        pulses = IVTime(data['tlp_pulses'].shape[2],
-                        data['tlp_pulses'].shape[1],
-                        delta_t=data['delta_t'],
-                        offsets_t=data['offsets_t'])
-        pulses.voltage = data['tlp_pulses'][0]
-        pulses.current = data['tlp_pulses'][1]
-        #pulses.valim = data['valim_tlp']#not implemented
+        loader = data['pulses_loader']
+        if lazy and loader is not None:
+            pulses = LazyIVTime(loader, loader.pulses_nb)
+        else:
+            pulses = IVTime.from_arrays(data['tlp_pulses'][0],
+                                        data['tlp_pulses'][1],
+                                        delta_t=data['delta_t'],
+                                        offsets_t=data['offsets_t'])
+            #pulses.valim = data['valim_tlp']#not implemented
         tlp_curve = data['tlp']
         iv_leak = data['leak_data']
         leak_evol = data['leak_evol']
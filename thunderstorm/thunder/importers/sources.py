@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Transient waveform sources.
+Testers save one waveform per file, either in a folder or packed
+in a zip or tar archive. A transient source gives a read only access
+to these files (the members) whatever the container is, without
+extracting or re-packing anything.
+"""
+
+import os
+import zipfile
+import tarfile
+
+from .parsing import parallel_decode, stack_pulses
+
+
+class TransientSource(object):
+    """Generic transient source.
+    Can be used as a context manager to make sure the underlying
+    archive is closed when done.
+    """
+    def __init__(self, location):
+        self.location = location
+        self._names = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.location)
+
+    def _list_members(self):
+        """Must return the list of the member names"""
+        raise NotImplementedError
+
+    def namelist(self):
+        """Return the member names (list of string)"""
+        if self._names is None:
+            self._names = self._list_members()
+        return list(self._names)
+
+    def read(self, name):
+        """Return the content of the member name as bytes"""
+        raise NotImplementedError
+
+    def iter_read(self, names):
+        """Yield the content of each member of names, in the given order
+        """
+        for name in names:
+            yield self.read(name)
+
+    def close(self):
+        pass
+
+
+class DirTransientSource(TransientSource):
+    """Waveform files stored in a folder"""
+    def _list_members(self):
+        location = self.location
+        return sorted(name for name in os.listdir(location)
+                      if os.path.isfile(os.path.join(location, name)))
+
+    def read(self, name):
+        with open(os.path.join(self.location, name), 'rb') as member:
+            return member.read()
+
+
+class ZipTransientSource(TransientSource):
+    """Waveform files stored in a zip archive"""
+    def __init__(self, location):
+        TransientSource.__init__(self, location)
+        self._zfile = zipfile.ZipFile(location)
+
+    def _list_members(self):
+        return [info.filename for info in self._zfile.infolist()
+                if not info.filename.endswith('/')]
+
+    def read(self, name):
+        return self._zfile.read(name)
+
+    def close(self):
+        self._zfile.close()
+
+
+class TarTransientSource(TransientSource):
+    """Waveform files stored in a (compressed) tar archive"""
+    def __init__(self, location):
+        TransientSource.__init__(self, location)
+        self._tfile = tarfile.open(location, 'r')
+        self._members = dict((info.name, info)
+                             for info in self._tfile.getmembers()
+                             if info.isfile())
+
+    def _list_members(self):
+        return list(self._members.keys())
+
+    def read(self, name):
+        member = self._tfile.extractfile(self._members[name])
+        try:
+            return member.read()
+        finally:
+            member.close()
+
+    def iter_read(self, names):
+        """Yield the content of each member of names, in the given order
+
+        Members are extracted in their archive order so that
+        a compressed archive is decompressed in a single pass.
+        Members that come too early in the archive are kept until they
+        are requested, this only happens if names is not in archive
+        order.
+        """
+        names = list(names)
+        members = self._members
+        remaining = {}
+        for name in names:
+            remaining[name] = remaining.get(name, 0) + 1
+        by_offset = sorted(remaining, key=lambda name: members[name].offset)
+        extracted = {}
+        next_idx = 0
+        for name in by_offset:
+            extracted[name] = self.read(name)
+            while next_idx < len(names) and names[next_idx] in extracted:
+                name = names[next_idx]
+                next_idx += 1
+                remaining[name] -= 1
+                if remaining[name] == 0:
+                    yield extracted.pop(name)
+                else:
+                    yield extracted[name]
+
+    def close(self):
+        self._tfile.close()
+
+
+def open_transient_source(location):
+    """Return the transient source matching location
+    location can be a folder, a zip file or a tar file.
+    Raise IOError if location cannot be used as a transient source
+    """
+    if os.path.isdir(location):
+        return DirTransientSource(location)
+    if os.path.isfile(location):
+        if zipfile.is_zipfile(location):
+            return ZipTransientSource(location)
+        if tarfile.is_tarfile(location):
+            return TarTransientSource(location)
+    raise IOError("No transient files in %s" % location)
+
+
+def find_transient_source(locations):
+    """Return the transient source for the first usable location
+    of the given list.
+    Raise IOError if none can be used
+    """
+    for location in locations:
+        try:
+            return open_transient_source(location)
+        except IOError:
+            continue
+    raise IOError("NoTransientFiles")
+
+
+class TransientPulsesLoader(object):
+    """Decode on demand some pulses of a measurement
+    (loader of a LazyIVTime)
+
+    Parameters
+    ----------
+    location: string
+        The waveforms folder or archive
+    members: list
+        One item per pulse, the member name of its waveform file or a
+        tuple of member names (e.g. voltage and current files)
+    decoder: function
+        Module level function converting the member content (or the
+        tuple of contents) to a (time, voltage, current) array
+    time_unit: float
+        Time unit of the waveform files in second
+    workers: int
+        Number of decoding processes (see parallel_decode)
+    with_offsets: bool
+        If False the time offsets of the pulses are set to zero
+    """
+    def __init__(self, location, members, decoder, time_unit=1,
+                 workers=None, with_offsets=True):
+        self.location = os.path.abspath(location)
+        self.members = members
+        self.decoder = decoder
+        self.time_unit = time_unit
+        self.workers = workers
+        self.with_offsets = with_offsets
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.location)
+
+    @property
+    def pulses_nb(self):
+        return len(self.members)
+
+    def __call__(self, indexes):
+        members = [self.members[idx] for idx in indexes]
+        names = []
+        for member in members:
+            if isinstance(member, tuple):
+                names.extend(member)
+            else:
+                names.append(member)
+        with open_transient_source(self.location) as source:
+            raw_items = _group_contents(source.iter_read(names), members)
+            (pulses, delta_t, offsets_t) = \
+                stack_pulses(parallel_decode(self.decoder, raw_items,
+                                             self.workers),
+                             len(members))
+        if not self.with_offsets:
+            offsets_t[:] = 0
+        return (pulses, delta_t * self.time_unit,
+                offsets_t * self.time_unit)
+
+
+def _group_contents(contents, members):
+    """Yield the member contents grouped like members"""
+    for member in members:
+        if isinstance(member, tuple):
+            yield tuple(next(contents) for _ in member)
+        else:
+            yield next(contents)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Testing sources.py
+"""
+
+import os
+import zipfile
+import tarfile
+
+import numpy as np
+
+from .parsing import parse_numeric_block
+from .sources import (open_transient_source, find_transient_source,
+                      DirTransientSource, ZipTransientSource,
+                      TarTransientSource, TransientPulsesLoader)
+
+MEMBERS = {'wfm_1.csv': b'0,1\r\n1,2\r\n', 'wfm_2.csv': b'0,3\r\n1,4\r\n'}
+
+
+def _make_sources(tmpdir):
+    folder = tmpdir.mkdir('wfm')
+    for name, content in MEMBERS.items():
+        folder.join(name).write_binary(content)
+    zip_name = str(tmpdir.join('wfm.zip'))
+    with zipfile.ZipFile(zip_name, 'w') as zfile:
+        for name in MEMBERS:
+            zfile.write(str(folder.join(name)), name)
+    tar_name = str(tmpdir.join('wfm.tar.gz'))
+    with tarfile.open(tar_name, 'w:gz') as tfile:
+        for name in MEMBERS:
+            tfile.add(str(folder.join(name)), name)
+    return str(folder), zip_name, tar_name
+
+
+def test_backends(tmpdir):
+    expected = (DirTransientSource, ZipTransientSource, TarTransientSource)
+    for location, source_type in zip(_make_sources(tmpdir), expected):
+        with open_transient_source(location) as source:
+            assert source.__class__ is source_type
+            assert sorted(source.namelist()) == sorted(MEMBERS)
+            for name, content in MEMBERS.items():
+                assert source.read(name) == content
+
+
+def test_find_transient_source(tmpdir):
+    folder = _make_sources(tmpdir)[0]
+    missing = os.path.join(folder, 'missing')
+    with find_transient_source((missing, folder)) as source:
+        assert source.location == folder
+    try:
+        find_transient_source((missing,))
+    except IOError:
+        pass
+    else:
+        raise AssertionError("IOError expected")
+
+
+def test_iter_read_order(tmpdir):
+    for location in _make_sources(tmpdir):
+        names = sorted(MEMBERS, reverse=True) + sorted(MEMBERS)
+        with open_transient_source(location) as source:
+            contents = list(source.iter_read(names))
+        assert contents == [MEMBERS[name] for name in names]
+
+
+def _decode(raw_pulse):
+    (time, value) = parse_numeric_block(raw_pulse[0]).T
+    return np.vstack((time, value, -parse_numeric_block(raw_pulse[1])[:, 1]))
+
+
+def test_pulses_loader(tmpdir):
+    members = [('wfm_1.csv', 'wfm_2.csv'), ('wfm_2.csv', 'wfm_1.csv')]
+    for location in _make_sources(tmpdir):
+        loader = TransientPulsesLoader(location, members, _decode, 1e-9)
+        assert loader.pulses_nb == 2
+        (pulses, delta_t, offsets_t) = loader([1])
+        assert pulses.shape == (2, 1, 2)
+        assert np.allclose(pulses[:, 0], [[3, 4], [-1, -2]])
+        assert np.allclose((delta_t, offsets_t[0]), (1e-9, 0))
@@ -28,22 +28,39 @@
 
 """
 
+import os
 from os.path import basename, splitext
+import time
+import fnmatch
+import logging
+import traceback
 
-from ..tlp import Droplet, H5IVTime
+from ..tlp import Droplet, H5IVTime, storage_profile
+from ..pulses import LazyIVTime
+from ..catalog import record_experiment, PENDING_PREFIX
+from .parsing import parallel_decode
+
+# Number of bytes read at the beginning of a file to detect its format
+HEAD_SIZE = 4096
 
 
 class ImportPlugin(object):
     """Generic import plugin class"""
     label = "Unknown"
     file_ext = "*.*"
+    # Bytes found at the beginning of the main file of the tester
+    signature = None
 
     def __init__(self):
         pass
 
-    def import_data(self, filename):
+    def import_data(self, filename, workers=None, lazy=False):
         """Must return the data to be plotted
         return a RawTLPdata instance
+        workers is the number of processes used to decode the
+        transient waveform files (None to decode them sequentially)
+        If lazy, the transient waveforms can be left undecoded
+        (LazyIVTime pulses) until they are used.
         """
         raise NotImplementedError
 
@@ -53,17 +70,69 @@ def __repr__(self):
         """
         return "%s" % (self.__class__.__name__)
 
-    def raw_data_from_file(self, file_name):
-        return self.import_data(file_name)
+    @classmethod
+    def sniff(cls, file_name, head):
+        """Return True if file_name is the main file of a measurement
+        done with the tester of the plugin
+        head is the beginning (HEAD_SIZE bytes) of the file
+        """
+        if cls.signature is None or cls.signature not in head:
+            return False
+        return fnmatch.fnmatch(basename(file_name).lower(),
+                               cls.file_ext.lower())
+
+    def related_files(self, file_name):
+        """Return the list of all the files (main file, waveforms,
+        leakage curves...) the measurement file_name is made of
+        """
+        return [file_name]
+
+    def raw_data_from_file(self, file_name, workers=None, cache=None,
+                           lazy=False):
+        """Return the RawTLPdata of file_name
+        If an ImportCache is given, the data are taken from the cache
+        when the measurement files did not change since they were cached.
+        """
+        if cache is None:
+            return self.import_data(file_name, workers=workers, lazy=lazy)
+        key = cache.fingerprint(self.label, self.related_files(file_name))
+        raw_data = cache.get(key, file_name)
+        if raw_data is None:
+            raw_data = self.import_data(file_name, workers=workers,
+                                        lazy=lazy)
+            cache.put(key, raw_data)
+        return raw_data
 
     @staticmethod
-    def load_in_droplet(raw_data, h5file, exp_name=None):
+    def load_in_droplet(raw_data, h5file, exp_name=None, profile=None):
+        """Store raw_data in a new droplet of h5file and return it
+        profile is the StorageProfile of the waveforms (see
+        tlp.STORAGE_PROFILES), the default profile if None
+        The experiment is also added to the catalog of h5file.
+
+        The droplet is written under a pending name and only renamed
+        and added to the catalog when complete, so that an interrupted
+        import never leaves a partial droplet among the experiments.
+        """
+        profile = storage_profile(profile)
         if exp_name is None:
             exp_name = splitext(basename(raw_data.original_file_name))[0]
-        h5group = h5file.create_group(exp_name)
-        if raw_data.has_transient_pulses:
+        if exp_name in h5file:
+            raise ValueError("Experiment %s already in %s"
+                             % (exp_name, h5file.filename))
+        pending_name = PENDING_PREFIX + exp_name
+        if pending_name in h5file:
+            # Left over by an interrupted import
+            del h5file[pending_name]
+        h5group = h5file.create_group(pending_name)
+        pulses = raw_data.pulses
+        if isinstance(pulses, LazyIVTime) and not pulses.loaded:
+            # Waveforms are decoded from the original files when needed
+            h5group.attrs['deferred_pulses'] = True
+            h5group.attrs['pulses_nb'] = pulses.pulses_nb
+        elif raw_data.has_transient_pulses:
             data = H5IVTime(h5group)
-            data.import_ivtime(raw_data.pulses)
+            data.import_ivtime(pulses, profile)
         h5group['tlp_curve'] = raw_data.tlp_curve
         h5group.attrs['device_name'] = raw_data.device_name
         h5group.attrs['tester_name'] = raw_data.tester_name
@@ -72,15 +141,119 @@ def load_in_droplet(raw_data, h5file, exp_name=None):
             h5group['leak_evol'] = raw_data.leak_evol
         if raw_data.has_leakage_ivs:
             h5group['iv_leak'] = raw_data.iv_leak
+        h5group.attrs['import_time'] = time.time()
+        h5file.flush()
+        h5file.move(pending_name, exp_name)
+        h5group = h5file[exp_name]
+        record_experiment(h5group)
         h5file.flush()
         return Droplet(h5group)
 
-    def load(self, file_name, exp_name=None, h5file=None):
+    def load(self, file_name, exp_name=None, h5file=None, workers=None,
+             cache=None, lazy=False, profile=None):
         """import data and pack them in a droplet
         return the droplet
+        workers is the number of processes used to decode the
+        transient waveform files (None to decode them sequentially)
+        cache is an optional ImportCache
+        If lazy only the TLP curve and leakage data are imported, the
+        waveforms are decoded from the original files when first used.
+        profile is the storage profile of the waveforms
+        (see load_in_droplet)
+        """
+        raw_data = self.raw_data_from_file(file_name, workers=workers,
+                                           cache=cache, lazy=lazy)
+        return self.load_in_droplet(raw_data, h5file, exp_name, profile)
+
+    @staticmethod
+    def auto_load(file_name, exp_name=None, h5file=None, workers=None,
+                  cache=None, lazy=False, profile=None):
+        """Load file_name with the plugin detected by detect_plugin
+        Raise TypeError if the file format is unknown
         """
-        raw_data = self.raw_data_from_file(file_name)
-        return self.load_in_droplet(raw_data, h5file, exp_name)
+        plugin_label = detect_plugin(file_name)
+        if plugin_label is None:
+            raise TypeError("Unknown tester file format: %s" % file_name)
+        plugin = plug_dict[plugin_label]()
+        return plugin.load(file_name, exp_name, h5file, workers, cache,
+                           lazy, profile)
+
+
+def detect_plugin(path):
+    """Return the label of the plugin able to import path
+    or None if no plugin recognizes it.
+    Only the first HEAD_SIZE bytes of path are read.
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as data_file:
+        head = data_file.read(HEAD_SIZE)
+    labels = [label for (label, plug) in sorted(plug_dict.items())
+              if plug.sniff(path, head)]
+    if len(labels) > 1:
+        log = logging.getLogger('thunderstorm.thunder.importers')
+        log.warn("%s matches plugins %s, %s is used"
+                 % (path, ", ".join(labels), labels[0]))
+    if labels:
+        return labels[0]
+    return None
+
+
+def existing_files(locations):
+    """Return the existing files among locations,
+    directories are replaced by the files they contain
+    """
+    file_names = []
+    for location in locations:
+        if os.path.isdir(location):
+            for (dir_path, _, names) in os.walk(location):
+                file_names.extend(os.path.join(dir_path, name)
+                                  for name in names)
+        elif os.path.isfile(location):
+            file_names.append(location)
+    return file_names
+
+
+def _import_job(job):
+    """Import one file, used by batch_import (can run in a worker process)
+    Return (file_name, raw_data, duration, error)
+    """
+    (plugin_label, file_name, cache, lazy) = job
+    start = time.time()
+    try:
+        if plugin_label is None:
+            plugin_label = detect_plugin(file_name)
+            if plugin_label is None:
+                raise TypeError("Unknown tester file format: %s"
+                                % file_name)
+        plugin = plug_dict[plugin_label]()
+        raw_data = plugin.raw_data_from_file(file_name, cache=cache,
+                                             lazy=lazy)
+    except Exception:
+        return (file_name, None, time.time() - start, traceback.format_exc())
+    return (file_name, raw_data, time.time() - start, None)
+
+
+def batch_import(file_names, plugin_label, workers=None, cache=None,
+                 lazy=False):
+    """Import a set of files with the plugin_label plugin
+    (detected for each file with detect_plugin if plugin_label is None).
+    plugin_label can also be a list giving the plugin of each file.
+
+    Files are imported concurrently over workers processes
+    (sequentially if workers is None), through cache if an
+    ImportCache is given. If lazy, the waveforms are not decoded
+    (see ImportPlugin.load).
+
+    Yield (file_name, raw_data, duration, error) in the order of
+    file_names, raw_data is None and error contains the traceback
+    if the import failed.
+    """
+    if plugin_label is None or isinstance(plugin_label, str):
+        plugin_label = [plugin_label] * len(file_names)
+    jobs = [(label, file_name, cache, lazy)
+            for (label, file_name) in zip(plugin_label, file_names)]
+    return parallel_decode(_import_job, jobs, workers)
 
 
 def _init():
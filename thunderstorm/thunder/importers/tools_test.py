@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Testing tools.py
+"""
+
+from .tools import detect_plugin
+
+HEADERS = {'dev.mes': b'Identification : dev\r\n',
+           'dev.tsr': b'Test\r\n"[=====Test Result Table=====]"\r\n',
+           'dev.tlp': b'Version\t2\r\n',
+           'dev.tcf': b'[Info]\r\nUserName=user\r\n'}
+
+
+def test_detect_plugin(tmpdir):
+    expected = {'dev.mes': 'LAAS', 'dev.tsr': 'Oryx', 'dev.tlp': 'Barth',
+                'dev.tcf': 'HANWA'}
+    for name, head in HEADERS.items():
+        tmpdir.join(name).write_binary(head)
+        assert detect_plugin(str(tmpdir.join(name))) == expected[name]
+    tmpdir.join('dev.txt').write_binary(HEADERS['dev.tsr'])
+    assert detect_plugin(str(tmpdir.join('dev.txt'))) is None
+    assert detect_plugin(str(tmpdir)) is None
+
+
+def test_detect_serma_hppi(tmpdir):
+    for folder, label in (('WFM', 'SERMA'), ('wfm', 'HPPI')):
+        base_dir = tmpdir.mkdir(label)
+        base_dir.mkdir(folder)
+        base_dir.join('dev.csv').write_binary(b'Title\r\nIndex,V,I\r\n')
+        assert detect_plugin(str(base_dir.join('dev.csv'))) == label
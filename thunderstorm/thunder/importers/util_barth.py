@@ -26,7 +26,7 @@
 
 import numpy as np
 
-from ..utils import string2file
+from .parsing import parse_numeric_block
 
 
 class ReadBarth(object):
@@ -44,37 +44,45 @@ def _read_data_from_files(self):
         data['valim_tlp'] = tlp_data[0]
         data['tlp'] = np.array((tlp_data[1], tlp_data[2]))
         data['leak_evol'] = tlp_data[3]
+        data['leak_data'] = []  # no leakage curves in Barth files
         twf_data = extract_data_from_twf(base_name + '.twf')
         if twf_data is not False:
-            data['tlp_v_waveforms'] = twf_data[0]
-            data['tlp_i_waveforms'] = twf_data[1]
-            data['delta_t'] = twf_data[2]
-            data['vsupply_tlp'] = twf_data[3]
-            data['waveform available'] = True
+            (tlp_pulses, delta_t, valim) = twf_data
+            data['tlp_pulses'] = tlp_pulses
+            data['delta_t'] = delta_t
+            data['valim_tlp'] = valim
+            data['waveform_available'] = True
         else:
-            data['waveform available'] = False
+            data['tlp_pulses'] = np.empty((2, 0, 0))
+            data['delta_t'] = 1
+            data['waveform_available'] = False
 
     @property
     def data_to_num_array(self):
         num_data = {}
+        for data_name in ('tlp', 'valim_tlp', 'tlp_pulses',
+                          'leak_evol', 'leak_data'):
+            num_data[data_name] = np.asarray(self.data[data_name])
+        num_data['delta_t'] = self.data['delta_t']
+        num_data['waveform_available'] = self.data['waveform_available']
         return num_data
 
 
 def extract_data_from_tlp(tlp_file_name):
-    with open(tlp_file_name, 'U') as tlp_data_file:
+    with open(tlp_file_name, 'rb') as tlp_data_file:
         tlp_file_str = tlp_data_file.read()
-        version_re_str = r'^Version.*?\t(.*?)\n'
+        version_re_str = br'^Version.*?\t(.*?)\r?\n'
         version_re = re.compile(version_re_str, re.S | re.M)
         barth_file_version = version_re.findall(tlp_file_str)[0]
-        if int(barth_file_version.split('.')[0]) < 4:
-            re_str = r'^I\(AMPS\).*?\n(.*)\Z'
+        if int(barth_file_version.split(b'.')[0]) < 4:
+            re_str = br'^I\(AMPS\).*?\n(.*)\Z'
             col_id = {'pulseV': None, 'idut': 0, 'vdut': 1, 'leak': 2}
         else:
-            re_str = r'^Pulse V\(Volts\).*?\n(.*)\Z'
+            re_str = br'^Pulse V\(Volts\).*?\n(.*)\Z'
             col_id = {'pulseV': 0, 'vdut': 1, 'idut': 2, 'leak': 3}
         test_result_re = re.compile(re_str, re.S | re.M)
         data_str = test_result_re.findall(tlp_file_str)
-        data = np.loadtxt(string2file(data_str[0])).T
+        data = parse_numeric_block(data_str[0], delimiter=None).T
         if col_id['pulseV'] is not None:
             v_alim = data[col_id['pulseV']]
         else:
@@ -87,31 +95,54 @@ def extract_data_from_tlp(tlp_file_name):
 
 def extract_data_from_twf(twf_file_name):
     """ Extract data from Barth TLP *.twf file
+    Return (pulses, delta_t, valim) see parse_twf
+    or False if the file is not available
     """
     try:
-        with open(twf_file_name, 'U') as twf_data_file:
+        with open(twf_file_name, 'rb') as twf_data_file:
             twf_file_str = twf_data_file.read()
-            data = twf_file_str.split('\n\n')
-            head_line = data[0].split('\n')[0]
-            if not (head_line.startswith("4002-TLP") or
-                    head_line.startswith("4012-TLP")):
-                raise TypeError("%s is not a '40?2-TLP Waveform Data' file" %
-                                twf_file_name)
-            # _vwf voltage waveform related
-            # _iwf current waveform related
-            delta_t_vwf = float(data[1].split('\t')[2])
-            valim_vwf = np.asarray(data[1].split('\n')[1].split(),
-                                   dtype=np.float)
-            # FIXME two unused variables below
-            delta_t_iwf = float(data[3].split('\t')[2])
-            valim_iwf = np.asarray(data[3].split('\n')[1].split(),
-                                   dtype=np.float)
-            dut_vwf_str = data[2]
-            dut_iwf_str = data[4]
-            data_vwf = np.loadtxt(string2file(dut_vwf_str))
-            data_iwf = np.loadtxt(string2file(dut_iwf_str))
-            return data_vwf, data_iwf, delta_t_vwf, valim_vwf
     except IOError:
         log = logging.getLogger('thunderstorm.thunder.importers')
         log.warn("No pulse data found")
         return False
+    return parse_twf(twf_file_str)
+
+
+def parse_twf(twf_file_str):
+    """Convert the content of a 4002/4012 Barth *.twf file
+
+    The file is made of blank line separated blocks: the file header,
+    the voltage waveforms header (time step and supply voltages),
+    the voltage waveforms matrix (one column per pulse), then the same
+    two blocks for the current waveforms.
+    Each matrix is converted in a single call and copied in place in
+    a preallocated pulses array.
+
+    Returns
+    -------
+    (pulses, delta_t, valim) with pulses of shape
+    (2, pulses_nb, pulses_length), voltage first then current.
+    """
+    blocks = twf_file_str.replace(b'\r\n', b'\n').split(b'\n\n', 5)
+    head_line = blocks[0].split(b'\n')[0]
+    if not (head_line.startswith(b"4002-TLP") or
+            head_line.startswith(b"4012-TLP")):
+        raise TypeError("Not a '40?2-TLP Waveform Data' file")
+    if len(blocks) < 5:
+        raise ValueError("Truncated '40?2-TLP Waveform Data' file")
+    # _vwf voltage waveform related
+    # _iwf current waveform related
+    wfm_header = blocks[1].split(b'\n')
+    delta_t = float(wfm_header[0].split(b'\t')[2])
+    valim = np.asarray(wfm_header[1].split(), dtype=np.float64)
+    pulses_nb = valim.shape[0]
+    pulses_length = blocks[2].strip().count(b'\n') + 1
+    pulses = np.empty((2, pulses_nb, pulses_length))
+    for (idx, block) in ((0, blocks[2]), (1, blocks[4])):
+        waveforms = parse_numeric_block(block, delimiter=None)
+        if waveforms.shape != (pulses_length, pulses_nb):
+            raise ValueError("Waveforms matrix of shape %s, %s expected"
+                             % (waveforms.shape,
+                                (pulses_length, pulses_nb)))
+        pulses[idx] = waveforms.T
+    return (pulses, delta_t, valim)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Testing util_barth.py
+"""
+
+import numpy as np
+
+from .util_barth import parse_twf
+
+TWF = (b'4012-TLP Waveform Data\r\nDevice\r\n\r\n'
+       b'Voltage\tdt\t1e-9\r\n10\t20\r\n\r\n'
+       b'1\t2\r\n3\t4\r\n5\t6\r\n\r\n'
+       b'Current\tdt\t1e-9\r\n10\t20\r\n\r\n'
+       b'0.1\t0.2\r\n0.3\t0.4\r\n0.5\t0.6\r\n')
+
+
+def test_parse_twf():
+    (pulses, delta_t, valim) = parse_twf(TWF)
+    assert pulses.shape == (2, 2, 3)
+    assert np.allclose(pulses[0], [[1, 3, 5], [2, 4, 6]])
+    assert np.allclose(pulses[1, 1], [0.2, 0.4, 0.6])
+    assert delta_t == 1e-9
+    assert np.allclose(valim, (10, 20))
+
+
+def test_parse_wrong_twf():
+    for raw in (b'TLP data\r\n\r\n', TWF.replace(b'\t0.6', b'')):
+        try:
+            parse_twf(raw)
+        except (TypeError, ValueError):
+            pass
+        else:
+            raise AssertionError("TypeError or ValueError expected")
@@ -29,14 +29,20 @@
 
 import numpy as np
 
-from ..utils import string2file
+from .parsing import parse_numeric_block, parallel_decode, stack_pulses
+from .sources import TransientPulsesLoader
+
 
 class ReadHanwa(object):
     """
     Read Hanwa TLP data and do few treatment
+    If waveforms is False the transient waveforms are not decoded,
+    data['pulses_loader'] can then decode them later on.
     """
-    def __init__(self, file_name):
+    def __init__(self, file_name, workers=None, waveforms=True):
         self.base_file_name = file_name[:-4]
+        self.workers = workers
+        self.waveforms = waveforms
         self.data = {}
         self.read_data_from_files()
 
@@ -60,29 +66,37 @@ def read_data_from_files(self):
 
         len_file_list = filecontents(head)
         pulse_id_array = np.arange(len_file_list) + 1
-
-        def read_pulse_file(pulse_type, pulse_id, idx):
-            """ Reads in the data , either the V -waveform or the I-waveform
-                from the csv file
+        pulse_files = [(osp.join('OsilloV', 'V_%i.csv' % pulse_id),
+                        osp.join('OsilloI', 'I_%i.csv' % pulse_id))
+                       for pulse_id in pulse_id_array]
+        self.data['pulses_loader'] = TransientPulsesLoader(
+            head, pulse_files, decode_pulse, 1e-6, self.workers,
+            with_offsets=False)
+        if not self.waveforms:
+            self.data['tlp_pulses'] = []
+            self.data['delta_t'] = 0
+            return None
+
+        def read_pulse_file(pulse_type, pulse_id):
+            """ Reads in the raw content of either the V-waveform or
+                the I-waveform csv file
                 pulse_type : 'V' or 'I'
                 pulse_id : pulse identity number e.g. pulse 20
-                index: which coloun of the csv you wantto return
-                    0 : time line
-                    1 : the v or I data ( corresponding to the selected type
             """
             pulse_id_filename = pulse_type + '_' + str(pulse_id) + '.csv'
             pulse_w_filename = osp.join(head, 'Osillo' + pulse_type,
                                         pulse_id_filename)
-            return data_from_transient_file(pulse_w_filename)[idx]
+            with open(pulse_w_filename, 'rb') as pulse_file:
+                return pulse_file.read()
 
-        tlp_v = np.asarray([(read_pulse_file('V', x, 1))
-                            for x in pulse_id_array])
-        tlp_i = np.asarray([(read_pulse_file('I', x, 1))
-                            for x in pulse_id_array])
-        time_array = read_pulse_file('I', 1, 0)
-        delta_t = time_array[1] - time_array[0]
+        raw_pulses = ((read_pulse_file('V', x), read_pulse_file('I', x))
+                      for x in pulse_id_array)
+        (tlp_pulses, delta_t, _) = \
+            stack_pulses(parallel_decode(decode_pulse, raw_pulses,
+                                         self.workers),
+                         len_file_list)
 
-        self.data['tlp_pulses'] = np.array((tlp_v, tlp_i))
+        self.data['tlp_pulses'] = tlp_pulses
         self.data['delta_t'] = delta_t * 1e-6
 
         return None
@@ -94,8 +108,9 @@ def data_to_num_array(self):
         num_data = {}
         for data_name in ('tlp', 'valim_tlp', 'tlp_pulses',
                           'valim_leak', 'leak_evol', 'leak_data'):
-            num_data[data_name] = np.array(self.data[data_name])
+            num_data[data_name] = np.asarray(self.data[data_name])
         num_data['delta_t'] = self.data['delta_t']
+        num_data['pulses_loader'] = self.data['pulses_loader']
         return num_data
 
 
@@ -105,13 +120,12 @@ def extract_data_from_sbd(sbd_file_name):
     Return an array with
     Vsupply, tlp voltage, tlp current, leakage
     """
-    with open(sbd_file_name, 'U') as sbd_file:
+    with open(sbd_file_name, 'rb') as sbd_file:
         sbd_file_str = sbd_file.read()
-    re_str = r'^Point,.*\current\n(.*)'
+    re_str = br'^Point,.*?current\r?\n(.*)'
     test_result_re = re.compile(re_str, re.S | re.M)
     data_str = test_result_re.findall(sbd_file_str)
-    data = np.loadtxt(string2file(data_str[0]),
-                      delimiter=',', usecols=(0, 1, 2, 3, 4))
+    data = parse_numeric_block(data_str[0], usecols=(0, 1, 2, 3, 4))
     return data.T
 
 
@@ -159,18 +173,28 @@ def read_leak_curves(leak_path):
         for index in np.arange(n_files):
             leak_index_filename = 'Leak_' + str(index) + '.tld'
             leak_file_path = osp.join(leak_path, leak_index_filename)
-            with open(leak_file_path, 'r') as leak_file:
+            with open(leak_file_path, 'rb') as leak_file:
                 file_str = leak_file.read()
-                data = (np.loadtxt(string2file(file_str), delimiter=',',
-                                   usecols=(0, 1)))
+            data = parse_numeric_block(file_str, usecols=(0, 1))
             curves.append(data.T)
     return curves
 
 
 def data_from_transient_file(filename):
     """ Extracts the data form transient csv files """
-    data = np.loadtxt(filename, delimiter=',', skiprows=1)
-    return data.T
+    with open(filename, 'rb') as transient_file:
+        file_str = transient_file.read()
+    return parse_numeric_block(file_str, skip_header=1).T
+
+
+def decode_pulse(raw_pulse):
+    """ Return the (time, voltage, current) array of one pulse
+        from the content of its V and I csv files
+    """
+    (raw_voltage, raw_current) = raw_pulse
+    voltage = parse_numeric_block(raw_voltage, skip_header=1).T
+    current = parse_numeric_block(raw_current, skip_header=1).T
+    return np.vstack((voltage[0:2], current[1]))
 
 
 def filecontents(path):
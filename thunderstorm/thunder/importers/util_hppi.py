@@ -21,23 +21,27 @@
 Utils to read data from HPPI TLP setup file
 """
 
-from zipfile import ZipFile
 import re
 import os
 import logging
 
 import numpy as np
 
-from ..utils import string2file
+from .parsing import parse_numeric_block, parallel_decode, stack_pulses
+from .sources import open_transient_source, TransientPulsesLoader
 
 
 class ReadHPPI(object):
     """
     Read HPPI TLP data and do few treatment
+    If waveforms is False the transient waveforms are not decoded,
+    data['pulses_loader'] can then decode them later on.
     """
-    def __init__(self, file_name):
+    def __init__(self, file_name, workers=None, waveforms=True):
         self.base_file_name = file_name[:-4]
         #self.base_dir_name = os.path.dirname(file_name)
+        self.workers = workers
+        self.waveforms = waveforms
         self.data = {}
         self._read_data_from_files()
 
@@ -49,23 +53,24 @@ def _read_data_from_files(self):
         data['tlp'] = csv_data[1:3]
         data['leak_evol'] = csv_data[3]
         data['leak_data'] = []  # not implemented
-        hppi_wfm = HPPITransientRead(base_name)
-        (wfm_list, volt_list) = hppi_wfm.filecontents
-        tlp_v = []
-        tlp_i = []
-        offsets_t = []
-        for filename in wfm_list:
-            hppi_wfm_data = hppi_wfm.data_from_transient_file(filename)
-            tlp_v.append(hppi_wfm_data[3])
-            tlp_i.append(hppi_wfm_data[1])
-            offsets_t.append(hppi_wfm_data[0][0])
-        time_array = hppi_wfm_data[0]
-        delta_t = time_array[1] - time_array[0]
-        tlp_v = np.asarray(tlp_v)
-        tlp_i = np.asarray(tlp_i)
-        offsets_t = np.asarray(offsets_t)
-
-        data['tlp_pulses'] = np.array((tlp_v, tlp_i))
+        with HPPITransientRead(base_name) as hppi_wfm:
+            (wfm_list, volt_list) = hppi_wfm.filecontents
+            if hppi_wfm.wfm_location is None:
+                data['pulses_loader'] = None
+            else:
+                data['pulses_loader'] = TransientPulsesLoader(
+                    hppi_wfm.wfm_location, wfm_list, decode_transient, 1e-9,
+                    self.workers)
+            if self.waveforms or data['pulses_loader'] is None:
+                raw_wfms = hppi_wfm.raw_transient_files(wfm_list)
+                (tlp_pulses, delta_t, offsets_t) = \
+                    stack_pulses(parallel_decode(decode_transient, raw_wfms,
+                                                 self.workers),
+                                 len(wfm_list))
+            else:
+                (tlp_pulses, delta_t, offsets_t) = ([], 0, 0)
+
+        data['tlp_pulses'] = tlp_pulses
         data['valim_tlp'] = volt_list
         data['delta_t'] = delta_t * 1e-9
         data['offsets_t'] = offsets_t * 1e-9
@@ -78,8 +83,9 @@ def data_to_num_array(self):
         for data_name in ('tlp', 'valim_tlp', 'tlp_pulses',
                           'valim_leak', 'leak_evol',
                           'offsets_t', 'leak_data'):
-            num_data[data_name] = np.array(self.data[data_name])
+            num_data[data_name] = np.asarray(self.data[data_name])
         num_data['delta_t'] = self.data['delta_t']
+        num_data['pulses_loader'] = self.data['pulses_loader']
         return num_data
 
 
@@ -89,40 +95,56 @@ def extract_data_from_csv(tsr_file_name):
     Return an array with
     Vsupply, tlp voltage, tlp current, leakage
     """
-    with open(tsr_file_name, 'U') as tsr_file:
+    with open(tsr_file_name, 'rb') as tsr_file:
         tsr_file_str = tsr_file.read()
-    test_result_re = re.compile(r'^Index,.*\]\n(.*)', re.S | re.M)
+    test_result_re = re.compile(br'^Index,.*?\]\r?\n(.*)', re.S | re.M)
     data_str = test_result_re.findall(tsr_file_str)
-    data = np.loadtxt(string2file(data_str[0]),
-                      delimiter=',', usecols=(1, 2, 3, 8))
+    data = parse_numeric_block(data_str[0], usecols=(1, 2, 3, 8))
     return data.T
 
 
+def decode_transient(raw_wfm):
+    """Return the (time, voltage, current) array of a waveform file
+    content
+    """
+    return parse_numeric_block(raw_wfm, skip_header=1, usecols=(0, 3, 1)).T
+
+
 class HPPITransientRead(object):
     """Utils to extract data from HPPI tester files
+    The waveform folder or archive is opened once (when the file list
+    is built) and closed when leaving the with statement (or with close).
     """
     def __init__(self, base_dir):
         self.base_dir = os.path.dirname(base_dir)
         self.wfm_location = None  # Determined in filecontents function
+        self.source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
 
     def data_from_transient_file(self, filename):
-        if self.wfm_location.find('.zip') == -1:
-            filepath = os.path.join(self.wfm_location, filename)
-            with open(filepath, 'U') as wfm_file:
-                full_file = wfm_file.read()
-            wfm_file.close()
-        else:
-            zfile = ZipFile(self.wfm_location)
-            full_file = zfile.read(filename)
-            zfile.close()
-        data_string = '\n'.join(full_file.split('\r\n'))
-        return np.loadtxt(string2file(data_string),
-                          delimiter=',', skiprows=1).T
+        return parse_numeric_block(self.source.read(filename),
+                                   skip_header=1).T
+
+    def raw_transient_files(self, filenames):
+        """Yield the content of the given files in one pass
+        over the folder or archive
+        """
+        return self.source.iter_read(filenames)
 
     @property
     def filecontents(self):
         log = logging.getLogger('thunderstorm.thunder.importers')
-        is_zip = False
         #check location of waveforms
         base_dir = self.base_dir
         if os.path.exists(os.path.join(base_dir, 'wfm')):
@@ -133,16 +155,18 @@ def filecontents(self):
             log.debug('waveforms in dir: HV-Pulse')
         elif os.path.isfile(os.path.join(base_dir, 'transients.zip')):
             self.wfm_location = os.path.join(base_dir, 'transients.zip')
-            is_zip = True
             log.debug('waveforms in zip file')
+        elif os.path.isfile(os.path.join(base_dir, 'transients.tar.gz')):
+            self.wfm_location = os.path.join(base_dir, 'transients.tar.gz')
+            log.debug('waveforms in tar file')
         else:
             log.debug('No waveforms found')
 
-        if is_zip:
-            zfile = ZipFile(self.wfm_location)
-            wfm_list = zfile.namelist()
-        else:
-            wfm_list = os.listdir(self.wfm_location)
+        self.close()
+        wfm_list = []
+        if self.wfm_location is not None:
+            self.source = open_transient_source(self.wfm_location)
+            wfm_list = self.source.namelist()
 
         #filter all .csv files
         wfm_list = [elem for elem in wfm_list if elem.count('.csv')]
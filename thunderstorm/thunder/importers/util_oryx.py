@@ -22,23 +22,25 @@
 This file was greatly improved with the help of Justin Katz
 """
 
-from zipfile import ZipFile
 import re
 import logging
-import os
-import glob
 
 import numpy as np
 
-from ..utils import string2file
+from .sources import find_transient_source, TransientPulsesLoader
+from .parsing import parse_numeric_block, parallel_decode, stack_pulses
 
 
 class ReadOryx(object):
     """
     Read Oryx TLP data and do few treatment
+    If waveforms is False the transient waveforms are not decoded,
+    data['pulses_loader'] can then decode them later on.
     """
-    def __init__(self, file_name):
+    def __init__(self, file_name, workers=None, waveforms=True):
         self.base_file_name = file_name[:-4]
+        self.workers = workers
+        self.waveforms = waveforms
         self.data = {}
         self._read_data_from_files()
 
@@ -52,36 +54,37 @@ def _read_data_from_files(self):
         data['leak_data'] = read_leak_curves(base_name + '.ctr')
         # Transient datas
         try:
-            oryx_zip = OryxTransientZip(base_name + '.zip')
+            source = find_transient_source((base_name + '.zip',
+                                            base_name,
+                                            base_name + '.tar.gz',
+                                            base_name + '.tar'))
         except IOError:
             data['waveform_available'] = False
             data['tlp_pulses'] = []
             data['valim_tlp'] = []
             data['delta_t'] = 0
             data['offsets_t'] = 0
-        else:
-            data['waveform_available'] = True
-            (base_name, volt_list) = oryx_zip.filecontents
-            tlp_v = []
-            offsets_t = []
-            for pulse_voltage in volt_list:
-                filename = base_name + '_TlpVolt_' + pulse_voltage + 'V.wfm'
-                transdata = oryx_zip.data_from_transient_file(filename)
-                tlp_v.append(transdata[1])
-                offsets_t.append(transdata[0][0])
-            tlp_v = np.asarray(tlp_v)
-            offsets_t = np.asarray(offsets_t)
-            tlp_i = []
-            for pulse_voltage in volt_list:
-                filename = base_name + '_TlpCurr_' + pulse_voltage + 'V.wfm'
-                tlp_i.append(oryx_zip.data_from_transient_file(filename)[1])
-            tlp_i = np.asarray(tlp_i)
-            time_data = oryx_zip.data_from_transient_file(filename)[0]
-            delta_t = time_data[1] - time_data[0]
-            data['tlp_pulses'] = np.array((tlp_v, tlp_i))
-            data['valim_tlp'] = volt_list
-            data['delta_t'] = delta_t * 1e-9
-            data['offsets_t'] = offsets_t * 1e-9
+            data['pulses_loader'] = None
+            return
+        data['waveform_available'] = True
+        with source:
+            oryx_wfm = OryxTransientRead(source)
+            (base_name, volt_list) = oryx_wfm.filecontents
+            data['pulses_loader'] = TransientPulsesLoader(
+                source.location, oryx_wfm.pulse_files(base_name, volt_list),
+                decode_pulse, 1e-9, self.workers)
+            if not self.waveforms:
+                data['tlp_pulses'] = []
+                data['valim_tlp'] = volt_list
+                data['delta_t'] = 0
+                data['offsets_t'] = 0
+                return
+            (tlp_pulses, delta_t, offsets_t) = \
+                oryx_wfm.load_pulses(base_name, volt_list, self.workers)
+        data['tlp_pulses'] = tlp_pulses
+        data['valim_tlp'] = volt_list
+        data['delta_t'] = delta_t * 1e-9
+        data['offsets_t'] = offsets_t * 1e-9
 
     @property
     def data_to_num_array(self):
@@ -89,9 +92,10 @@ def data_to_num_array(self):
         for data_name in ('tlp', 'valim_tlp', 'tlp_pulses',
                           'valim_leak', 'leak_evol',
                           'offsets_t', 'leak_data'):
-            num_data[data_name] = np.array(self.data[data_name])
+            num_data[data_name] = np.asarray(self.data[data_name])
         num_data['delta_t'] = self.data['delta_t']
         num_data['waveform_available'] = self.data['waveform_available']
+        num_data['pulses_loader'] = self.data['pulses_loader']
         return num_data
 
 
@@ -101,13 +105,12 @@ def extract_data_from_tsr(tsr_file_name):
     Return an array with
     Vsupply, tlp voltage, tlp current, leakage
     """
-    with open(tsr_file_name, 'U') as tsr_file:
+    with open(tsr_file_name, 'rb') as tsr_file:
         tsr_file_str = tsr_file.read()
-    re_str = r'^"\[=====Test\ Result\ Table.*\]"\n(.*)\n"\[EOF\]"'
+    re_str = br'^"\[=====Test\ Result\ Table.*?\]"\r?\n(.*)\n"\[EOF\]"'
     test_result_re = re.compile(re_str, re.S | re.M)
     data_str = test_result_re.findall(tsr_file_str)
-    data = np.loadtxt(string2file(data_str[0]),
-                      delimiter=',', usecols=(0, 3, 4, 5))
+    data = parse_numeric_block(data_str[0], usecols=(0, 3, 4, 5))
     return data.T
 
 
@@ -117,17 +120,16 @@ def read_leak_curves(filename):
     """
     curves = []
     try:
-        with open(filename, 'U') as data_file:
+        with open(filename, 'rb') as data_file:
             whole_data = data_file.read()
 
-        block_re_str = r"^(\[DATA\])(.*?)(?=\[DATA\]|\Z)"
+        block_re_str = br"^(\[DATA\])(.*?)(?=\[DATA\]|\Z)"
         block_re = re.compile(block_re_str, re.S | re.M)
         blocks = block_re.findall(whole_data)
 
-        data_txt = ['\n'.join(block[1].split('\n')[3:-1]) for block in blocks]
-        for data in data_txt:
-            curves.append(np.loadtxt(string2file(data),
-                                     delimiter=',').T[1:])
+        for block in blocks:
+            curves.append(parse_numeric_block(block[1],
+                                              skip_header=3).T[1:])
     except IOError:
         log = logging.getLogger('thunderstorm.thunder.importers')
         log.warn("No leakage curves available")
@@ -135,49 +137,71 @@ def read_leak_curves(filename):
         return curves
 
 
-class OryxTransientZip(object):
+def decode_wfm(raw_wfm):
+    """Return the (time, data) array of an Oryx *.wfm file content
     """
-    Utils to extract data from oryx zip files
+    return parse_numeric_block(raw_wfm, skip_header=13, skip_footer=1).T
+
+
+def decode_pulse(raw_pulse):
+    """Return the (time, voltage, current) array of one pulse
+    from the content of its voltage and current *.wfm files
+    """
+    (raw_voltage, raw_current) = raw_pulse
+    voltage = decode_wfm(raw_voltage)
+    current = decode_wfm(raw_current)
+    return np.vstack((voltage, current[1]))
+
+
+class OryxTransientRead(object):
+    """
+    Utils to extract data from oryx waveform files
     Waveforms can be stored in either a zip file with the same name as
     the .tsr file, or it can be stored in a subfolder with the same name
-    as the .tsr file.
-    Note: Oryx deprecated saving as zip
+    as the .tsr file (the default for recent Oryx software).
+    Both are read in place through a transient source.
     """
-    def __init__(self, zfilename):
-        #According to Justin unziped transient files
-        #subfolder is now the default
-        #This version create the zip file if it does not exists
-        #and remove it when done
-        self.zipcreated = ''
-        if os.path.exists(zfilename):
-            pass
-        elif os.path.exists(zfilename[:-4]):
-            #if a folder exist create the zip file
-            zfile = ZipFile(zfilename, 'w')
-            for filename in glob.glob(zfilename[:-4] + '/*'):
-                zfile.write(filename, os.path.basename(filename))
-            zfile.close()
-            self.zipcreated = zfilename
-        else:
-            self.zipcreated = 'No transient data'
-            raise IOError("NoTransientFiles")
-        self.zfile = ZipFile(zfilename)
-
-    def __del__(self):
-        if self.zipcreated != 'No transient data':
-            self.zfile.close()
-            #remove the zip file if created here
-            if self.zipcreated != '':
-                os.remove(self.zipcreated)
+    def __init__(self, source):
+        self.source = source
 
     def data_from_transient_file(self, filename):
-        full_file = self.zfile.read(filename).decode()
-        data_string = '\n'.join(full_file.split('\r\n')[13:-2])
-        return np.loadtxt(string2file(data_string), delimiter=',').T
+        return decode_wfm(self.source.read(filename))
+
+    def load_pulses(self, base_name, volt_list, workers=None):
+        """Decode all the TLP voltage and current waveforms in one pass
+
+        Each waveform file is decoded once and copied in place in
+        a preallocated array. Decoding is spread over workers processes
+        if workers is given.
+
+        Returns
+        -------
+        (pulses, delta_t, offsets_t) with pulses of shape
+        (2, pulses_nb, pulses_length), voltage first then current.
+        Times are given in the unit of the files (ns).
+        """
+        names = [name for pulse_files
+                 in self.pulse_files(base_name, volt_list)
+                 for name in pulse_files]
+        # Read in one pass, an archive is then decompressed only once
+        contents = self.source.iter_read(names)
+        raw_pulses = zip(contents, contents)  # (voltage, current) pairs
+        return stack_pulses(parallel_decode(decode_pulse, raw_pulses,
+                                            workers),
+                            len(volt_list))
+
+    @staticmethod
+    def pulse_files(base_name, volt_list):
+        """Return the (voltage, current) waveform file names of
+        each pulse
+        """
+        return [(base_name + '_TlpVolt_' + volt + 'V.wfm',
+                 base_name + '_TlpCurr_' + volt + 'V.wfm')
+                for volt in volt_list]
 
     @property
     def list_transient_file(self):
-        file_list = self.zfile.namelist()
+        file_list = self.source.namelist()
         return file_list
 
     @property
@@ -185,7 +209,7 @@ def supply_voltage_list(self):
         """The TLP supply voltages list
 
         Return the TLP supply voltage list
-        from the filenames in the zip file.
+        from the waveform filenames.
 
         Returns
         -------
@@ -197,7 +221,7 @@ def supply_voltage_list(self):
         voltages_dict = {'TlpCurr': [], 'TlpVolt': [],
                          'TlpVMonCh3': [], 'TlpVMonCh4': [],
                          'TlpVoltCh3': [], 'TlpVoltCh4': []}
-        for filename in self.zfile.namelist():
+        for filename in self.list_transient_file:
             if filename[-4:] == ".wfm":
                 elems = filename[:-5].split('_')
                 voltages_dict[elems[3]].append(elems[4])
@@ -211,5 +235,7 @@ def supply_voltage_list(self):
     @property
     def filecontents(self):
         volt_list = self.supply_voltage_list
-        basename = '_'.join(self.zfile.namelist()[0].split('_')[0:3])
+        wfm_list = [filename for filename in self.list_transient_file
+                    if filename[-4:] == ".wfm"]
+        basename = '_'.join(wfm_list[0].split('_')[0:3])
         return (basename, volt_list)
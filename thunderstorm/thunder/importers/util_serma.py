@@ -29,15 +29,20 @@
 
 import numpy as np
 
-from ..utils import string2file
+from .parsing import parse_numeric_block, parallel_decode, stack_pulses
+from .sources import open_transient_source, TransientPulsesLoader
 
 
 class ReadSERMA(object):
     """
     Read SERMA TLP data and do few treatment
+    If waveforms is False the transient waveforms are not decoded,
+    data['pulses_loader'] can then decode them later on.
     """
-    def __init__(self, file_name):
+    def __init__(self, file_name, workers=None, waveforms=True):
         self.base_file_name = file_name[:-4]
+        self.workers = workers
+        self.waveforms = waveforms
         self.data = {}
         self._read_data_from_files()
 
@@ -50,35 +55,35 @@ def _read_data_from_files(self):
         data['leak_evol'] = csv_data[3]
         data['leak_data'] = []
 
-        serma_wfm = SERMATransientRead(base_name)
-        (wfm_list, volt_list) = serma_wfm.filecontents
-        tlp_v = []
-        tlp_i = []
-        offsets_t = []
-        for filename in wfm_list:
-            serma_wfm_data = serma_wfm.data_from_transient_file(filename)
-            tlp_v.append(serma_wfm_data[1])
-            tlp_i.append(serma_wfm_data[2])
-            offsets_t.append(serma_wfm_data[0][0])
-        time_array = serma_wfm_data[0]
-        delta_t = time_array[1] - time_array[0]
-        tlp_v = np.asarray(tlp_v)
-        tlp_i = np.asarray(tlp_i)
-        offsets_t = np.asarray(offsets_t)
-
-        serma_leak = SERMALeakageRead(base_name)
-        leak_list = serma_leak.filecontents
-        leak_data = []
-        for filename in leak_list:
-            serma_leak_data = serma_leak.data_from_leakage_file(filename)
-            leak_data.append(serma_leak_data)
+        with SERMATransientRead(base_name) as serma_wfm:
+            (wfm_list, volt_list) = serma_wfm.filecontents
+            if serma_wfm.wfm_location is None:
+                data['pulses_loader'] = None
+            else:
+                data['pulses_loader'] = TransientPulsesLoader(
+                    serma_wfm.wfm_location, wfm_list, decode_transient, 1e-9,
+                    self.workers)
+            if self.waveforms or data['pulses_loader'] is None:
+                raw_wfms = serma_wfm.raw_files(wfm_list)
+                (tlp_pulses, delta_t, offsets_t) = \
+                    stack_pulses(parallel_decode(decode_transient, raw_wfms,
+                                                 self.workers),
+                                 len(wfm_list))
+            else:
+                (tlp_pulses, delta_t, offsets_t) = ([], 0, 0)
+
+        with SERMALeakageRead(base_name) as serma_leak:
+            leak_list = serma_leak.filecontents
+            raw_leaks = serma_leak.raw_files(leak_list)
+            leak_data = list(parallel_decode(decode_leakage, raw_leaks,
+                                             self.workers))
 
         if len(leak_data) == len(data['tlp'][0]):
             ref_data = leak_data[0]
             leak_data.insert(0, ref_data)
 
         data['leak_data'] = leak_data
-        data['tlp_pulses'] = np.array((tlp_v, tlp_i))
+        data['tlp_pulses'] = tlp_pulses
         data['valim_tlp'] = volt_list
         data['delta_t'] = delta_t * 1e-9
         data['offsets_t'] = offsets_t * 1e-9
@@ -91,8 +96,9 @@ def data_to_num_array(self):
         for data_name in ('tlp', 'valim_tlp', 'tlp_pulses',
                           'valim_leak', 'leak_evol',
                           'offsets_t', 'leak_data'):
-            num_data[data_name] = np.array(self.data[data_name])
+            num_data[data_name] = np.asarray(self.data[data_name])
         num_data['delta_t'] = self.data['delta_t']
+        num_data['pulses_loader'] = self.data['pulses_loader']
         return num_data
 
 
@@ -102,48 +108,81 @@ def extract_data_from_csv(tsr_file_name):
     Return an array with
     Vsupply, tlp voltage, tlp current, leakage
     """
-    with open(tsr_file_name, 'U') as tsr_file:
+    with open(tsr_file_name, 'rb') as tsr_file:
         tsr_file_str = tsr_file.read()
-    test_result_re = re.compile(r'^Index,.*\]\n(.*)', re.S | re.M)
+    test_result_re = re.compile(br'^Index,.*?\]\r?\n(.*)', re.S | re.M)
     data_str = test_result_re.findall(tsr_file_str)
-    data = np.loadtxt(string2file(data_str[0]),
-                      delimiter=',', usecols=(1, 2, 3, 4))
+    data = parse_numeric_block(data_str[0], usecols=(1, 2, 3, 4))
     return data.T
 
 
-class SERMATransientRead(object):
-    """Utils to extract Waveform data from SERMA tester files
+def decode_transient(raw_wfm):
+    """Return the (time, voltage, current) array of a waveform file
+    content
+    """
+    return parse_numeric_block(raw_wfm, skip_header=1, usecols=(0, 1, 2)).T
+
+
+def decode_leakage(raw_leak):
+    """Return the leakage curve array of a leakage file content
+    """
+    return parse_numeric_block(raw_leak, skip_header=1).T
+
+
+class _SERMARead(object):
+    """Read files from a SERMA folder or archive.
+    The folder or archive is opened once (when the file list is built)
+    and closed when leaving the with statement (or with close).
     """
     def __init__(self, base_dir):
         self.base_dir = os.path.dirname(base_dir)
+        self.source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _open(self, location):
+        """Open location and return its list of .csv files"""
+        self.close()
+        if location is None:
+            return []
+        self.source = open_transient_source(location)
+        return [elem for elem in self.source.namelist()
+                if elem.count('.csv')]
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def raw_file(self, filename):
+        return self.source.read(filename)
+
+    def raw_files(self, filenames):
+        """Yield the content of the given files in one pass
+        over the folder or archive
+        """
+        return self.source.iter_read(filenames)
+
+
+class SERMATransientRead(_SERMARead):
+    """Utils to extract Waveform data from SERMA tester files
+    """
+    def __init__(self, base_dir):
+        _SERMARead.__init__(self, base_dir)
         self.wfm_location = None  # Determined in filecontents function
 
     def data_from_transient_file(self, filename):
-        if (os.path.isfile(self.wfm_location)
-                and tf.is_tarfile(self.wfm_location)):
-            tfile = tf.open(self.wfm_location, 'r')
-            my_file = tfile.extractfile(filename)
-            full_file = my_file.read()
-            tfile.close()
-        elif z.is_zipfile(self.wfm_location):
-            zfile = z.ZipFile(self.wfm_location)
-            full_file = zfile.read(filename)
-            zfile.close()
-        else:
-            filepath = os.path.join(self.wfm_location, filename)
-            with open(filepath, 'U') as wfm_file:
-                full_file = wfm_file.read()
-            wfm_file.close()
-
-        data_string = u'\n'.join(full_file.split('\r\n'))
-        return np.loadtxt(string2file(data_string),
-                          delimiter=',', skiprows=1).T
+        return parse_numeric_block(self.raw_file(filename),
+                                   skip_header=1).T
 
     @property
     def filecontents(self):
         log = logging.getLogger('thunderstorm.thunder.importers')
-        is_zip = False
-        is_tar = False
         #check location of waveforms
         base_dir = self.base_dir
         if os.path.exists(os.path.join(base_dir, 'WFM')):
@@ -159,11 +198,9 @@ def filecontents(self):
                 if 'transients' in item:
                     self.wfm_location = os.path.join(base_dir, item)
                     if tf.is_tarfile(self.wfm_location):
-                        is_tar = True
                         log.debug('waveforms in tar file')
                         found_file = True
                     elif z.is_zipfile(self.wfm_location):
-                        is_zip = True
                         log.debug('waveforms in zip file')
                         found_file = True
                     else:
@@ -172,18 +209,7 @@ def filecontents(self):
             if not found_file:
                 log.debug('No waveforms found')
 
-        wfm_list = []
-        if is_zip:
-            zfile = z.ZipFile(self.wfm_location)
-            wfm_list = zfile.namelist()
-        elif is_tar:
-            tfile = tf.open(self.wfm_location, 'r')
-            for info in tfile.getmembers():
-                wfm_list.append(info.name)
-        else:
-            wfm_list = os.listdir(self.wfm_location)
-        #filter all .csv files
-        wfm_list = [elem for elem in wfm_list if elem.count('.csv')]
+        wfm_list = self._open(self.wfm_location)
 
         voltages_list = []
         #for filename in wfm_list:
@@ -201,40 +227,20 @@ def get_wfm_number(self, filename):
         return int(re.search("\d+", elems[2]).group(0))
 
 
-class SERMALeakageRead(object):
+class SERMALeakageRead(_SERMARead):
     """Utils to extract leakage data from SERMA tester files
     """
 
     def __init__(self, base_dir):
-        self.base_dir = os.path.dirname(base_dir)
+        _SERMARead.__init__(self, base_dir)
         self.leak_location = None  # Determined in filecontents function
 
     def data_from_leakage_file(self, filename):
-        if (os.path.isfile(self.leak_location)
-                and tf.is_tarfile(self.leak_location)):
-            tfile = tf.open(self.leak_location, 'r')
-            my_file = tfile.extractfile(filename)
-            full_file = my_file.read()
-            tfile.close()
-        elif z.is_zipfile(self.leak_location):
-            zfile = z.ZipFile(self.leak_location)
-            full_file = zfile.read(filename)
-            zfile.close()
-        else:
-            filepath = os.path.join(self.leak_location, filename)
-            with open(filepath, 'U') as leak_file:
-                full_file = leak_file.read()
-            leak_file.close()
-
-        data_string = u'\n'.join(full_file.split('\r\n'))
-        return np.loadtxt(string2file(data_string),
-                          delimiter=',', skiprows=1).T
+        return decode_leakage(self.raw_file(filename))
 
     @property
     def filecontents(self):
         log = logging.getLogger('thunderstorm.thunder.importers')
-        is_zip = False
-        is_tar = False
         #check location of waveforms
         base_dir = self.base_dir
         if os.path.exists(os.path.join(base_dir, 'IV-FILE')):
@@ -245,28 +251,14 @@ def filecontents(self):
             log.debug('leakage curve in dir: Leak-Curve')
         elif os.path.isfile(os.path.join(base_dir, 'leakages.zip')):
             self.leak_location = os.path.join(base_dir, 'leakages.zip')
-            is_zip = True
             log.debug('leakages in zip file')
         elif os.path.isfile(os.path.join(base_dir, 'leakages.tar.gz')):
             self.leak_location = os.path.join(base_dir, 'leakages.tar.gz')
-            is_tar = True
             log.debug('leakages in tar file')
         else:
             log.debug('No leakages found')
 
-        leak_list = []
-        if is_zip:
-            zfile = z.ZipFile(self.leak_location)
-            leak_list = zfile.namelist()
-        elif is_tar:
-            tfile = tf.open(self.leak_location, 'r')
-            for info in tfile.getmembers():
-                leak_list.append(info.name)
-        else:
-            leak_list = os.listdir(self.leak_location)
-
-        #filter all .csv files
-        leak_list = [elem for elem in leak_list if elem.count('.csv')]
+        leak_list = self._open(self.leak_location)
 
         leak_list.sort(key=self.get_leak_number)
         return (leak_list)
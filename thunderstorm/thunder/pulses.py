@@ -24,58 +24,313 @@
 from __future__ import division
 
 import numpy as np
-from numpy.fft import rfft, irfft
+
+from .transforms import rfft_block, irfft_block
+
+# Types the time waveforms can be stored as. Integer waveforms are
+# stored with a scale and an offset per pulse (see quantize).
+STORAGE_DTYPES = ('float64', 'float32', 'int16')
+
+# Default reference impedance (Ohm) of the incident/reflected voltage
+# and of the wave (AB) representations
+REFERENCE_IMPEDANCE = 50.0
+
+
+def quantize(waveforms, dtype=np.int16):
+    """Convert float waveforms to integers
+
+    Parameters
+    ----------
+    waveforms: array
+        The waveforms, time being the last axis
+    dtype: numpy integer type
+
+    Returns
+    -------
+    (codes, scale, offset) such that codes * scale + offset gives back
+    the waveforms, scale and offset having one value per waveform.
+    The range of each waveform is mapped to the whole dtype range.
+    """
+    waveforms = np.asarray(waveforms, dtype=np.float64)
+    info = np.iinfo(dtype)
+    if waveforms.shape[-1] == 0:
+        return (np.zeros(waveforms.shape, dtype),
+                np.ones(waveforms.shape[:-1]),
+                np.zeros(waveforms.shape[:-1]))
+    low = waveforms.min(axis=-1)
+    high = waveforms.max(axis=-1)
+    scale = (high - low) / (float(info.max) - info.min)
+    scale = np.where(scale > 0, scale, 1.0)
+    offset = low - info.min * scale
+    codes = np.rint((waveforms - offset[..., np.newaxis])
+                    / scale[..., np.newaxis])
+    return (np.clip(codes, info.min, info.max).astype(dtype), scale, offset)
+
+
+def dequantize(codes, scale, offset):
+    """Convert integer waveforms back to float64 (see quantize)"""
+    return (codes * np.asarray(scale)[..., np.newaxis]
+            + np.asarray(offset)[..., np.newaxis])
+
+
+def _from_iv_matrix(representation, z0):
+    """Return the matrix converting (voltage, current) to
+    representation ('IV', 'VIncRef' or 'AB') for the reference
+    impedance z0
+    """
+    if representation == 'IV':
+        return ((1, 0), (0, 1))
+    if representation == 'VIncRef':
+        return ((0.5, z0 / 2), (0.5, -z0 / 2))
+    root = np.sqrt(z0)
+    return ((0.5 / root, root / 2), (0.5 / root, -root / 2))
+
+
+def _to_iv_matrix(representation, z0):
+    """Return the matrix converting representation to
+    (voltage, current), inverse of _from_iv_matrix
+    """
+    if representation == 'IV':
+        return ((1, 0), (0, 1))
+    if representation == 'VIncRef':
+        return ((1, 1), (1 / z0, -1 / z0))
+    root = np.sqrt(z0)
+    return ((root, root), (1 / root, -1 / root))
+
+
+def _matrix_product(left, right):
+    """Product of two 2x2 matrices whose elements may be arrays"""
+    return tuple(tuple(left[row][0] * right[0][col]
+                       + left[row][1] * right[1][col] for col in (0, 1))
+                 for row in (0, 1))
+
+
+def _apply_matrix(matrix, block, out):
+    """out[i] = matrix[i][0] * block[0] + matrix[i][1] * block[1]
+    out may be block, the conversion is then done in place with a
+    single temporary waveform set
+    """
+    ((m00, m01), (m10, m11)) = matrix
+    first = block[0] * m00
+    first += block[1] * m01
+    np.multiply(block[1], m11, out=out[1])
+    out[1] += block[0] * m10
+    out[0] = first
+
+
+def _adjacent_block(data1, data2):
+    """Return the (2, pulses_nb, pulses_length) view made of data1
+    followed by data2 if they are contiguous and adjacent in the same
+    buffer (e.g. block[0] and block[1]), None otherwise
+    """
+    if not (isinstance(data1, np.ndarray) and isinstance(data2, np.ndarray)):
+        return None
+    if data1.base is None or data1.base is not data2.base:
+        return None  # not parts of the same buffer
+    if (data1.ndim != 2 or data1.shape != data2.shape
+            or data1.dtype != data2.dtype
+            or not data1.flags.c_contiguous
+            or not data2.flags.c_contiguous):
+        return None
+    start1 = data1.__array_interface__['data'][0]
+    start2 = data2.__array_interface__['data'][0]
+    if start2 - start1 != data1.nbytes:
+        return None
+    return np.lib.stride_tricks.as_strided(
+        data1, (2,) + data1.shape, (data1.nbytes,) + data1.strides)
 
 
 class _PulseSet(object):
     """
     Generic class for a set of pulses
+    The waveforms are stored in a single (2, pulses_nb, pulses_length)
+    block, data1 then data2, so that the waveforms of each quantity and
+    each pulse are contiguous.
+    Integer waveforms are quantized, the _waveforms and _set_waveforms
+    methods convert them from and to float.
     """
+    # Reference impedance of the representation, it can be a
+    # different value (or array, see convert) for each pulse set
+    z0 = REFERENCE_IMPEDANCE
+
     def __init__(self, pulses_length, pulses_nb):
-        data_format = np.dtype([
-            ('Valim', np.float32),
-            (self._data1, (self.elem_type, pulses_length)),
-            (self._data2, (self.elem_type, pulses_length))])
-        self._data = np.empty(pulses_nb, data_format)
+        self._valim = np.empty(pulses_nb, np.float64)
+        self._block = np.empty((2, pulses_nb, pulses_length), self.elem_type)
+        self._scales = None
+        if np.dtype(self.elem_type).kind == 'i':
+            # (scale, offset) of each waveform
+            self._scales = (np.ones((2, pulses_nb)), np.zeros((2, pulses_nb)))
+
+    @property
+    def storage_dtype(self):
+        """Name of the type of the stored waveform values"""
+        return np.dtype(self.elem_type).name
+
+    def _position(self, name):
+        return (self._data1, self._data2).index(name)
+
+    def _waveforms(self, name, index=slice(None), samples=slice(None)):
+        """Return the name waveforms of the pulses selected by index,
+        restricted to the samples selected by samples, as float
+        """
+        pos = self._position(name)
+        if self._scales is None:
+            return self._block[pos][index][..., samples]
+        (scale, offset) = self._scales
+        return dequantize(self._block[pos][index][..., samples],
+                          scale[pos][index], offset[pos][index])
+
+    def _set_waveforms(self, name, value):
+        pos = self._position(name)
+        if self._scales is None:
+            self._block[pos] = value
+            return
+        value = np.broadcast_to(np.asarray(value, dtype=np.float64),
+                                self._block.shape[1:])
+        (codes, scale, offset) = quantize(value, self.elem_type)
+        self._block[pos] = codes
+        self._scales[0][pos] = scale
+        self._scales[1][pos] = offset
+
+    def _float_block(self):
+        """Return the waveforms block as float"""
+        if self._scales is None:
+            return self._block
+        return dequantize(self._block, *self._scales)
+
+    def _encoded(self, dtype):
+        """Return (block, scale, offset): the waveforms block stored as
+        dtype, and for integer types the (2, pulses_nb) scales and
+        offsets (None for float types).
+        The block is not copied if the waveforms are stored as dtype.
+        """
+        dtype = np.dtype(dtype)
+        if dtype == self._block.dtype:
+            if self._scales is None:
+                return (self._block, None, None)
+            return (self._block,) + self._scales
+        if dtype.kind == 'i':
+            return quantize(self._float_block(), dtype)
+        return (self._float_block().astype(dtype), None, None)
+
+    def _pulse_type(self, representation):
+        """Return the pulse set class of representation in the same
+        domain (time or frequency) as self
+        """
+        return PULSE_TYPES[(representation, self.domain)]
+
+    def convert(self, data_type, z0=None, out=None, inplace=False):
+        """Return the pulses in the representation of data_type
+
+        Parameters
+        ----------
+        data_type: class
+            Pulse set class of the same domain as self,
+            e.g. VIncRefTime or ABTime for an IVTime
+        z0: float or array
+            Reference impedance of the result, the one of self if None.
+            An array must be broadcastable to (pulses_nb, pulses_length)
+            (e.g. one value per frequency).
+        out: data_type
+            Pulse set of the same shape whose waveforms are overwritten
+            and which is returned, so that converting pulse sets in a
+            loop does not allocate new waveforms each time
+        inplace: bool
+            If True the waveforms of self are converted in place and
+            shared with the result, self must not be used anymore
+        """
+        if self.domain != data_type.domain:
+            raise ValueError("%s and %s are not in the same domain"
+                             % (self.__class__.__name__, data_type.__name__))
+        if z0 is None:
+            z0 = self.z0
+        matrix = _matrix_product(
+            _from_iv_matrix(data_type.representation, np.asarray(z0)),
+            _to_iv_matrix(self.representation, np.asarray(self.z0)))
+        block = self._float_block()
+        if out is not None:
+            if not isinstance(out, data_type):
+                raise TypeError("out must be a %s object"
+                                % data_type.__name__)
+            if out._scales is not None or out._block.shape != block.shape:
+                raise ValueError("out must be a float pulse set of "
+                                 "shape %s" % (block.shape,))
+            target = out._block
+        else:
+            out = data_type(*self._axis(0))
+            target = block if inplace else np.empty_like(block)
+        _apply_matrix(matrix, block, target)
+        out._block = target
+        out.elem_type = target.dtype.type
+        out.valim = self.valim
+        out.z0 = z0
+        self._share_axis(out)
+        return out
 
     @property
     def pulses_length(self):
-        return self._data[0][1].shape[0]
+        return self._block.shape[2]
 
     @property
     def pulses_nb(self):
-        return self._data.shape[0]
+        return self._block.shape[1]
 
     @property
     def valim(self):
-        return self._data['Valim']
+        return self._valim
 
     @valim.setter
     def valim(self, value):
-        self._data['Valim'] = value
+        self._valim[...] = value
 
 
 class _TimePulseSet(_PulseSet):
+    domain = 'time'
 
     def __init__(self, pulses_length, pulses_nb, delta_t,
-                 offsets_t):
-        self.elem_type = np.float64
+                 offsets_t, dtype='float64'):
+        if np.dtype(dtype).name not in STORAGE_DTYPES:
+            raise ValueError("Unknown storage type %r, use one of %s"
+                             % (dtype, ", ".join(STORAGE_DTYPES)))
+        self.elem_type = np.dtype(dtype).type
         _PulseSet.__init__(self, pulses_length, pulses_nb)
         self._delta_t = delta_t
         self._offsets_t = offsets_t
 
-    def to_freq(self, data_type):
+    def to_freq(self, data_type, fast_length=True, workers=None):
+        """Return the data_type spectra of the pulses
+        Both quantities of all the pulses are transformed in one call,
+        zero padded to a fast FFT length if fast_length is True
+        (see transforms.rfft_block).
+        """
         #self._data1 and self._data2 need to be defined by the object
-        delta_f = 1 / (self.delta_t * self.pulses_length)
-        data1_freq = rfft(self._data[self._data1])
-        data2_freq = rfft(self._data[self._data2])
-        freq_pulses_length = data1_freq.shape[1]
-        pulses_freq = data_type(freq_pulses_length, self.pulses_nb, delta_f)
-        pulses_freq._data['Valim'] = self.valim
-        pulses_freq._data[self._data1] = data1_freq
-        pulses_freq._data[self._data2] = data2_freq
+        (block_freq, fft_length) = rfft_block(self._float_block(),
+                                              fast_length, workers)
+        delta_f = 1 / (self.delta_t * fft_length)
+        pulses_freq = data_type(0, self.pulses_nb, delta_f)
+        pulses_freq.valim = self.valim
+        pulses_freq._block = block_freq
+        pulses_freq.fft_length = fft_length
+        pulses_freq.time_length = self.pulses_length
+        pulses_freq.z0 = self.z0
         return pulses_freq
 
+    def to_freq_with(self, workers=None, fast_length=True):
+        """Return the spectra of the pulses like to_freq, the transform
+        using workers threads (see transforms.DEFAULT_WORKERS)
+        """
+        return _TimePulseSet.to_freq(
+            self, PULSE_TYPES[(self.representation, 'freq')], fast_length,
+            workers)
+
+    def _axis(self, pulses_length):
+        """Constructor arguments of a pulse set of the same time axis"""
+        return (pulses_length, self.pulses_nb, self.delta_t, self.offsets_t)
+
+    def _share_axis(self, pulses):
+        pulses.delta_t = self.delta_t
+        pulses.offsets_t = self.offsets_t
+
     @property
     def delta_t(self):
         return self._delta_t
@@ -94,24 +349,51 @@ def offsets_t(self, values):
 
 
 class _FreqPulseSet(_PulseSet):
+    domain = 'freq'
 
     def __init__(self, pulses_length, pulses_nb, delta_f):
         self.elem_type = np.complex128
         _PulseSet.__init__(self, pulses_length, pulses_nb)
         self._delta_f = delta_f
-
-    def to_time(self, data_type):
-        parity = self.pulses_length % 2
-        delta_t = 0.5 / ((self.pulses_length - parity) * self.delta_f)
-        data1_time = irfft(self._data[self._data1])
-        data2_time = irfft(self._data[self._data2])
-        time_pulses_length = data1_time.shape[1]
-        pulses_time = data_type(time_pulses_length, self.pulses_nb, delta_t)
-        pulses_time._data['Valim'] = self.valim
-        pulses_time._data[self._data1] = data1_time
-        pulses_time._data[self._data2] = data2_time
+        # Length of the transform and of the original waveforms,
+        # recorded by to_freq so that to_time removes the padding
+        self.fft_length = None
+        self.time_length = None
+
+    def to_time(self, data_type, workers=None):
+        """Return the data_type waveforms of the spectra
+        (see transforms.irfft_block)
+        """
+        fft_length = self.fft_length
+        if fft_length is None:
+            fft_length = 2 * (self.pulses_length - 1)
+        delta_t = 1 / (fft_length * self.delta_f)
+        block_time = irfft_block(self._block, fft_length, self.time_length,
+                                 workers)
+        pulses_time = data_type(0, self.pulses_nb, delta_t)
+        pulses_time.valim = self.valim
+        pulses_time._block = block_time
+        pulses_time.z0 = self.z0
         return pulses_time
 
+    def to_time_with(self, workers=None):
+        """Return the waveforms of the spectra like to_time, the
+        transform using workers threads (see transforms.DEFAULT_WORKERS)
+        """
+        return _FreqPulseSet.to_time(
+            self, PULSE_TYPES[(self.representation, 'time')], workers)
+
+    def _axis(self, pulses_length):
+        """Constructor arguments of a pulse set of the same frequency
+        axis
+        """
+        return (pulses_length, self.pulses_nb, self.delta_f)
+
+    def _share_axis(self, pulses):
+        pulses._delta_f = self.delta_f
+        pulses.fft_length = self.fft_length
+        pulses.time_length = self.time_length
+
     @property
     def delta_f(self):
         return self._delta_f
@@ -121,49 +403,213 @@ def delta_f(self):
 # Current Voltage representation
 
 class _IV(object):
+    representation = 'IV'
+
     def __init__(self):
         self._data1 = 'Voltage'
         self._data2 = 'Current'
 
+    @property
+    def to_vinc_ref(self):
+        return self.convert(self._pulse_type('VIncRef'))
+
+    @property
+    def to_ab(self):
+        return self.convert(self._pulse_type('AB'))
+
     @property
     def voltage(self):
-        return self._data['Voltage']
+        return self._waveforms('Voltage')
 
     @voltage.setter
     def voltage(self, value):
-        self._data['Voltage'] = value
+        self._set_waveforms('Voltage', value)
 
     @property
     def current(self):
-        return self._data['Current']
+        return self._waveforms('Current')
 
     @current.setter
     def current(self, value):
-        self._data['Current'] = value
+        self._set_waveforms('Current', value)
+
+    def read_iv(self, index=slice(None), samples=slice(None)):
+        """Return the (voltage, current) of the pulses selected by index
+        restricted to the samples selected by samples
+        """
+        return (self._waveforms('Voltage', index, samples),
+                self._waveforms('Current', index, samples))
 
 
 class IVTime(_TimePulseSet, _IV):
+    """Voltage and current waveforms of a set of pulses
 
+    dtype is the type the waveforms are stored as in memory (see
+    STORAGE_DTYPES), they are always read and written as float.
+    """
     def __init__(self, pulses_length=2 ** 2, pulses_nb=2,
-                 delta_t=1, offsets_t=None):
+                 delta_t=1, offsets_t=None, dtype='float64'):
         _IV.__init__(self)
         if offsets_t is None:
             offsets_t = np.zeros(pulses_nb)
         _TimePulseSet.__init__(self, pulses_length, pulses_nb, delta_t,
-                               offsets_t)
+                               offsets_t, dtype)
+
+    @classmethod
+    def from_arrays(cls, voltage, current, delta_t=1, offsets_t=None,
+                    valim=None, copy=False):
+        """Return the IVTime of the (pulses_nb, pulses_length) voltage
+        and current waveforms
+
+        If voltage and current are the two halves of a contiguous
+        (2, pulses_nb, pulses_length) array, as built by the importers,
+        this array is used as is unless copy is True. Otherwise they
+        are copied once.
+        float32 waveforms are kept as float32, the others are stored
+        as float64.
+        """
+        block = None if copy else _adjacent_block(voltage, current)
+        if block is None:
+            block = np.array((voltage, current))
+        if block.dtype.name not in ('float64', 'float32'):
+            block = block.astype(np.float64)
+        pulses = cls(0, block.shape[1], delta_t, offsets_t,
+                     block.dtype.name)
+        pulses._block = block
+        pulses._valim[...] = 0 if valim is None else valim
+        return pulses
+
+    def astype(self, dtype):
+        """Return a copy of the pulses stored as dtype"""
+        pulses = IVTime(self.pulses_length, self.pulses_nb, self.delta_t,
+                        self.offsets_t, dtype)
+        pulses.valim = self.valim
+        pulses.voltage = self.voltage
+        pulses.current = self.current
+        return pulses
 
     @property
     def to_freq(self):
         return _TimePulseSet.to_freq(self, IVFreq)
 
+
+def as_ivtime(pulses):
+    """Return pulses as an IVTime, other pulse sets with read_iv
+    (e.g. H5IVTime) being read at once
+    """
+    if isinstance(pulses, IVTime):
+        return pulses
+    (voltage, current) = pulses.read_iv()
+    return IVTime.from_arrays(voltage, current, pulses.delta_t,
+                              np.array(pulses.offsets_t),
+                              np.array(pulses.valim))
+
+
+class LazyIVTime(IVTime):
+    """IVTime whose waveforms are decoded on first access
+
+    Only the number of pulses (and optionally the supply voltages)
+    is known when created. The whole set of waveforms is decoded
+    the first time voltage, current, delta_t ... is used.
+    Single pulses can be decoded without loading the others with the
+    pulse method.
+
+    Parameters
+    ----------
+    loader: callable
+        loader(indexes) must return (pulses, delta_t, offsets_t) for
+        the pulses of the indexes list, pulses being an array of shape
+        (2, len(indexes), pulses_length), voltage first then current.
+        It must be picklable to be sent across processes.
+    pulses_nb: int
+        The number of pulses
+    valim: array
+        The supply voltages (float64, as in IVTime), zero if None
+    """
+    def __init__(self, loader, pulses_nb, valim=None):
+        _IV.__init__(self)
+        self.elem_type = np.float64
+        self._scales = None
+        self._loader = loader
+        self._pulses_nb = pulses_nb
+        self._known_valim = None
+        if valim is not None:
+            self._known_valim = np.asarray(valim, dtype=np.float64)
+        self._loaded_block = None
+        self._pulses = {}
+
     @property
-    def to_vinc_ref(self):
-        vinc_ref = VIncRefTime(self.pulses_length, self.pulses_nb,
-                               self.delta_t)
-        vinc_ref._data['Valim'] = self.valim
-        vinc_ref._data['Incident'] = (self.voltage + 50 * self.current) / 2.0
-        vinc_ref._data['Reflected'] = (self.voltage - 50 * self.current) / 2.0
-        return vinc_ref
+    def loaded(self):
+        """True if all the waveforms are decoded"""
+        return self._loaded_block is not None
+
+    def load(self):
+        """Decode all the waveforms"""
+        if self._loaded_block is not None:
+            return
+        (pulses, delta_t, offsets_t) = self._loader(range(self._pulses_nb))
+        self._loaded_valim = np.zeros(self._pulses_nb, np.float64)
+        if self._known_valim is not None:
+            self._loaded_valim[...] = self._known_valim
+        self._delta_t = delta_t
+        self._offsets_t = offsets_t
+        # The loader block already has the IVTime layout
+        self._loaded_block = np.asarray(pulses, dtype=np.float64)
+        self._pulses = {}
+
+    @property
+    def _block(self):
+        self.load()
+        return self._loaded_block
+
+    def pulse(self, index):
+        """Return the (voltage, current) waveforms of pulse index
+        Only this pulse is decoded if the waveforms are not loaded yet.
+        """
+        if self._loaded_block is not None:
+            return (self.voltage[index], self.current[index])
+        if index not in self._pulses:
+            (pulses, _, _) = self._loader([index])
+            self._pulses[index] = (pulses[0, 0], pulses[1, 0])
+        return self._pulses[index]
+
+    @property
+    def pulses_nb(self):
+        return self._pulses_nb
+
+    @property
+    def valim(self):
+        if self._known_valim is not None and self._loaded_block is None:
+            return self._known_valim
+        self.load()
+        return self._loaded_valim
+
+    @valim.setter
+    def valim(self, value):
+        if self._loaded_block is None:
+            self._known_valim = np.asarray(value, dtype=np.float64)
+        else:
+            self._loaded_valim[...] = value
+
+    @property
+    def delta_t(self):
+        self.load()
+        return self._delta_t
+
+    @delta_t.setter
+    def delta_t(self, val):
+        self.load()
+        self._delta_t = val
+
+    @property
+    def offsets_t(self):
+        self.load()
+        return self._offsets_t
+
+    @offsets_t.setter
+    def offsets_t(self, values):
+        self.load()
+        self._offsets_t = values
 
 
 class IVFreq(_FreqPulseSet, _IV):
@@ -180,10 +626,11 @@ def to_time(self):
 
 #----------------------------------
 # Incident Reflected representation
-# TODO : should only provide AB transform with inc ref current and voltage
-# representation...
+# incident = (voltage + z0 * current) / 2
+# reflected = (voltage - z0 * current) / 2
 
 class _IncRef(object):
+    representation = 'VIncRef'
 
     def __init__(self):
         self._data1 = 'Incident'
@@ -191,11 +638,27 @@ def __init__(self):
 
     @property
     def incident(self):
-        return self._data['Incident']
+        return self._waveforms('Incident')
+
+    @incident.setter
+    def incident(self, value):
+        self._set_waveforms('Incident', value)
 
     @property
     def reflected(self):
-        return self._data['Reflected']
+        return self._waveforms('Reflected')
+
+    @reflected.setter
+    def reflected(self, value):
+        self._set_waveforms('Reflected', value)
+
+    @property
+    def to_iv(self):
+        return self.convert(self._pulse_type('IV'))
+
+    @property
+    def to_ab(self):
+        return self.convert(self._pulse_type('AB'))
 
 
 class VIncRefTime(_TimePulseSet, _IncRef):
@@ -210,14 +673,6 @@ def __init__(self, pulses_length=2 ** 2, pulses_nb=2,
     def to_freq(self):
         return _TimePulseSet.to_freq(self, VIncRefFreq)
 
-    @property
-    def to_iv(self):
-        iv = IVTime(self.pulses_length, self.pulses_nb, self.delta_t)
-        iv._data['Valim'] = self.valim
-        iv._data['Voltage'] = self.incident + self.reflected
-        iv._data['Current'] = (self.incident - self.reflected) / 50.0
-        return iv
-
 
 class VIncRefFreq(_FreqPulseSet, _IncRef):
 
@@ -233,12 +688,46 @@ def to_time(self):
 
 #----------------------------------
 # Incident Reflected Wave representation
+# a = (voltage + z0 * current) / (2 * sqrt(z0))
+# b = (voltage - z0 * current) / (2 * sqrt(z0))
+
+class _AB(object):
+    representation = 'AB'
+
+    def __init__(self):
+        self._data1 = 'A'
+        self._data2 = 'B'
+
+    @property
+    def a(self):
+        return self._waveforms('A')
+
+    @a.setter
+    def a(self, value):
+        self._set_waveforms('A', value)
+
+    @property
+    def b(self):
+        return self._waveforms('B')
+
+    @b.setter
+    def b(self, value):
+        self._set_waveforms('B', value)
 
-class ABTime(_TimePulseSet, _IncRef):
+    @property
+    def to_iv(self):
+        return self.convert(self._pulse_type('IV'))
+
+    @property
+    def to_vinc_ref(self):
+        return self.convert(self._pulse_type('VIncRef'))
+
+
+class ABTime(_TimePulseSet, _AB):
 
     def __init__(self, pulses_length=2 ** 2, pulses_nb=2,
                  delta_t=1, offsets_t=0):
-        _IncRef.__init__(self)
+        _AB.__init__(self)
         _TimePulseSet.__init__(self, pulses_length, pulses_nb, delta_t,
                                offsets_t)
 
@@ -247,13 +736,20 @@ def to_freq(self):
         return _TimePulseSet.to_freq(self, ABFreq)
 
 
-class ABFreq(_FreqPulseSet, _IncRef):
+class ABFreq(_FreqPulseSet, _AB):
 
     def __init__(self, pulses_length=2 ** 2, pulses_nb=2, delta_f=1):
-        _IncRef.__init__(self)
+        _AB.__init__(self)
         _FreqPulseSet.__init__(self, pulses_length,
                                pulses_nb, delta_f)
 
     @property
     def to_time(self):
         return _FreqPulseSet.to_time(self, ABTime)
+
+
+# Pulse set class of each (representation, domain)
+PULSE_TYPES = dict(((pulse_type.representation, pulse_type.domain),
+                    pulse_type)
+                   for pulse_type in (IVTime, IVFreq, VIncRefTime,
+                                      VIncRefFreq, ABTime, ABFreq))
@@ -101,20 +101,124 @@ def testIV():
 
 def testVIncRef():
     size = 2 ** 9
-    pulse_time = VIncRefTime(size)
-    pulse_time.v_inc[0][:] = np.sin(num.arange(size) / 2.0)
-    pulse_time.v_ref[0][:] = np.arange(size) * (-0.1)
-    pulse_time.time[:] = np.arange(size) * 0.4e-9
-    testpulse(pulse_time)
+    pulse_time = VIncRefTime(size, 2, 0.4e-9, np.zeros(2))
+    pulse_time.incident = np.sin(np.arange(size) / 2.0)
+    pulse_time.reflected = np.arange(size) * (-0.1)
+    iv = pulse_time.to_iv
+    assert iv.__class__ is IVTime and iv.delta_t == 0.4e-9
+    assert np.allclose(iv.voltage, pulse_time.incident + pulse_time.reflected)
+    assert np.allclose(iv.current * 50,
+                       pulse_time.incident - pulse_time.reflected)
+    back = iv.convert(VIncRefTime, z0=25).convert(VIncRefTime, z0=50)
+    assert np.allclose(back.incident, pulse_time.incident)
+    assert np.allclose(back.reflected, pulse_time.reflected)
+    # Same conversion in the frequency domain
+    freq = pulse_time.to_freq.to_iv.to_time
+    assert np.allclose(freq.voltage, iv.voltage)
+    assert np.allclose(freq.current, iv.current)
 
 
 def testab():
     size = 2 ** 9
-    pulse_time = ABTime(size)
-    pulse_time.a[0][:] = np.sin(np.arange(size) / 2.0)
-    pulse_time.b[0][:] = np.arange(size) * (-0.1)
-    pulse_time.time[:] = np.arange(size) * 0.4e-9
-    testpulse(pulse_time)
+    pulse_time = ABTime(size, 2, 0.4e-9, np.zeros(2))
+    pulse_time.z0 = 25.0
+    pulse_time.a = np.sin(np.arange(size) / 2.0)
+    pulse_time.b = np.arange(size) * (-0.1)
+    iv = pulse_time.to_iv
+    assert np.allclose(iv.voltage, 5 * (pulse_time.a + pulse_time.b))
+    assert np.allclose(iv.current, (pulse_time.a - pulse_time.b) / 5)
+    vinc_ref = pulse_time.to_vinc_ref
+    assert vinc_ref.z0 == 25.0
+    assert np.allclose(vinc_ref.incident, 5 * pulse_time.a)
+    # Buffers reused along a pipeline
+    out = ABTime(size, 2)
+    block = out._block
+    for _ in range(2):
+        back = vinc_ref.convert(ABTime, out=out)
+        assert back is out and back._block is block
+        assert np.allclose(back.b, pulse_time.b)
+    block = iv._block
+    in_place = iv.convert(ABTime, z0=25.0, inplace=True)
+    assert in_place._block is block
+    assert np.allclose(in_place.a, pulse_time.a)
+    try:
+        pulse_time.convert(IVFreq)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError expected")
+
+
+class _FakeLoader(object):
+    def __init__(self, pulses):
+        self.pulses = pulses
+        self.calls = []
+
+    def __call__(self, indexes):
+        indexes = list(indexes)
+        self.calls.append(indexes)
+        return (self.pulses[:, indexes], 0.5, np.arange(len(indexes)))
+
+
+def testLazyIVTime():
+    pulses = np.random.rand(2, 3, 8)
+    loader = _FakeLoader(pulses)
+    lazy = LazyIVTime(loader, 3, valim=np.arange(3))
+    assert lazy.pulses_nb == 3 and not lazy.loaded
+    assert np.array_equal(lazy.valim, np.arange(3))
+    assert lazy.valim.dtype == IVTime().valim.dtype == np.float64
+    (voltage, current) = lazy.pulse(1)
+    assert np.array_equal(voltage, pulses[0, 1])
+    assert np.array_equal(current, pulses[1, 1])
+    assert loader.calls == [[1]] and not lazy.loaded
+    assert np.array_equal(lazy.current, pulses[1])
+    assert lazy.loaded and lazy.delta_t == 0.5
+    assert np.array_equal(lazy.valim, np.arange(3))
+    assert lazy.valim.dtype == np.float64
+    assert lazy.to_freq.pulses_nb == 3
+    assert loader.calls == [[1], [0, 1, 2]]
+    # Supply voltages unknown, like an eager IVTime.from_arrays
+    lazy = LazyIVTime(_FakeLoader(pulses), 3)
+    assert np.array_equal(lazy.valim, np.zeros(3))
+    assert lazy.valim.dtype == np.float64
+
+
+def testStorageDtypes():
+    pulses = IVTime(100, 4)
+    pulses.voltage = np.random.randn(4, 100) * [[1], [10], [0], [1e-3]]
+    pulses.current = np.random.rand(4, 100)
+    for (dtype, precision) in (('float32', 1e-6), ('int16', 2e-5)):
+        stored = pulses.astype(dtype)
+        assert stored.storage_dtype == dtype
+        assert stored._block.dtype == np.dtype(dtype)
+        for (read, written) in ((stored.voltage, pulses.voltage),
+                                (stored.read_iv([3, 1])[0],
+                                 pulses.voltage[[3, 1]])):
+            error = np.abs(read - written).max(axis=1)
+            assert (error <= precision * np.abs(written).max(axis=1)).all()
+    try:
+        IVTime(dtype='int8')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError expected")
+
+
+def testFromArrays():
+    block = np.random.rand(2, 3, 8)
+    pulses = IVTime.from_arrays(block[0], block[1], delta_t=0.5,
+                                valim=[1, 2, 3])
+    assert np.shares_memory(pulses.voltage, block)
+    assert np.shares_memory(pulses.current, block)
+    assert np.array_equal(pulses.current, block[1])
+    assert pulses.delta_t == 0.5 and np.array_equal(pulses.valim, [1, 2, 3])
+    for (voltage, current, copy) in ((block[1], block[0], False),
+                                     (block[0], block[1], True),
+                                     (block[:, 0], block[:, 1], False)):
+        pulses = IVTime.from_arrays(voltage, current, copy=copy)
+        assert not np.shares_memory(pulses.voltage, block)
+        assert np.array_equal(pulses.voltage, voltage)
+        assert np.array_equal(pulses.current, current)
 
 
 def main():
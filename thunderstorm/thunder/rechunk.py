@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Rechunk the waveforms of existing storm files.
+The waveforms of every droplet are rewritten with the chunk layout of
+the chosen strategy (see tlp.ivtime_chunks), everything else is copied
+unchanged. A profile with a storage type (e.g. scaled) also converts
+the waveforms to that type. The storm is rebuilt in a temporary file
+that then replaces the original one so that the space of the old
+layout is freed.
+The new file keeps the HDF5 file format of the original one unless
+the latest format, needed by HDF5 SWMR readers and writers, is asked
+for.
+
+Usage:
+python -m thunderstorm.thunder.rechunk storm.h5 [strategy [profile]]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import logging
+
+import numpy as np
+import h5py
+
+from .tlp import ivtime_chunks, storage_profile
+from .pulses import quantize, dequantize
+
+# Number of pulses copied at once
+COPY_BLOCK_SIZE = 256
+
+
+# Scales of the integer waveforms, copied with the IVTime dataset
+SCALE_NAMES = ('IVTime_scale', 'IVTime_offset')
+
+
+def _copy_ivtime(src_dataset, dst_group, chunking, profile):
+    """Copy the IVTime dataset src_dataset in dst_group with new chunks
+    The filters of src_dataset are kept if profile is None, the
+    waveforms are converted to the profile storage type if it has one.
+    """
+    (pulses_nb, _, pulses_length) = src_dataset.shape
+    src_group = src_dataset.parent
+    dtype = src_dataset.dtype
+    if profile is None:
+        options = {'compression': src_dataset.compression,
+                   'compression_opts': src_dataset.compression_opts,
+                   'shuffle': src_dataset.shuffle,
+                   'fletcher32': src_dataset.fletcher32}
+    else:
+        profile = storage_profile(profile)
+        options = profile.dataset_options
+        if profile.dtype is not None:
+            dtype = np.dtype(profile.dtype)
+    chunks = ivtime_chunks(pulses_nb, pulses_length, chunking,
+                           dtype.itemsize)
+    dst_dataset = dst_group.create_dataset(src_dataset.name.split('/')[-1],
+                                           shape=src_dataset.shape,
+                                           dtype=dtype,
+                                           chunks=chunks, **options)
+    src_quantized = src_dataset.dtype.kind == 'i'
+    if src_quantized:
+        src_scales = [src_group[name][()] for name in SCALE_NAMES]
+    if dtype == src_dataset.dtype:
+        for start in range(0, pulses_nb, COPY_BLOCK_SIZE):
+            stop = min(start + COPY_BLOCK_SIZE, pulses_nb)
+            dst_dataset[start:stop] = src_dataset[start:stop]
+        if src_quantized:
+            for (name, values) in zip(SCALE_NAMES, src_scales):
+                dst_group[name] = values
+    else:
+        if dtype.kind == 'i':
+            dst_scales = [np.empty((pulses_nb, 2)) for _ in SCALE_NAMES]
+        for start in range(0, pulses_nb, COPY_BLOCK_SIZE):
+            stop = min(start + COPY_BLOCK_SIZE, pulses_nb)
+            block = src_dataset[start:stop]
+            if src_quantized:
+                block = dequantize(block, src_scales[0][start:stop],
+                                   src_scales[1][start:stop])
+            if dtype.kind == 'i':
+                (block, dst_scales[0][start:stop],
+                 dst_scales[1][start:stop]) = quantize(block, dtype)
+            dst_dataset[start:stop] = block
+        if dtype.kind == 'i':
+            for (name, values) in zip(SCALE_NAMES, dst_scales):
+                dst_group[name] = values
+    for (name, value) in src_dataset.attrs.items():
+        dst_dataset.attrs[name] = value
+
+
+def _copy_group(src_group, dst_group, chunking, profile):
+    for (name, value) in src_group.attrs.items():
+        dst_group.attrs[name] = value
+    for name in src_group:
+        item = src_group[name]
+        if isinstance(item, h5py.Group):
+            _copy_group(item, dst_group.create_group(name), chunking,
+                        profile)
+        elif name == 'IVTime' and len(item.shape) == 3:
+            _copy_ivtime(item, dst_group, chunking, profile)
+        elif name in SCALE_NAMES:
+            continue  # written by _copy_ivtime
+        else:
+            src_group.copy(item, dst_group, name)
+
+
+def rechunk(file_name, chunking='auto', profile=None, swmr_ready=False):
+    """Rewrite the waveforms of the storm file_name with the chunking
+    strategy, and with the filters and the storage type of profile if
+    given (the current ones are kept otherwise)
+    The file format is kept, unless swmr_ready in which case the file
+    is written in the latest format (HDF5 >= 1.10 needed to read it).
+    The file must not be opened elsewhere.
+    """
+    storage_profile(profile)  # check profile before doing anything
+    ivtime_chunks(1, 1, chunking)  # check chunking strategy
+    tmp_name = file_name + '.rechunk'
+    try:
+        with h5py.File(file_name, 'r') as src_file:
+            # The libver bounds of an opened file match its format
+            libver = 'latest' if swmr_ready else src_file.libver
+            with h5py.File(tmp_name, 'w', libver=libver) as dst_file:
+                _copy_group(src_file, dst_file, chunking, profile)
+    except Exception:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+    # Atomic, the storm is never lost even if interrupted here
+    os.replace(tmp_name, file_name)
+    log = logging.getLogger('thunderstorm.thunder')
+    log.info("%s rechunked (%s)" % (file_name, chunking))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print(__doc__)
+        return
+    chunking = argv[1] if len(argv) > 1 else 'auto'
+    profile = argv[2] if len(argv) > 2 else None
+    rechunk(argv[0], chunking, profile)
+
+
+if __name__ == "__main__":
+    main()
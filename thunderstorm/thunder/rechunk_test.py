@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing rechunk.py
+"""
+
+import numpy as np
+import h5py
+
+from .pulses import IVTime
+from .tlp import H5IVTime, ivtime_chunks
+from .rechunk import rechunk
+
+
+def _storm(file_name, pulses):
+    with h5py.File(file_name, 'w') as h5file:
+        group = h5file.create_group('dev')
+        group.attrs['device_name'] = 'dev'
+        group['tlp_curve'] = np.arange(6.).reshape(2, 3)
+        H5IVTime(group).import_ivtime(pulses, 'none')
+
+
+def _read(file_name):
+    with h5py.File(file_name, 'r') as h5file:
+        group = h5file['dev']
+        dataset = group['IVTime']
+        assert group.attrs['device_name'] == 'dev'
+        assert np.array_equal(group['tlp_curve'], np.arange(6.).reshape(2, 3))
+        (voltage, current) = H5IVTime(group).read_iv()
+        return (dataset.chunks, dataset.dtype, voltage, current)
+
+
+def test_rechunk(tmpdir):
+    file_name = str(tmpdir.join('storm.h5'))
+    block = np.random.rand(2, 30, 500)
+    pulses = IVTime.from_arrays(block[0], block[1], delta_t=1e-9)
+    _storm(file_name, pulses)
+    for strategy in ('pulse', 'quantity', 'window', 'auto'):
+        rechunk(file_name, strategy)
+        (chunks, dtype, voltage, current) = _read(file_name)
+        assert chunks == ivtime_chunks(30, 500, strategy)
+        assert dtype == np.float64
+        assert np.array_equal(voltage, block[0])
+        assert np.array_equal(current, block[1])
+    # Conversion to scaled int16, kept as is, then to float32
+    for (strategy, profile, dtype, tolerance) in (
+            ('window', 'scaled', np.int16, 1e-4),
+            ('pulse', None, np.int16, 1e-4),
+            ('auto', 'single', np.float32, 1e-4)):
+        rechunk(file_name, strategy, profile)
+        (chunks, stored_dtype, voltage, current) = _read(file_name)
+        assert chunks == ivtime_chunks(30, 500, strategy,
+                                       np.dtype(dtype).itemsize)
+        assert stored_dtype == dtype
+        assert np.allclose(voltage, block[0], atol=tolerance)
+        assert np.allclose(current, block[1], atol=tolerance)
+    assert tmpdir.listdir() == [tmpdir.join('storm.h5')]
+
+
+def _superblock_version(file_name):
+    with h5py.File(file_name, 'r') as h5file:
+        return h5file.id.get_create_plist().get_version()[0]
+
+
+def test_file_format(tmpdir):
+    file_name = str(tmpdir.join('storm.h5'))
+    pulses = IVTime.from_arrays(np.ones((2, 10)), np.ones((2, 10)),
+                                delta_t=1e-9)
+    _storm(file_name, pulses)
+    rechunk(file_name)
+    assert _superblock_version(file_name) == 0
+    rechunk(file_name, swmr_ready=True)
+    assert _superblock_version(file_name) == 3
+    # Kept by the following rechunks
+    rechunk(file_name, 'pulse')
+    assert _superblock_version(file_name) == 3
+    (_, _, voltage, _) = _read(file_name)
+    assert np.array_equal(voltage, np.ones((2, 10)))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the waveform storage profiles.
+A realistic pulse set is written with each storage profile and the
+file size, the write time, the read times (whole set and random
+single pulses) and the precision loss of the reduced precision
+storage types are reported.
+
+Usage:
+python -m thunderstorm.thunder.storage_bench [pulses_nb [pulses_length]]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import h5py
+
+from .pulses import IVTime
+from .tlp import H5IVTime, STORAGE_PROFILES
+
+
+def make_pulses(pulses_nb=200, pulses_length=5000, seed=0):
+    """Return an IVTime looking like a TLP measurement
+    100ns pulses of increasing amplitude on a snapback device,
+    with noise, ringing and 8 bits oscilloscope quantization
+    """
+    rand = np.random.RandomState(seed)
+    delta_t = 0.1e-9
+    time_axis = np.arange(pulses_length) * delta_t
+    (start, width, rise) = (20e-9, 100e-9, 1e-9)
+    shape = (np.clip((time_axis - start) / rise, 0, 1)
+             * np.clip((start + width - time_axis) / rise, 0, 1))
+    ringing = (0.05 * np.exp(-(time_axis - start).clip(0) / 5e-9)
+               * np.sin(2 * np.pi * 1e9 * time_axis))
+    valim = np.linspace(1, 200, pulses_nb)
+    current = valim / 100.0
+    voltage = np.where(valim < 40, valim / 2.0, 8 + 2 * current)
+    pulses = IVTime(pulses_length, pulses_nb, delta_t)
+    pulses.valim = valim
+    for (wfm, level) in ((pulses.voltage, voltage),
+                         (pulses.current, current)):
+        wfm[:] = level[:, np.newaxis] * (shape + ringing)
+        wfm += 0.01 * level[:, np.newaxis] * rand.randn(pulses_nb,
+                                                        pulses_length)
+        # 8 bits scope, vertical range adapted to each pulse
+        lsb = 2.5 * level[:, np.newaxis] / 256
+        wfm[:] = np.round(wfm / lsb) * lsb
+    return pulses
+
+
+def bench_profile(pulses, profile, directory, repeat=3):
+    """Return (size, write_time, read_time, pulse_read_time, error) in
+    bytes and seconds for pulses stored with profile, error being the
+    largest difference between the written and the read waveforms
+    relative to the pulse amplitude
+    """
+    file_name = os.path.join(directory, 'bench.h5')
+    write_time = read_time = pulse_read_time = float('inf')
+    rand = np.random.RandomState(0)
+    indexes = rand.randint(0, pulses.pulses_nb, 20)
+    for _ in range(repeat):
+        if os.path.exists(file_name):
+            os.remove(file_name)
+        start = time.time()
+        with h5py.File(file_name, 'w') as h5file:
+            H5IVTime(h5file.create_group('bench')).import_ivtime(pulses,
+                                                                 profile)
+        write_time = min(write_time, time.time() - start)
+        with h5py.File(file_name, 'r') as h5file:
+            stored = H5IVTime(h5file['bench'])
+            start = time.time()
+            (voltage, current) = stored.read_iv()
+            read_time = min(read_time, time.time() - start)
+            start = time.time()
+            for index in indexes:
+                stored.read_iv(index)
+            pulse_read_time = min(pulse_read_time,
+                                  (time.time() - start) / len(indexes))
+    error = 0
+    for (read, written) in ((voltage, pulses.voltage),
+                            (current, pulses.current)):
+        amplitude = np.abs(written).max(axis=1)
+        error = max(error, (np.abs(read - written).max(axis=1)
+                            / amplitude).max())
+    return (os.path.getsize(file_name), write_time, read_time,
+            pulse_read_time, error)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    pulses_nb = int(argv[0]) if len(argv) > 0 else 200
+    pulses_length = int(argv[1]) if len(argv) > 1 else 5000
+    pulses = make_pulses(pulses_nb, pulses_length)
+    raw_size = 2 * pulses.voltage.nbytes
+    print("%i pulses of %i points, %.1f MB uncompressed"
+          % (pulses_nb, pulses_length, raw_size / 1e6))
+    print("%-10s %8s %7s %11s %10s %11s %9s" % ("profile", "size MB",
+                                                "ratio", "write MB/s",
+                                                "read MB/s", "pulse ms",
+                                                "error"))
+    directory = tempfile.mkdtemp()
+    try:
+        for name in sorted(STORAGE_PROFILES):
+            (size, write_time, read_time, pulse_read_time, error) = \
+                bench_profile(pulses, name, directory)
+            print("%-10s %8.2f %7.2f %11.1f %10.1f %11.3f %9.1e"
+                  % (name, size / 1e6, raw_size / size,
+                     raw_size / write_time / 1e6,
+                     raw_size / read_time / 1e6,
+                     pulse_read_time * 1e3, error))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,54 +20,538 @@
 """ tlp data
 """
 from os.path import realpath
+from collections import OrderedDict
 
 import numpy as np
 import h5py
 
-from .pulses import IVTime
+from .pulses import IVTime, LazyIVTime, STORAGE_DTYPES, dequantize
+
+
+def _row_indexes(rows, rows_nb):
+    """Return the selected row indexes (1D int array) of a boolean mask
+    or of a sequence of (possibly negative) indexes
+    """
+    rows = np.asarray(rows)
+    if rows.dtype == bool:
+        if rows.shape != (rows_nb,):
+            raise IndexError("Boolean index of shape %s for %i rows"
+                             % (rows.shape, rows_nb))
+        return np.nonzero(rows)[0]
+    rows = rows.astype(np.intp).ravel()
+    rows = np.where(rows < 0, rows + rows_nb, rows)
+    if rows.size and (rows.min() < 0 or rows.max() >= rows_nb):
+        raise IndexError("Index out of range for %i rows" % rows_nb)
+    return rows
+
+
+def _selected_rows(index, rows_nb):
+    """Return the row indexes selected by index, an int, a slice,
+    a boolean mask or a sequence of indexes
+    """
+    if isinstance(index, (int, np.integer)):
+        return _row_indexes([index], rows_nb)
+    if isinstance(index, slice):
+        return np.arange(rows_nb)[index]
+    return _row_indexes(index, rows_nb)
+
+
+def read_rows(dataset, rows, key=()):
+    """Return dataset[rows][:, key] for a boolean mask or a sequence of
+    indexes rows, the rows being read in the given order.
+
+    Rows are sorted, repeated rows read once and consecutive rows
+    coalesced so that each contiguous run is a single hyperslab read
+    instead of a point by point h5py fancy selection.
+    """
+    rows = _row_indexes(rows, dataset.shape[0])
+    key = tuple(key)
+    if rows.size == 0:
+        return dataset[(slice(0, 0),) + key]
+    (unique_rows, inverse) = np.unique(rows, return_inverse=True)
+    breaks = np.nonzero(np.diff(unique_rows) != 1)[0] + 1
+    starts = unique_rows[np.r_[0, breaks]]
+    stops = unique_rows[np.r_[breaks - 1, -1]] + 1
+    blocks = [dataset[(slice(start, stop),) + key]
+              for (start, stop) in zip(starts, stops)]
+    data = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+    if unique_rows.size == rows.size and (np.diff(rows) > 0).all():
+        return data
+    return data[inverse]
+
+
+def write_ivtime(dataset, block):
+    """Write the (2, pulses_nb, pulses_length) waveforms block in the
+    (pulses_nb, 2, pulses_length) IVTime dataset
+    Each quantity is written directly if the chunks hold a single
+    quantity, otherwise one row of chunks is assembled at a time, the
+    whole block is never transposed in memory.
+    """
+    if dataset.chunks is not None and dataset.chunks[1] == 1:
+        for idx in (0, 1):
+            dataset[:, idx, :] = block[idx]
+        return
+    pulses_nb = dataset.shape[0]
+    rows = dataset.chunks[0] if dataset.chunks is not None else pulses_nb
+    for start in range(0, pulses_nb, max(rows, 1)):
+        stop = min(start + rows, pulses_nb)
+        dataset[start:stop] = np.stack((block[0, start:stop],
+                                        block[1, start:stop]), axis=1)
 
 
 class Index(object):
-    def __init__(self, data, idx):
+    """Array-like view on the voltage (idx 0) or the current (idx 1)
+    of an IVTime dataset of shape (pulses_nb, 2, pulses_length).
+    Data are only read when sliced or converted to an array.
+    If given, reader(rows, quantity=idx) is used to read the
+    quantity of the selected rows of the dataset (e.g. through a
+    PulsesCache, or to decode integer waveforms), dtype being the type
+    of the values it returns.
+    """
+    def __init__(self, data, idx, reader=None, dtype=None):
         self._data = data
         self._idx = idx
+        self._reader = reader
+        self._dtype = dtype
+
+    @property
+    def shape(self):
+        return (self._data.shape[0], self._data.shape[2])
+
+    @property
+    def dtype(self):
+        if self._dtype is not None:
+            return np.dtype(self._dtype)
+        return self._data.dtype
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+
+    def __len__(self):
+        return self._data.shape[0]
+
+    def __array__(self, dtype=None):
+        if self._reader is None:
+            data = self._data[:, self._idx]
+        else:
+            data = self._reader(slice(None), quantity=self._idx)
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
+
+    @property
+    def T(self):
+        return np.asarray(self).T
+
+    def __repr__(self):
+        return "Index(%s, %s)" % (self._data.name,
+                                  ('voltage', 'current')[self._idx])
 
     def __getitem__(self, index):
-        return self._data[index, self._idx]
+        if not isinstance(index, tuple):
+            index = (index,)
+        if len(index) == 0 or index[0] is Ellipsis:
+            index = (slice(None),) + index[1:]
+        (rows, key) = (index[0], (self._idx,) + index[1:])
+        if self._reader is not None:
+            data = self._reader(rows, quantity=self._idx)
+            if data.ndim == 1:  # single pulse
+                return data[index[1:]]
+            return data[(slice(None),) + index[1:]]
+        if isinstance(rows, (slice, int, np.integer)):
+            return self._data[(rows,) + key]
+        return read_rows(self._data, rows, key)
+
+
+# Default memory budget of the decoded pulses of a droplet in bytes
+DROPLET_CACHE_SIZE = 2 ** 26
+
+
+class PulsesCache(object):
+    """LRU cache of decoded pulses bounded by a memory budget
+
+    A cache can be shared by several droplets (e.g. all the droplets
+    of a storm) to bound their total memory use.
+
+    Parameters
+    ----------
+    max_bytes: int
+        Memory budget of the whole cache in bytes
+    droplet_max_bytes: int
+        Memory budget of each droplet in bytes, not bounded
+        (except by max_bytes) if None
+    """
+    def __init__(self, max_bytes=DROPLET_CACHE_SIZE, droplet_max_bytes=None):
+        self.max_bytes = max_bytes
+        self.droplet_max_bytes = droplet_max_bytes
+        self._entries = OrderedDict()
+        self._owner_bytes = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return ("PulsesCache(%i entries, %i/%i bytes)"
+                % (len(self._entries), self.nbytes, self.max_bytes))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, owner, row):
+        """Return the cached pulse row of owner or None"""
+        key = (owner, row)
+        data = self._entries.pop(key, None)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries[key] = data  # most recently used
+        self.hits += 1
+        return data
+
+    def put(self, owner, row, data):
+        """Keep the pulse row of owner, least recently used pulses are
+        dropped to stay within the budgets
+        """
+        key = (owner, row)
+        if key in self._entries:
+            self._remove(key)
+        if data.nbytes > self.max_bytes or (
+                self.droplet_max_bytes is not None
+                and data.nbytes > self.droplet_max_bytes):
+            return  # would evict everything, itself included
+        self._entries[key] = data
+        self.nbytes += data.nbytes
+        self._owner_bytes[owner] = (self._owner_bytes.get(owner, 0)
+                                    + data.nbytes)
+        if self.droplet_max_bytes is not None:
+            while self._owner_bytes[owner] > self.droplet_max_bytes:
+                oldest = next(entry_key for entry_key in self._entries
+                              if entry_key[0] == owner)
+                self._remove(oldest)
+        while self.nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        data = self._entries.pop(key)
+        self.nbytes -= data.nbytes
+        self._owner_bytes[key[0]] -= data.nbytes
+        if self._owner_bytes[key[0]] == 0:
+            del self._owner_bytes[key[0]]
+
+    def discard(self, owner):
+        """Drop all the pulses of owner"""
+        for key in [key for key in self._entries if key[0] == owner]:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._owner_bytes.clear()
+        self.nbytes = 0
+
+
+# Chunks of about this size (in bytes) are a good trade-off between
+# the number of chunks to touch and the amount of data to decompress
+CHUNK_TARGET_SIZE = 2 ** 18
+
+CHUNKING_STRATEGIES = ('auto', 'quantity', 'pulse', 'window')
+
+
+def ivtime_chunks(pulses_nb, pulses_length, strategy='auto', itemsize=8):
+    """Return the chunk shape of an IVTime dataset
+    of shape (pulses_nb, 2, pulses_length)
+
+    Parameters
+    ----------
+    strategy: string
+        'quantity': many pulses of one quantity per chunk, to read all
+        the voltages (or all the currents) at once e.g. to plot them.
+        'pulse': one pulse (voltage and current) per chunk, for random
+        access to single pulses.
+        'window': a short time window of many pulses per chunk, to
+        slice a time window across all the pulses.
+        'auto': chosen from pulses_nb and pulses_length, quantity
+        chunks of about CHUNK_TARGET_SIZE bytes, pulses longer than that
+        are split in time.
+    itemsize: int
+        Size in bytes of one value
+    """
+    pulses_nb = max(pulses_nb, 1)
+    pulses_length = max(pulses_length, 1)
+    target_nb = max(CHUNK_TARGET_SIZE // itemsize, 1)
+    if strategy == 'pulse':
+        return (1, 2, pulses_length)
+    if strategy == 'quantity':
+        return (min(max(target_nb // pulses_length, 1), pulses_nb),
+                1, pulses_length)
+    if strategy == 'window':
+        window = min(max(target_nb // (2 * pulses_nb), 16), pulses_length)
+        return (min(max(target_nb // (2 * window), 1), pulses_nb),
+                2, window)
+    if strategy == 'auto':
+        if pulses_length >= target_nb:
+            return (1, 1, target_nb)
+        return ivtime_chunks(pulses_nb, pulses_length, 'quantity',
+                             itemsize)
+    raise ValueError("Unknown chunking strategy %r" % strategy)
+
+
+class StorageProfile(object):
+    """HDF5 filters used to store the transient waveforms
+
+    Parameters
+    ----------
+    compression: string
+        'gzip', 'lzf' or None for no compression. lzf is only available
+        to h5py, gzip files can be read by any HDF5 tool (HDFView,
+        MATLAB...)
+    level: int
+        gzip compression level (0 to 9), not used by the other codecs
+    shuffle: bool
+        Apply the byte shuffle filter before compression, it groups the
+        exponent bytes of the float values and helps all the codecs
+    fletcher32: bool
+        Store a Fletcher checksum with each chunk to detect corruption
+    chunking: string
+        Chunk layout strategy of the waveforms (see ivtime_chunks)
+    dtype: string
+        Type the waveforms are stored as (see pulses.STORAGE_DTYPES),
+        the type of the imported pulses if None. float32 keeps 24 bits
+        and int16 16 bits of resolution, more than the 8 to 12 bits of
+        the scopes.
+    """
+    def __init__(self, compression='gzip', level=None, shuffle=True,
+                 fletcher32=False, chunking='auto', dtype=None):
+        if compression not in ('gzip', 'lzf', None):
+            raise ValueError("Unknown compression %r" % compression)
+        if chunking not in CHUNKING_STRATEGIES:
+            raise ValueError("Unknown chunking strategy %r" % chunking)
+        if dtype is not None and dtype not in STORAGE_DTYPES:
+            raise ValueError("Unknown storage type %r" % dtype)
+        if compression == 'gzip' and level is None:
+            level = 4
+        self.compression = compression
+        self.level = level
+        self.shuffle = shuffle
+        self.fletcher32 = fletcher32
+        self.chunking = chunking
+        self.dtype = dtype
+
+    def __repr__(self):
+        return ("StorageProfile(%r, level=%r, shuffle=%r, fletcher32=%r, "
+                "chunking=%r, dtype=%r)" % (self.compression, self.level,
+                                            self.shuffle, self.fletcher32,
+                                            self.chunking, self.dtype))
+
+    @property
+    def dataset_options(self):
+        """Keyword arguments of h5py create_dataset"""
+        options = {'shuffle': self.shuffle and self.compression is not None,
+                   'fletcher32': self.fletcher32}
+        if self.compression is not None:
+            options['compression'] = self.compression
+        if self.compression == 'gzip':
+            options['compression_opts'] = self.level
+        return options
+
+
+STORAGE_PROFILES = {
+    # Good write throughput with a reasonable size, readable by any
+    # HDF5 tool
+    'fast': StorageProfile('gzip', level=1, shuffle=True),
+    # Best write throughput, but the files can only be read with h5py
+    'lzf': StorageProfile('lzf', shuffle=True),
+    'balanced': StorageProfile('gzip', level=4, shuffle=True),
+    # Smallest files, former behaviour (plus shuffle)
+    'compact': StorageProfile('gzip', level=9, shuffle=True),
+    'checked': StorageProfile('gzip', level=4, shuffle=True,
+                              fletcher32=True),
+    'none': StorageProfile(None, shuffle=False),
+    # Reduced precision waveforms, 2 and 4 times smaller before
+    # compression
+    'single': StorageProfile('gzip', level=1, shuffle=True,
+                             dtype='float32'),
+    'scaled': StorageProfile('gzip', level=4, shuffle=True, dtype='int16'),
+}
+
+DEFAULT_STORAGE_PROFILE = 'fast'
+
+
+def storage_profile(profile=None):
+    """Return the StorageProfile for profile
+    profile can be a StorageProfile, a STORAGE_PROFILES name or None
+    for the default profile
+    """
+    if profile is None:
+        profile = DEFAULT_STORAGE_PROFILE
+    if isinstance(profile, StorageProfile):
+        return profile
+    try:
+        return STORAGE_PROFILES[profile]
+    except KeyError:
+        raise ValueError("Unknown storage profile %r, use one of %s"
+                         % (profile, ", ".join(sorted(STORAGE_PROFILES))))
 
 
 class H5IVTime(object):
     """Contain the transient waveforms
+    Decoded pulses are kept in cache (a PulsesCache) if given.
+    Integer waveforms are stored with the scale and the offset of each
+    waveform in the IVTime_scale and IVTime_offset datasets of shape
+    (pulses_nb, 2), they are read as float64.
     """
-    def __init__(self, droplet=None):
+    def __init__(self, droplet=None, cache=None):
         if not(droplet.__class__ is h5py.Group):
             raise TypeError("droplet must be an h5py.Group object")
         self.droplet = droplet
+        self.cache = cache
+        self._scales = None
 
-    def import_ivtime(self, pulses):
-        if not(pulses.__class__ is IVTime):
+    @property
+    def storage_dtype(self):
+        """Name of the type of the stored waveform values"""
+        return self.droplet['IVTime'].dtype.name
+
+    @property
+    def _quantized(self):
+        return self.droplet['IVTime'].dtype.kind == 'i'
+
+    def _decode(self, data, index, quantity=None):
+        """Convert the integer rows data read at index to float"""
+        if self._scales is None:
+            self._scales = (self.droplet['IVTime_scale'][()],
+                            self.droplet['IVTime_offset'][()])
+        (scale, offset) = self._scales
+        if quantity is not None:
+            (scale, offset) = (scale[:, quantity], offset[:, quantity])
+        return dequantize(data, scale[index], offset[index])
+
+    def _read(self, index, samples=slice(None), quantity=None):
+        """Return IVTime dataset[index][..., samples] as float,
+        dataset[index][..., quantity, samples] if quantity (0 for the
+        voltage, 1 for the current) is given
+        """
+        dataset = self.droplet['IVTime']
+        if index is Ellipsis:
+            index = slice(None)
+        if samples == slice(None) and self._cacheable(index):
+            data = self._read_cached(index)
+            if quantity is not None:
+                data = data[..., quantity, :]
+        else:
+            # Time windows and reads bigger than the cache budget would
+            # need or evict whole pulses, only the selection is read
+            key = (slice(None) if quantity is None else quantity, samples)
+            if isinstance(index, (slice, int, np.integer)):
+                data = dataset[(index,) + key]
+            else:
+                data = read_rows(dataset, index, key)
+        if self._quantized:
+            return self._decode(data, index, quantity)
+        return data
+
+    def _cacheable(self, index):
+        """True if the pulses selected by index fit in the cache budget
+        of the droplet
+        """
+        if self.cache is None:
+            return False
+        budget = self.cache.max_bytes
+        if self.cache.droplet_max_bytes is not None:
+            budget = min(budget, self.cache.droplet_max_bytes)
+        dataset = self.droplet['IVTime']
+        pulse_bytes = (dataset.shape[1] * dataset.shape[2]
+                       * dataset.dtype.itemsize)
+        rows = _selected_rows(index, dataset.shape[0])
+        return np.unique(rows).size * pulse_bytes <= budget
+
+    @property
+    def _cache_owner(self):
+        return (self.droplet.file.filename, self.droplet.name)
+
+    def _read_cached(self, index):
+        """Return IVTime dataset[index] (index being an int, a slice,
+        a boolean mask or a sequence of indexes) through the cache,
+        missing pulses being read at once
+        """
+        dataset = self.droplet['IVTime']
+        rows = _selected_rows(index, dataset.shape[0])
+        (cache, owner) = (self.cache, self._cache_owner)
+        found = {}
+        for row in np.unique(rows):
+            data = cache.get(owner, row)
+            if data is not None:
+                found[row] = data
+        missing = [row for row in np.unique(rows) if row not in found]
+        if missing:
+            for (row, data) in zip(missing, read_rows(dataset, missing)):
+                cache.put(owner, row, data)
+                found[row] = data
+        if isinstance(index, (int, np.integer)):
+            return found[rows[0]].copy()
+        data = np.empty((len(rows),) + dataset.shape[1:], dataset.dtype)
+        for (idx, row) in enumerate(rows):
+            data[idx] = found[row]
+        return data
+
+    def _reader(self):
+        if self.cache is None and not self._quantized:
+            return None
+        return self._read
+
+    def _index(self, idx):
+        dtype = np.float64 if self._quantized else None
+        return Index(self.droplet['IVTime'], idx, self._reader(), dtype)
+
+    def import_ivtime(self, pulses, profile=None):
+        """Store pulses in the droplet
+        profile is the StorageProfile (or its name in STORAGE_PROFILES)
+        defining the compression filters and the storage type,
+        DEFAULT_STORAGE_PROFILE if None
+        """
+        if not isinstance(pulses, IVTime):
             raise TypeError("Must give an IVTime object")
-        alldat = np.transpose(np.array((pulses.voltage, pulses.current)),
-                              (1, 0, 2))
-        self.droplet.create_dataset('IVTime',
-                                    data=alldat,
-                                    chunks=(2, 1, pulses.pulses_length),
-                                    # Fist dim is pulse id, 2nd I ou V
-                                    compression='gzip',
-                                    compression_opts=9)
+        profile = storage_profile(profile)
+        options = profile.dataset_options
+        dtype = np.dtype(profile.dtype or pulses.storage_dtype)
+        (block, scale, offset) = pulses._encoded(dtype)
+        if scale is not None:
+            # One (voltage, current) scale per pulse like IVTime
+            self.droplet['IVTime_scale'] = scale.T
+            self.droplet['IVTime_offset'] = offset.T
+        chunks = ivtime_chunks(pulses.pulses_nb, pulses.pulses_length,
+                               profile.chunking, dtype.itemsize)
+        dataset = self.droplet.create_dataset(
+            'IVTime', shape=(pulses.pulses_nb, 2, pulses.pulses_length),
+            dtype=dtype, chunks=chunks,
+            # Fist dim is pulse id, 2nd I ou V
+            **options)
+        write_ivtime(dataset, block)
         self.droplet.create_dataset('Valim', data=pulses.valim,
-                                    chunks=True, compression='gzip',
-                                    compression_opts=9)
+                                    chunks=True, **options)
         self.droplet.attrs['delta_t'] = pulses.delta_t
         self.droplet['offsets_t'] = pulses.offsets_t
 
     @property
     def voltage(self):
-        return Index(self.droplet['IVTime'], 0)
+        return self._index(0)
 
     @property
     def current(self):
-        return Index(self.droplet['IVTime'], 1)
+        return self._index(1)
+
+    def read_iv(self, index=slice(None), samples=slice(None)):
+        """Return the (voltage, current) of the pulses selected by index
+        (int, slice, boolean mask or sequence of indexes)
+        with a single read of the dataset.
+        Only the samples selected by samples (a slice) are read.
+        """
+        data = self._read(index, samples)
+        return (data[..., 0, :], data[..., 1, :])
 
     @property
     def pulses_length(self):
@@ -179,26 +663,33 @@ class H5RawTLPdata(_RawTLPdata):
     """All measurement data: device name, pulses, TLP curve, leakage ...
     from the h5File are made accessible throught this class
     """
-    def __init__(self, droplet=None):
+    def __init__(self, droplet=None, pulses_cache=None):
         if not(droplet.__class__ is h5py.Group):
             raise TypeError("group must be an h5py.Group object")
         _RawTLPdata.__init__(self)
         self.droplet = droplet
 
-        if 'IVTime' in list(droplet.keys()):
-            self._pulses_data = H5IVTime(droplet)
+        keys = set(droplet.keys())
+        self._deferred_pulses = False
+        if 'IVTime' in keys:
+            self._pulses_data = H5IVTime(droplet, pulses_cache)
+            self.has_transient_pulses = True
+        elif droplet.attrs.get('deferred_pulses', False):
+            # Imported without waveforms, they are decoded
+            # from the original files on first access
+            self._deferred_pulses = True
             self.has_transient_pulses = True
         else:
             self.has_transient_pulses = False
 
-        if 'leak_evol' in list(droplet.keys()):
+        if 'leak_evol' in keys:
             self.has_leakage_evolution = True
             self._leak_evol = droplet['leak_evol']
         else:
             self.has_leakage_evolution = False
             self._leak_evol = None
 
-        if 'iv_leak' in list(droplet.keys()):
+        if 'iv_leak' in keys:
             self.has_leakage_ivs = True
             self._iv_leak_data = droplet['iv_leak']
         else:
@@ -210,6 +701,17 @@ def __init__(self, droplet=None):
         self._tester_name = droplet.attrs['tester_name']
         self._original_data_file_path = droplet.attrs['original_file_path']
 
+    @property
+    def pulses(self):
+        """Pulses data """
+        if self._deferred_pulses and self._pulses_data is None:
+            from .importers.tools import plug_dict
+            plugin = plug_dict[self._tester_name]()
+            raw_data = plugin.import_data(self._original_data_file_path,
+                                          lazy=True)
+            self._pulses_data = raw_data.pulses
+        return self._pulses_data
+
 
 class RawTLPdata(_RawTLPdata):
     """All measurement data: device name, pulses, TLP curve, leakage ...
@@ -236,14 +738,17 @@ def __init__(self, device_name, pulses,
         """
         if not(type(device_name) is str):
             raise TypeError("Device name must be a string")
-        if not(pulses.__class__ is IVTime):
+        if not isinstance(pulses, IVTime):
             raise TypeError("Pulses must be an IVTime object")
         _RawTLPdata.__init__(self)
         self._device_name = device_name
         self._pulses_data = pulses
         #TODO this should be reworked to handle None
         #if no transient data is available
-        if pulses.pulses_length == 0 or pulses.pulses_nb == 0:
+        if isinstance(pulses, LazyIVTime) and not pulses.loaded:
+            # Do not decode the waveforms just to check them
+            self.has_transient_pulses = pulses.pulses_nb != 0
+        elif pulses.pulses_length == 0 or pulses.pulses_nb == 0:
             self.has_transient_pulses = False
         else:
             self.has_transient_pulses = True
@@ -273,10 +778,15 @@ class Droplet(object):
         of TLP pulses, a TLP curve, leakages measurement etc...
         A Droplet is base on a hdf5 file group
     """
-    def __init__(self, h5group):
+    def __init__(self, h5group, pulses_cache=None):
+        """pulses_cache is the PulsesCache of the decoded pulses,
+        a cache of DROPLET_CACHE_SIZE bytes is created if None
+        """
+        if pulses_cache is None:
+            pulses_cache = PulsesCache()
         self._h5group = h5group
         self._exp_name = h5group.name[1:]
-        self._raw_data = H5RawTLPdata(h5group)
+        self._raw_data = H5RawTLPdata(h5group, pulses_cache)
 
     def __repr__(self):
         message = "Experiement: "
@@ -291,6 +801,21 @@ def full_file_name(self):
     def raw_data(self):
         return self._raw_data
 
+    @property
+    def pulses_cache(self):
+        pulses = self._raw_data._pulses_data
+        if isinstance(pulses, H5IVTime):
+            return pulses.cache
+        return None
+
+    @pulses_cache.setter
+    def pulses_cache(self, cache):
+        pulses = self._raw_data._pulses_data
+        if isinstance(pulses, H5IVTime) and pulses.cache is not cache:
+            if pulses.cache is not None:
+                pulses.cache.discard(pulses._cache_owner)
+            pulses.cache = cache
+
     @property
     def exp_name(self):
         return self._exp_name
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Testing tlp.py
+"""
+
+import numpy as np
+import h5py
+import pytest
+
+from .pulses import IVTime
+from .tlp import (Droplet, H5IVTime, PulsesCache, ivtime_chunks,
+                  CHUNK_TARGET_SIZE, StorageProfile, STORAGE_PROFILES,
+                  DEFAULT_STORAGE_PROFILE, storage_profile)
+
+
+def _h5_pulses(tmpdir, pulses_nb=10, pulses_length=7, profile=None):
+    pulses = IVTime(pulses_length, pulses_nb)
+    pulses.voltage = np.random.rand(pulses_nb, pulses_length)
+    pulses.current = np.random.rand(pulses_nb, pulses_length)
+    h5file = h5py.File(str(tmpdir.join('test.h5')), 'w')
+    h5pulses = H5IVTime(h5file.create_group('test'))
+    h5pulses.import_ivtime(pulses, profile)
+    return (pulses, h5pulses)
+
+
+def test_index(tmpdir):
+    (pulses, h5pulses) = _h5_pulses(tmpdir)
+    voltage = h5pulses.voltage
+    assert voltage.shape == (10, 7) and len(voltage) == 10
+    assert voltage.dtype == np.float64
+    assert np.array_equal(np.asarray(voltage), pulses.voltage)
+    assert np.array_equal(voltage.T, pulses.voltage.T)
+    mask = np.zeros(10, bool)
+    mask[[1, 2, 3, 7]] = True
+    for index in (mask, [3, 1, 1, 9], [-1, 0], slice(2, 5), 4, -1,
+                  (mask, slice(1, 3)), ([5, 2], 3), np.zeros(10, bool)):
+        assert np.array_equal(voltage[index], pulses.voltage[index])
+        assert np.array_equal(h5pulses.current[index],
+                              pulses.current[index])
+
+
+def test_read_iv(tmpdir):
+    (pulses, h5pulses) = _h5_pulses(tmpdir)
+    for index in ([7, 2, 3], slice(None), 5):
+        (voltage, current) = h5pulses.read_iv(index)
+        assert np.array_equal(voltage, pulses.voltage[index])
+        assert np.array_equal(current, pulses.current[index])
+
+
+def test_pulses_cache(tmpdir):
+    (pulses, h5pulses) = _h5_pulses(tmpdir)
+    pulse_bytes = 2 * 7 * 8
+    cache = PulsesCache(5 * pulse_bytes, droplet_max_bytes=4 * pulse_bytes)
+    h5pulses.cache = cache
+    for index in ([7, 2, 2], slice(3, 6), 1, [-1]):
+        assert np.array_equal(h5pulses.voltage[index], pulses.voltage[index])
+    assert cache.nbytes == 4 * pulse_bytes and len(cache) == 4
+    cache.hits = cache.misses = 0
+    (voltage, current) = h5pulses.read_iv([9, 1])
+    assert np.array_equal(current, pulses.current[[9, 1]])
+    assert (cache.hits, cache.misses) == (2, 0)
+    cache.discard(h5pulses._cache_owner)
+    assert cache.nbytes == 0 and len(cache) == 0
+    # Pulses bigger than a budget are not cached
+    for cache in (PulsesCache(1000, 100), PulsesCache(100)):
+        cache.put('owner', 0, np.zeros(20))
+        assert cache.nbytes == 0 and len(cache) == 0
+
+
+class _RecordingGroup(object):
+    """h5py group recording the keys used to read the IVTime dataset"""
+    def __init__(self, group):
+        self._group = group
+        self.keys = []
+
+    def __getattr__(self, name):
+        return getattr(self._group, name)
+
+    def __getitem__(self, name):
+        if name != 'IVTime':
+            return self._group[name]
+        dataset = self._group[name]
+        record = self.keys.append
+
+        class Dataset(object):
+            shape = dataset.shape
+            dtype = dataset.dtype
+
+            def __getitem__(self, key):
+                record(key)
+                return dataset[key]
+        return Dataset()
+
+
+def test_read_window(tmpdir):
+    for profile in (None, 'scaled'):
+        (pulses, h5pulses) = _h5_pulses(tmpdir, profile=profile)
+        group = h5pulses.droplet
+        group['tlp_curve'] = np.zeros((2, 10))
+        for name in ('device_name', 'tester_name', 'original_file_path'):
+            group.attrs[name] = 'test'
+        cache = PulsesCache()
+        droplet = Droplet(group, cache)
+        h5pulses = droplet.raw_data.pulses
+        h5pulses.droplet = _RecordingGroup(group)
+        for index in ([7, 2, 3], slice(2, 5), 5):
+            (voltage, current) = h5pulses.read_iv(index, slice(2, 4))
+            assert np.allclose(voltage, pulses.voltage[index, 2:4],
+                               atol=1e-4)
+            assert np.allclose(current, pulses.current[index, 2:4],
+                               atol=1e-4)
+        # Only the window is read and the cache is left alone
+        assert all(key[-1] == slice(2, 4) for key in h5pulses.droplet.keys)
+        assert len(cache) == 0 and cache.misses == 0
+        (voltage, _) = h5pulses.read_iv([7, 2])
+        assert np.allclose(voltage, pulses.voltage[[7, 2]], atol=1e-4)
+        assert len(cache) == 2
+        group.file.close()
+
+
+def test_read_over_budget(tmpdir):
+    for profile in (None, 'scaled'):
+        (pulses, h5pulses) = _h5_pulses(tmpdir, profile=profile)
+        group = h5pulses.droplet
+        pulse_bytes = 2 * 7 * group['IVTime'].dtype.itemsize
+        cache = PulsesCache(5 * pulse_bytes, 4 * pulse_bytes)
+        h5pulses.cache = cache
+        h5pulses.droplet = _RecordingGroup(group)
+        # More pulses than the budget: only the voltages are read
+        assert np.allclose(h5pulses.voltage[:], pulses.voltage, atol=1e-4)
+        assert np.allclose(h5pulses.current[[9, 1, 2, 3, 5]],
+                           pulses.current[[9, 1, 2, 3, 5]], atol=1e-4)
+        assert np.allclose(np.asarray(h5pulses.voltage), pulses.voltage,
+                           atol=1e-4)
+        assert all(key[1] in (0, 1) for key in h5pulses.droplet.keys)
+        assert len(cache) == 0 and cache.misses == 0
+        # Small reads go through the cache
+        assert np.allclose(h5pulses.current[[9, 1]], pulses.current[[9, 1]],
+                           atol=1e-4)
+        assert np.allclose(h5pulses.voltage[1, 2:5], pulses.voltage[1, 2:5],
+                           atol=1e-4)
+        assert len(cache) == 2 and cache.hits == 1
+        group.file.close()
+
+
+def test_scaled_storage(tmpdir):
+    (pulses, h5pulses) = _h5_pulses(tmpdir, profile='scaled')
+    assert h5pulses.droplet['IVTime'].dtype == np.int16
+    for cache in (None, PulsesCache()):
+        h5pulses.cache = cache
+        assert h5pulses.voltage.dtype == np.float64
+        assert np.allclose(h5pulses.voltage, pulses.voltage, atol=1e-4)
+        assert np.allclose(h5pulses.current[[5, 2], 1:3],
+                           pulses.current[[5, 2], 1:3], atol=1e-4)
+        (voltage, _) = h5pulses.read_iv(-1)
+        assert np.allclose(voltage, pulses.voltage[-1], atol=1e-4)
+
+
+def test_ivtime_chunks():
+    expected = {'pulse': (1, 2, 5000), 'quantity': (6, 1, 5000),
+                'window': (100, 2, 163), 'auto': (6, 1, 5000)}
+    for (strategy, chunks) in expected.items():
+        assert ivtime_chunks(100, 5000, strategy) == chunks
+        assert np.prod(chunks) * 8 <= CHUNK_TARGET_SIZE
+    # Long pulses are split in time
+    assert ivtime_chunks(10, 10 ** 5) == (1, 1, CHUNK_TARGET_SIZE // 8)
+    assert ivtime_chunks(100, 5000, 'quantity', 2) == (26, 1, 5000)
+    assert ivtime_chunks(0, 0, 'pulse') == (1, 2, 1)
+
+
+def test_storage_profiles(tmpdir):
+    for (name, profile) in sorted(STORAGE_PROFILES.items()):
+        (pulses, h5pulses) = _h5_pulses(tmpdir, 10, 700, name)
+        dataset = h5pulses.droplet['IVTime']
+        assert dataset.compression == profile.compression
+        if profile.compression == 'gzip':
+            assert dataset.compression_opts == profile.level
+        assert dataset.shuffle == (profile.shuffle
+                                   and profile.compression is not None)
+        assert dataset.fletcher32 == profile.fletcher32
+        assert dataset.dtype == np.dtype(profile.dtype or np.float64)
+        assert dataset.chunks == ivtime_chunks(10, 700, profile.chunking,
+                                               dataset.dtype.itemsize)
+        (voltage, current) = h5pulses.read_iv()
+        assert voltage.dtype == current.dtype
+        if profile.dtype is None:
+            assert np.array_equal(voltage, pulses.voltage)
+            assert np.array_equal(current, pulses.current)
+        elif profile.dtype == 'float32':
+            assert np.allclose(voltage, pulses.voltage, rtol=1e-7, atol=0)
+            assert np.allclose(current, pulses.current, rtol=1e-7, atol=0)
+        else:
+            # Within half a quantization step of each waveform
+            step = h5pulses.droplet['IVTime_scale'][()]
+            assert voltage.dtype == np.float64
+            assert (np.abs(voltage - pulses.voltage)
+                    <= step[:, 0, np.newaxis] * 0.5001).all()
+            assert (np.abs(current - pulses.current)
+                    <= step[:, 1, np.newaxis] * 0.5001).all()
+        h5pulses.droplet.file.close()
+
+
+def test_storage_profile():
+    assert storage_profile() is STORAGE_PROFILES[DEFAULT_STORAGE_PROFILE]
+    assert storage_profile('compact') is STORAGE_PROFILES['compact']
+    profile = StorageProfile('lzf', chunking='pulse')
+    assert storage_profile(profile) is profile
+    assert profile.dataset_options == {'compression': 'lzf',
+                                       'shuffle': True,
+                                       'fletcher32': False}
+    assert StorageProfile().level == 4
+    with pytest.raises(ValueError):
+        storage_profile('smallest')
+    for options in ({'compression': 'szip'}, {'chunking': 'row'},
+                    {'dtype': 'int8'}):
+        with pytest.raises(ValueError):
+            StorageProfile(**options)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Batched Fourier transforms of pulse sets.
+The waveforms of a pulse set are a single (2, pulses_nb, pulses_length)
+block, both quantities of all the pulses are transformed in one call.
+scipy.fft is used when available as it can spread the transform over
+several threads, numpy.fft otherwise.
+The waveforms are zero padded to a length the FFT is fast for, the
+transform of a prime length being several times slower.
+"""
+from __future__ import division
+
+import numpy as np
+
+try:
+    import scipy.fft as _fft_backend
+except ImportError:
+    _fft_backend = None
+
+# Number of threads used when workers is not given, None to let the
+# backend decide (a single thread for scipy.fft), -1 for all the CPUs.
+# Only scipy.fft can use several threads.
+DEFAULT_WORKERS = None
+
+
+def next_fast_len(length):
+    """Return the smallest length >= length the real FFT is fast for"""
+    if _fft_backend is not None:
+        return _fft_backend.next_fast_len(length, real=True)
+    # numpy.fft is fast for lengths made of factors 2, 3 and 5
+    best = fast_len = 2 ** int(np.ceil(np.log2(max(length, 1))))
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            fast_len = power35
+            while fast_len < length:
+                fast_len *= 2
+            best = min(best, fast_len)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
+def _workers(workers):
+    return DEFAULT_WORKERS if workers is None else workers
+
+
+def rfft_block(block, fast_length=True, workers=None):
+    """Return (spectrum, fft_length): the spectrum of the real
+    waveforms block along its last axis and the transform length
+
+    Parameters
+    ----------
+    block: array
+        Real waveforms, time being the last axis
+    fast_length: bool
+        If True the waveforms are zero padded to next_fast_len
+    workers: int
+        Number of threads (see DEFAULT_WORKERS)
+    """
+    length = block.shape[-1]
+    fft_length = next_fast_len(length) if fast_length and length else length
+    if _fft_backend is None:
+        return (np.fft.rfft(block, fft_length), fft_length)
+    return (_fft_backend.rfft(block, fft_length, workers=_workers(workers)),
+            fft_length)
+
+
+def irfft_block(spectrum, fft_length=None, length=None, workers=None):
+    """Return the real waveforms of spectrum (inverse of rfft_block)
+
+    Parameters
+    ----------
+    spectrum: array
+        Spectra, frequency being the last axis
+    fft_length: int
+        Length of the transform, 2 * (spectrum length - 1) if None
+    length: int
+        Number of samples to keep, the padding added by rfft_block is
+        removed if length is the original waveform length
+    workers: int
+        Number of threads (see DEFAULT_WORKERS)
+    """
+    if fft_length is None:
+        fft_length = 2 * (spectrum.shape[-1] - 1)
+    if _fft_backend is None:
+        waveforms = np.fft.irfft(spectrum, fft_length)
+    else:
+        waveforms = _fft_backend.irfft(spectrum, fft_length,
+                                       workers=_workers(workers))
+    if length is not None and length < fft_length:
+        # Contiguous copy, the padding is not kept in memory
+        waveforms = np.ascontiguousarray(waveforms[..., :length])
+    return waveforms
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2010 Trémouilles David
+
+#This file is part of Thunderstorm.
+#
+#ThunderStrom is free software: you can redistribute it and/or modify
+#it under the terms of the GNU Lesser General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+#
+#ThunderStorm is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU Lesser General Public License for more details.
+#
+#You should have received a copy of the GNU Lesser General Public License
+#along with ThunderStorm.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Testing transforms.py
+"""
+
+import numpy as np
+
+from . import transforms
+from .pulses import IVTime
+from .transforms import next_fast_len, rfft_block, irfft_block
+
+
+def test_next_fast_len():
+    for length in (1, 7, 97, 101, 1000, 4999):
+        fast_len = next_fast_len(length)
+        assert fast_len >= length
+        for factor in (2, 3, 5):
+            while fast_len % factor == 0:
+                fast_len //= factor
+        assert fast_len == 1
+
+
+def test_round_trip():
+    block = np.random.RandomState(0).normal(size=(2, 3, 101))
+    (spectrum, fft_length) = rfft_block(block)
+    assert fft_length == next_fast_len(101)
+    assert np.allclose(irfft_block(spectrum, fft_length, 101), block)
+    (spectrum, fft_length) = rfft_block(block, fast_length=False)
+    assert (spectrum.shape, fft_length) == ((2, 3, 51), 101)
+    pulses = IVTime.from_arrays(block[0], block[1], delta_t=1e-9)
+    back = pulses.to_freq.to_time
+    assert np.allclose(back.delta_t, 1e-9)
+    assert np.allclose(back.voltage, block[0])
+    assert np.allclose(back.current, block[1])
+
+
+class _RecordingBackend(object):
+    """numpy FFT backend recording the workers of each transform"""
+    def __init__(self):
+        self.workers = []
+
+    def next_fast_len(self, length, real=True):
+        return length
+
+    def rfft(self, block, length, workers=None):
+        self.workers.append(workers)
+        return np.fft.rfft(block, length)
+
+    def irfft(self, spectrum, length, workers=None):
+        self.workers.append(workers)
+        return np.fft.irfft(spectrum, length)
+
+
+def test_workers(monkeypatch):
+    backend = _RecordingBackend()
+    monkeypatch.setattr(transforms, '_fft_backend', backend)
+    monkeypatch.setattr(transforms, 'DEFAULT_WORKERS', 2)
+    block = np.random.RandomState(0).normal(size=(2, 3, 101))
+    pulses = IVTime.from_arrays(block[0], block[1], delta_t=1e-9)
+    back = pulses.to_freq_with(workers=4).to_time_with(workers=-1)
+    assert np.allclose(back.voltage, block[0])
+    assert np.allclose(back.current, block[1])
+    # DEFAULT_WORKERS if not given
+    assert np.allclose(pulses.to_freq.to_time.voltage, block[0])
+    back = pulses.to_freq_with().to_vinc_ref.to_time_with(3)
+    assert np.allclose(back.to_iv.voltage, block[0])
+    assert backend.workers == [4, -1, 2, 2, 2, 3]